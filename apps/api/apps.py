@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.api'
+
+    def ready(self):
+        # Registra os sinais que alimentam o feed de sincronização
+        from . import signals  # noqa: F401
+        # Tempo de serialização por requisição (ver api/metricas.py)
+        from . import metricas
+        metricas.instrumentar_serializers()
@@ -0,0 +1,155 @@
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.views import View
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from . import views
+
+# --- Leitura Assíncrona (ASGI) dos Endpoints Mais Consultados ---
+#
+# Versões 'async def' das leituras que os painéis consultam em intervalos
+# curtos (/async/ocorrencias/, /async/equipes/hoje/, /async/itens-inventario/).
+# Sob ASGI, a espera pelo banco não prende uma thread por requisição.
+#
+# Cada view usa uma instância do ViewSet síncrono correspondente para tudo
+# que não é I/O: autenticação, permissões, throttling, get_queryset,
+# filtros, plano de carregamento (QueryPlanMixin), paginação e serializer.
+# O que muda é só a execução das consultas (ORM assíncrono) e a resposta,
+# sempre JSON. Como o plano de carregamento já traz todas as relações, a
+# serialização não faz consultas e roda direto no event loop.
+
+
+class LeituraAssincrona(View):
+    """
+    Base: 'viewset_class' (ViewSet síncrono) e 'action' ('list' ou 'retrieve').
+    Com ConditionalGetMixin no ViewSet, responde 304 da mesma forma.
+    """
+    viewset_class = None
+    action = 'list'
+
+    async def get(self, request, *args, **kwargs):
+        viewset = self.viewset_class(action_map={'get': self.action}, args=args, kwargs=kwargs, format_kwarg=None)
+        viewset.renderer_classes = [JSONRenderer]
+        viewset.headers = viewset.default_response_headers
+        drf_request = viewset.initialize_request(request, *args, **kwargs)
+        viewset.request = drf_request
+        try:
+            # Autenticação, permissões e throttling: podem consultar o banco
+            await sync_to_async(viewset.initial)(drf_request, *args, **kwargs)
+            resposta = await self.responder(viewset, drf_request)
+        except Exception as exc:
+            resposta = await sync_to_async(viewset.handle_exception)(exc)
+        resposta = viewset.finalize_response(drf_request, resposta, *args, **kwargs)
+        if isinstance(resposta, Response):
+            resposta.render()  # JSON: sem consultas, aqui mesmo (evita o render numa thread)
+        return resposta
+
+    async def responder(self, viewset, request):
+        if self.action == 'retrieve':
+            return await self.detalhar(viewset, request)
+        return await self.listar(viewset, request)
+
+    def _condicional(self, viewset):
+        return hasattr(viewset, '_consulta_validadores')
+
+    async def listar(self, viewset, request):
+        queryset = await sync_to_async(lambda: viewset.filter_queryset(viewset.get_queryset()))()
+        etag = total = None
+        if self._condicional(viewset):
+            etag = await sync_to_async(viewset._etag_listagem)(request)
+            total = getattr(viewset, 'total_conhecido', None)
+            nao_modificado = viewset._nao_modificado(request, etag, None)
+            if nao_modificado is not None:
+                return nao_modificado
+
+        paginador = viewset.paginator
+        fatia = paginador.preparar(queryset, request, viewset) if paginador else None
+        if fatia is None:
+            dados = viewset.get_serializer([objeto async for objeto in queryset], many=True).data
+            resposta = Response(dados)
+        else:
+            linhas = [objeto async for objeto in fatia]
+            if paginador.incluir_total and total is None:
+                total = await paginador.base_queryset.acount()
+            pagina = paginador.montar_pagina(linhas, total if paginador.incluir_total else None)
+            resposta = paginador.get_paginated_response(viewset.get_serializer(pagina, many=True).data)
+
+        if etag is not None:
+            viewset._aplicar_validadores(resposta, etag, None)
+        return resposta
+
+    def _nao_encontrado(self, queryset):
+        # Mesma mensagem do get_object_or_404 da versão síncrona
+        return Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+
+    async def detalhar(self, viewset, request):
+        lookup_url_kwarg = viewset.lookup_url_kwarg or viewset.lookup_field
+        filtro = {viewset.lookup_field: viewset.kwargs[lookup_url_kwarg]}
+        queryset = await sync_to_async(lambda: viewset.filter_queryset(viewset.get_queryset()))()
+
+        etag = ultima = None
+        if self._condicional(viewset):
+            campos = (queryset.model._meta.pk.name, viewset.campo_modificacao)
+            validadores_qs = await sync_to_async(viewset._consulta_validadores)()
+            objeto = await validadores_qs.only(*campos).filter(**filtro).afirst()
+            if objeto is None:
+                raise self._nao_encontrado(queryset)
+            await sync_to_async(viewset.check_object_permissions)(request, objeto)
+            ultima = getattr(objeto, viewset.campo_modificacao)
+            etag = viewset._etag(request, ultima, 1)
+            nao_modificado = viewset._nao_modificado(request, etag, ultima)
+            if nao_modificado is not None:
+                return nao_modificado
+
+        objeto = await queryset.filter(**filtro).afirst()
+        if objeto is None:
+            raise self._nao_encontrado(queryset)
+        if etag is None:
+            await sync_to_async(viewset.check_object_permissions)(request, objeto)
+        resposta = Response(viewset.get_serializer(objeto).data)
+        if etag is not None:
+            viewset._aplicar_validadores(resposta, etag, ultima)
+        return resposta
+
+
+class OcorrenciaListaAsync(LeituraAssincrona):
+    """ GET /async/ocorrencias/ (mesmos filtros, ?fields=/?expand= e cursor). """
+    viewset_class = views.OcorrenciaViewSet
+
+
+class OcorrenciaDetalheAsync(LeituraAssincrona):
+    """ GET /async/ocorrencias/{id}/ (também as fichas arquivadas). """
+    viewset_class = views.OcorrenciaViewSet
+    action = 'retrieve'
+
+    async def responder(self, viewset, request):
+        try:
+            return await super().responder(viewset, request)
+        except Http404:
+            return await sync_to_async(viewset.detalhe_arquivado)(request)
+
+
+class ItemInventarioListaAsync(LeituraAssincrona):
+    """ GET /async/itens-inventario/ (catálogo, visível conforme o grupo do usuário). """
+    viewset_class = views.ItemInventarioViewSet
+
+    async def responder(self, viewset, request):
+        # Mesmo cache do catálogo da versão síncrona (ver api/catalogo.py)
+        chave, entrada = viewset.catalogo_em_cache(request)
+        if entrada is None:
+            resposta = await super().responder(viewset, request)
+            if chave is None or resposta.status_code != 200:
+                return resposta
+            entrada = viewset.guardar_catalogo(request, chave, resposta)
+        return viewset.resposta_catalogo(request, entrada)
+
+
+class EquipesHojeAsync(LeituraAssincrona):
+    """ GET /async/equipes/hoje/ """
+    viewset_class = views.EquipePlantaoViewSet
+    action = 'hoje'
+
+    async def responder(self, viewset, request):
+        queryset = await sync_to_async(viewset.consulta_hoje)()
+        return Response(viewset.get_serializer([equipe async for equipe in queryset], many=True).data)
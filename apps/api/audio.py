@@ -0,0 +1,232 @@
+import hashlib
+import os
+import struct
+import wave
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from apps.ocorrencias.models import Ocorrencia
+from .models import UploadAudio
+from . import tarefas
+
+# --- Envio Retomável do Áudio da Ocorrência ---
+#
+# 1. POST /ocorrencias/{id}/audio/ {"nome_arquivo", "tamanho", "sha256"}
+#    cria o upload e devolve o 'id' e o 'offset' (0).
+# 2. PATCH /uploads-audio/{id}/ com o corpo 'application/offset+octet-stream'
+#    e o cabeçalho 'Upload-Offset' (= offset atual) grava o trecho no
+#    arquivo temporário. Após uma queda, GET/HEAD /uploads-audio/{id}/
+#    informa de onde continuar.
+# 3. Ao receber o último byte, o SHA-256 é conferido e o arquivo vai para
+#    Ocorrencia.observacoes_audio; formato e duração são lidos depois,
+#    em segundo plano.
+
+TAMANHO_MAXIMO = 100 * 1024 * 1024
+TAMANHO_MAXIMO_TRECHO = 5 * 1024 * 1024
+TAMANHO_BLOCO = 64 * 1024
+
+
+class OffsetInvalido(Exception):
+    """ O trecho não começa onde o upload parou. """
+
+
+class ChecksumInvalido(Exception):
+    """ O arquivo completo não confere com o SHA-256 informado. """
+
+
+def caminho_temporario(upload):
+    os.makedirs(settings.UPLOADS_AUDIO_DIR, exist_ok=True)
+    return os.path.join(settings.UPLOADS_AUDIO_DIR, f'{upload.pk}.part')
+
+
+def gravar_trecho(upload_id, offset, fluxo, tamanho_trecho):
+    """
+    Acrescenta ao arquivo temporário os bytes lidos de 'fluxo' (em blocos,
+    sem carregar o trecho inteiro na memória). A linha do upload fica
+    travada durante a gravação, então trechos concorrentes não se misturam.
+    Se a conexão cair no meio, o que chegou é mantido.
+    Retorna o upload atualizado (concluído se foi o último trecho).
+    """
+    with transaction.atomic():
+        upload = UploadAudio.objects.select_for_update().select_related('ocorrencia').get(pk=upload_id)
+        if upload.concluido_em or offset != upload.offset or offset + tamanho_trecho > upload.tamanho:
+            raise OffsetInvalido(upload.offset)
+
+        caminho = caminho_temporario(upload)
+        with open(caminho, 'a+b') as destino:
+            destino.truncate(upload.offset)  # Descarta sobras de uma gravação interrompida
+            restante = tamanho_trecho
+            while restante:
+                bloco = fluxo.read(min(TAMANHO_BLOCO, restante))
+                if not bloco:
+                    break
+                destino.write(bloco)
+                restante -= len(bloco)
+        upload.offset += tamanho_trecho - restante
+
+        valido = upload.offset < upload.tamanho or _concluir(upload, caminho)
+        if valido and not upload.concluido_em:
+            upload.save(update_fields=['offset', 'atualizado_em'])
+        elif not valido:
+            # Recomeça do zero: não há como saber qual trecho veio corrompido
+            os.remove(caminho)
+            upload.offset = 0
+            upload.save(update_fields=['offset', 'atualizado_em'])
+    if not valido:
+        raise ChecksumInvalido()
+    return upload
+
+
+def _concluir(upload, caminho):
+    """ Confere o SHA-256 e move o arquivo para a ocorrência. False se não confere. """
+    sha256 = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO), b''):
+            sha256.update(bloco)
+    if sha256.hexdigest() != upload.sha256.lower():
+        return False
+
+    ocorrencia = upload.ocorrencia
+    with open(caminho, 'rb') as arquivo:
+        ocorrencia.observacoes_audio.save(upload.nome_arquivo, File(arquivo), save=False)
+    ocorrencia.audio_formato, ocorrencia.audio_duracao = '', None
+    ocorrencia.save(update_fields=['observacoes_audio', 'audio_formato', 'audio_duracao', 'atualizado_em'])
+    os.remove(caminho)
+
+    upload.concluido_em = timezone.now()
+    upload.save(update_fields=['offset', 'concluido_em', 'atualizado_em'])
+    nome = ocorrencia.observacoes_audio.name
+    transaction.on_commit(lambda: tarefas.agendar(extrair_metadados, ocorrencia.pk, nome))
+    return True
+
+
+def descartar(upload):
+    """ Cancela o upload e apaga o arquivo temporário. """
+    try:
+        os.remove(caminho_temporario(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+# --- Metadados (formato e duração) ---
+#
+# Lidos do cabeçalho dos formatos gravados pelos celulares, sem dependências:
+# WAV, MP4/M4A/3GP (caixa 'mvhd'), Ogg (Opus/Vorbis, pela última página)
+# e FLAC (STREAMINFO). Nos demais (MP3, WebM, AMR) só o formato é
+# identificado e a duração fica nula.
+
+def extrair_metadados(ocorrencia_id, nome):
+    """ Tarefa: grava formato/duração do áudio, se ele ainda for o da ocorrência. """
+    ocorrencia = Ocorrencia.objects.filter(pk=ocorrencia_id, observacoes_audio=nome).first()
+    if ocorrencia is None:
+        return None
+    with ocorrencia.observacoes_audio.open('rb') as arquivo:
+        formato, duracao = ler_metadados(arquivo)
+    ocorrencia.audio_formato, ocorrencia.audio_duracao = formato, duracao
+    ocorrencia.save(update_fields=['audio_formato', 'audio_duracao', 'atualizado_em'])
+    return formato, duracao
+
+
+def ler_metadados(arquivo):
+    """ (formato, duração em segundos ou None) de um arquivo binário aberto. """
+    inicio = arquivo.read(64)
+    arquivo.seek(0)
+    if inicio[:4] == b'RIFF' and inicio[8:12] == b'WAVE':
+        return 'wav', _duracao(_duracao_wav, arquivo)
+    if inicio[4:8] == b'ftyp':
+        formato = '3gp' if inicio[8:10] == b'3g' else 'm4a'
+        return formato, _duracao(_duracao_mp4, arquivo)
+    if inicio[:4] == b'OggS':
+        return ('opus' if b'OpusHead' in inicio else 'ogg'), _duracao(_duracao_ogg, arquivo)
+    if inicio[:4] == b'fLaC':
+        return 'flac', _duracao(_duracao_flac, arquivo)
+    if inicio[:3] == b'ID3' or (len(inicio) > 1 and inicio[0] == 0xFF and inicio[1] & 0xE0 == 0xE0):
+        return 'mp3', None
+    if inicio[:4] == b'\x1aE\xdf\xa3':
+        return 'webm', None
+    if inicio[:5] == b'#!AMR':
+        return 'amr', None
+    return '', None
+
+
+def _duracao(leitor, arquivo):
+    try:
+        duracao = leitor(arquivo)
+    except (EOFError, IndexError, ValueError, struct.error, wave.Error):
+        return None  # Arquivo truncado ou corrompido: sem duração
+    return round(duracao, 3) if duracao is not None else None
+
+
+def _duracao_wav(arquivo):
+    with wave.open(arquivo, 'rb') as audio:
+        return audio.getnframes() / audio.getframerate()
+
+
+def _duracao_mp4(arquivo):
+    """ duration/timescale da caixa moov/mvhd. """
+    def caixas(fim):
+        while arquivo.tell() + 8 <= fim:
+            posicao = arquivo.tell()
+            tamanho, tipo = struct.unpack('>I4s', arquivo.read(8))
+            if tamanho == 1:
+                tamanho = struct.unpack('>Q', arquivo.read(8))[0]
+            elif tamanho == 0:
+                tamanho = fim - posicao
+            if tamanho < 8:
+                return
+            yield tipo, posicao, posicao + tamanho
+            arquivo.seek(posicao + tamanho)
+
+    fim = arquivo.seek(0, os.SEEK_END)
+    arquivo.seek(0)
+    for tipo, _, fim_moov in caixas(fim):
+        if tipo != b'moov':
+            continue
+        for subtipo, posicao, _ in caixas(fim_moov):
+            if subtipo != b'mvhd':
+                continue
+            arquivo.seek(posicao + 8)
+            versao = struct.unpack('>B3x', arquivo.read(4))[0]  # struct.error se truncado
+            if versao == 1:
+                _, _, escala, duracao = struct.unpack('>QQIQ', arquivo.read(28))
+            else:
+                _, _, escala, duracao = struct.unpack('>IIII', arquivo.read(16))
+            return duracao / escala if escala else None
+    return None
+
+
+def _duracao_ogg(arquivo):
+    """ Posição (granule) da última página / taxa de amostragem. """
+    cabecalho = arquivo.read(4096)
+    if b'OpusHead' in cabecalho:
+        taxa = 48000  # Opus sempre conta amostras a 48 kHz
+        posicao = cabecalho.index(b'OpusHead')
+        pre_skip = struct.unpack('<H', cabecalho[posicao + 10:posicao + 12])[0]
+    elif b'\x01vorbis' in cabecalho:
+        posicao = cabecalho.index(b'\x01vorbis')
+        taxa = struct.unpack('<I', cabecalho[posicao + 12:posicao + 16])[0]
+        pre_skip = 0
+    else:
+        return None
+
+    fim = arquivo.seek(0, os.SEEK_END)
+    arquivo.seek(max(0, fim - TAMANHO_BLOCO))
+    final = arquivo.read()
+    ultima = final.rfind(b'OggS')
+    if ultima < 0 or not taxa:
+        return None
+    granule = struct.unpack('<q', final[ultima + 6:ultima + 14])[0]
+    return max(0, granule - pre_skip) / taxa
+
+
+def _duracao_flac(arquivo):
+    """ Total de amostras / taxa, do bloco STREAMINFO. """
+    arquivo.seek(8)  # 'fLaC' + cabeçalho do bloco
+    info = arquivo.read(34)
+    taxa = int.from_bytes(info[10:13], 'big') >> 4
+    amostras = int.from_bytes(info[13:18], 'big') & 0xFFFFFFFFF
+    return amostras / taxa if taxa else None
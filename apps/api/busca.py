@@ -0,0 +1,74 @@
+from functools import reduce
+from operator import or_
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import Case, Exists, F, FloatField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+
+from apps.ocorrencias.models import Ocorrencia, Localizacao
+from apps.pacientes.models import Paciente
+
+# --- Busca de Ocorrências (texto livre) ---
+#
+# PostgreSQL: texto completo em português sobre 'busca_vetor' (tipo da
+# ocorrência, status e nº de registro; mantido por trigger e indexado com
+# GIN) e similaridade de trigramas (pg_trgm) no nome do paciente e no
+# endereço. Cada critério é uma consulta que usa o próprio índice; os ids
+# são unidos (UNION) e ordenados pela maior relevância entre os critérios.
+#
+# Outros bancos (SQLite nos testes): 'icontains' nos mesmos campos, com
+# uma relevância simples (quantos critérios a ocorrência atende).
+
+CONFIG_TEXTO = 'portuguese'
+TAMANHO_MINIMO = 2
+
+
+def buscar_ocorrencias(queryset, termo):
+    """ Filtra o queryset pelo termo e anota 'relevancia' (maior = melhor). """
+    if connections[queryset.db].vendor == 'postgresql':
+        return _buscar_postgres(queryset, termo)
+    return _buscar_simples(queryset, termo)
+
+
+def _buscar_postgres(queryset, termo):
+    consulta = SearchQuery(termo, config=CONFIG_TEXTO, search_type='websearch')
+
+    ids = (
+        Ocorrencia.objects.filter(busca_vetor=consulta).values('id')
+        .union(
+            Localizacao.objects.filter(endereco__trigram_word_similar=termo).values('ocorrencia_id'),
+            Paciente.objects.filter(nome__trigram_word_similar=termo).values('ocorrencia_id'),
+        )
+    )
+    similaridade_paciente = Subquery(
+        Paciente.objects
+        .filter(ocorrencia=OuterRef('pk'), nome__trigram_word_similar=termo)
+        .annotate(similaridade=TrigramWordSimilarity(termo, 'nome'))
+        .order_by('-similaridade')
+        .values('similaridade')[:1],
+        output_field=FloatField(),
+    )
+    return queryset.filter(pk__in=ids).annotate(
+        relevancia=Greatest(
+            Coalesce(SearchRank(F('busca_vetor'), consulta), Value(0.0)),
+            Coalesce(TrigramWordSimilarity(termo, 'localizacao__endereco'), Value(0.0)),
+            Coalesce(similaridade_paciente, Value(0.0)),
+            output_field=FloatField(),
+        )
+    )
+
+
+def _buscar_simples(queryset, termo):
+    palavras = termo.split()
+    criterios = [
+        reduce(or_, (Q(tipo_ocorrencia__icontains=palavra) for palavra in palavras)),
+        Q(num_reg_central__iexact=termo),
+        Q(localizacao__endereco__icontains=termo),
+        Q(Exists(Paciente.objects.filter(ocorrencia=OuterRef('pk'), nome__icontains=termo))),
+    ]
+    pontos = [
+        Case(When(criterio, then=Value(1.0)), default=Value(0.0), output_field=FloatField())
+        for criterio in criterios
+    ]
+    return queryset.filter(reduce(or_, criterios)).annotate(relevancia=reduce(lambda a, b: a + b, pontos))
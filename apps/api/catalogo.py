@@ -0,0 +1,85 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+# --- Cache do Catálogo de Inventário ---
+#
+# As telas de checklist pedem o catálogo (/itens-inventario/) o tempo todo
+# e ele quase nunca muda. A resposta JSON já renderizada fica num LRU do
+# processo, chaveado pela versão global do catálogo, pelo conjunto de
+# grupos do usuário (é o que decide os itens visíveis) e pela URL. Com o
+# cache quente, a leitura não consulta o banco: os grupos vêm do cache de
+# papéis (users/roles.py) e a versão, do cache do Django.
+#
+# Qualquer gravação/exclusão de ItemInventario ou Group incrementa a versão
+# (ver api/signals.py), o que descarta as entradas de todos os processos
+# que compartilham o cache do Django. Com o LocMemCache padrão cada
+# processo tem a sua versão: as entradas expiram após
+# CATALOGO_CACHE_SEGUNDOS de qualquer forma.
+#
+# Só a leitura simples é guardada (sem parâmetros na URL, em JSON).
+
+CHAVE_VERSAO = 'gestaosaude:catalogo_inventario:versao'
+
+_entradas = OrderedDict()  # chave -> (expira_em, etag, conteudo)
+_lock = threading.Lock()
+
+
+def _limite():
+    return getattr(settings, 'CATALOGO_CACHE_ENTRADAS', 64)
+
+
+def _ttl():
+    return getattr(settings, 'CATALOGO_CACHE_SEGUNDOS', 300)
+
+
+def versao():
+    atual = cache.get(CHAVE_VERSAO)
+    if atual is None:
+        # Valor novo a cada início (ou expurgo) do cache: nenhuma entrada antiga coincide
+        cache.add(CHAVE_VERSAO, time.time_ns(), timeout=None)
+        atual = cache.get(CHAVE_VERSAO, time.time_ns())
+    return atual
+
+
+def invalidar():
+    """ Incrementa a versão e esvazia o LRU deste processo. """
+    try:
+        cache.incr(CHAVE_VERSAO)
+    except ValueError:  # Sem versão no cache: a próxima leitura cria uma nova
+        pass
+    with _lock:
+        _entradas.clear()
+
+
+def chave(*partes):
+    """ Chave de uma entrada na versão atual do catálogo. """
+    return (versao(), *partes)
+
+
+def ler(chave):
+    """ (etag, conteudo) da entrada, ou None se ausente ou expirada. """
+    with _lock:
+        entrada = _entradas.get(chave)
+        if entrada is None:
+            return None
+        if entrada[0] < time.monotonic():
+            del _entradas[chave]
+            return None
+        _entradas.move_to_end(chave)
+        return entrada[1:]
+
+
+def gravar(chave, conteudo):
+    """ Guarda o conteúdo renderizado e retorna (etag, conteudo). """
+    etag = f'W/"{hashlib.sha1(repr(chave).encode()).hexdigest()}"'
+    with _lock:
+        _entradas[chave] = (time.monotonic() + _ttl(), etag, conteudo)
+        _entradas.move_to_end(chave)
+        while len(_entradas) > _limite():
+            _entradas.popitem(last=False)
+    return etag, conteudo
@@ -0,0 +1,231 @@
+import datetime
+from operator import attrgetter
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist
+from django.db.models import Model
+from django.db.models.manager import BaseManager
+from rest_framework import fields, relations, serializers
+from rest_framework.fields import SkipField
+from rest_framework.settings import api_settings
+
+# --- Serialização Compilada (Leitura) ---
+#
+# Nas listagens grandes (ocorrências, pacientes, checklists) quase todo o
+# tempo de CPU ia para a maquinaria de campos do DRF: a cada linha e a cada
+# campo, get_attribute() percorre 'source_attrs', trata exceções e chama
+# to_representation(), e cada serializer aninhado refaz tudo isso. Como a
+# declaração dos serializers não muda durante a requisição, 'compilar'
+# percorre os campos UMA vez e devolve uma função instância -> dict que só
+# lê atributos e converte valores:
+# - colunas do model: operator.attrgetter;
+# - relações: getattr, com None quando o objeto relacionado não existe;
+# - PrimaryKeyRelatedField: a coluna '<campo>_id', sem carregar o objeto;
+# - Char/Integer/Float/Boolean/DateTime/Date/Choice/StringRelated: a
+#   conversão equivalente, sem passar pelo campo;
+# - serializers aninhados (e listas deles): compilados também.
+# O resto (fotos, decimais, campos com get_attribute/to_representation
+# próprios) continua usando o próprio campo: a saída é a mesma do DRF,
+# byte a byte (ver SerializacaoCompiladaTests).
+#
+# A função vale para os campos atuais do serializer, já com a seleção de
+# ?fields=/?expand= aplicada, e o fuso do DateTimeField é o ativo na
+# compilação: por isso é feita por instância do serializer (por requisição).
+# SERIALIZACAO_COMPILADA=False volta ao caminho do DRF.
+
+
+def ativa():
+    return getattr(settings, 'SERIALIZACAO_COMPILADA', True)
+
+
+def _identidade(valor):
+    return valor
+
+
+# --- Conversões (valor já lido e diferente de None) ---
+
+def _pelo_campo(campo):
+    """ A conversão do próprio campo (sem atalho equivalente). """
+    def converter(valor):
+        if isinstance(valor, relations.PKOnlyObject) and valor.pk is None:
+            return None
+        return campo.to_representation(valor)
+    return converter
+
+
+def _booleano(campo):
+    def converter(valor):
+        return valor if valor.__class__ is bool else campo.to_representation(valor)
+    return converter
+
+
+def _data_hora(campo):
+    formato = getattr(campo, 'format', api_settings.DATETIME_FORMAT)
+    if not isinstance(formato, str) or formato.lower() != fields.ISO_8601:
+        return campo.to_representation
+    if type(campo).enforce_timezone is not fields.DateTimeField.enforce_timezone:
+        return campo.to_representation
+    fuso = campo.timezone if hasattr(campo, 'timezone') else campo.default_timezone()
+    if fuso is None:
+        return campo.to_representation
+
+    def converter(valor):
+        # Só datetimes com fuso; o resto (datas ingênuas, strings) fica com o campo
+        if valor.__class__ is not datetime.datetime or valor.tzinfo is None:
+            return campo.to_representation(valor)
+        try:
+            texto = valor.astimezone(fuso).isoformat()
+        except OverflowError:
+            return campo.to_representation(valor)  # Gera o mesmo erro de validação
+        return texto[:-6] + 'Z' if texto.endswith('+00:00') else texto
+    return converter
+
+
+def _data(campo):
+    formato = getattr(campo, 'format', api_settings.DATE_FORMAT)
+    if not isinstance(formato, str) or formato.lower() != fields.ISO_8601:
+        return campo.to_representation
+
+    def converter(valor):
+        return valor.isoformat() if valor.__class__ is datetime.date else campo.to_representation(valor)
+    return converter
+
+
+def _escolha(campo):
+    mapa = campo.choice_strings_to_values
+
+    def converter(valor):
+        if valor.__class__ is str:
+            return mapa.get(valor, valor) if valor else valor
+        return campo.to_representation(valor)
+    return converter
+
+
+# to_representation do DRF -> fábrica da conversão equivalente
+CONVERSOES = {
+    fields.CharField.to_representation: lambda campo: str,
+    fields.IntegerField.to_representation: lambda campo: int,
+    fields.FloatField.to_representation: lambda campo: float,
+    fields.BooleanField.to_representation: _booleano,
+    fields.DateTimeField.to_representation: _data_hora,
+    fields.DateField.to_representation: _data,
+    fields.ChoiceField.to_representation: _escolha,
+    fields.ReadOnlyField.to_representation: lambda campo: _identidade,
+    relations.StringRelatedField.to_representation: lambda campo: str,
+}
+
+
+# --- Leitura do valor na instância ---
+
+def _campo_do_model(campo, modelo):
+    """ O campo do model lido por 'campo' (source simples), ou None. """
+    if modelo is None or len(campo.source_attrs) != 1:
+        return None
+    if type(campo).get_attribute not in (fields.Field.get_attribute, relations.RelatedField.get_attribute):
+        return None
+    nome = campo.source_attrs[0]
+    try:
+        campo_modelo = modelo._meta.get_field(nome)
+    except FieldDoesNotExist:
+        return None  # Propriedade, método ou anotação
+    if not campo_modelo.concrete and campo_modelo.get_accessor_name() != nome:
+        return None  # Relação reversa pelo nome da consulta (ex: sem related_name)
+    return campo_modelo
+
+
+def _apenas_pk(campo, campo_modelo):
+    """ PrimaryKeyRelatedField de uma FK do model: basta a coluna '<campo>_id'. """
+    return (
+        campo_modelo is not None and campo_modelo.many_to_one and campo_modelo.concrete
+        and type(campo).to_representation is relations.PrimaryKeyRelatedField.to_representation
+        and campo.pk_field is None and campo.use_pk_only_optimization()
+    )
+
+
+def _leitor(campo, campo_modelo):
+    if campo_modelo is None:
+        return campo.get_attribute  # Caminho do DRF (inclui default/SkipField)
+    nome = campo.source_attrs[0]
+    if not campo_modelo.is_relation:
+        return attrgetter(nome)
+
+    def ler(instancia):
+        try:
+            return getattr(instancia, nome)
+        except ObjectDoesNotExist:
+            return None  # Ex: OneToOne reversa sem registro, como no DRF
+    return ler
+
+
+# --- Compilação ---
+
+def _compilavel(serializer):
+    """ Serializer cuja representação é a padrão (campo a campo). """
+    return type(serializer).to_representation in (
+        serializers.Serializer.to_representation, RepresentacaoCompiladaMixin.to_representation,
+    )
+
+
+def _conversao(campo):
+    if isinstance(campo, serializers.ListSerializer):
+        if type(campo).to_representation is serializers.ListSerializer.to_representation and _compilavel(campo.child):
+            representar = compilar(campo.child)
+
+            def lista(valor):
+                itens = valor.all() if isinstance(valor, BaseManager) else valor
+                return [representar(item) for item in itens]
+            return lista
+    elif isinstance(campo, serializers.BaseSerializer):
+        if _compilavel(campo):
+            return compilar(campo)
+    else:
+        fabrica = CONVERSOES.get(type(campo).to_representation)
+        if fabrica is not None:
+            return fabrica(campo)
+    return _pelo_campo(campo)
+
+
+def compilar(serializer):
+    """
+    Função instância -> dict com a mesma saída de
+    serializer.to_representation(instancia), para os campos de leitura
+    atuais do serializer.
+    """
+    modelo = getattr(getattr(serializer, 'Meta', None), 'model', None)
+    passos = []
+    for nome, campo in serializer.fields.items():
+        if campo.write_only:
+            continue
+        campo_modelo = _campo_do_model(campo, modelo)
+        if _apenas_pk(campo, campo_modelo):
+            passos.append((nome, attrgetter(campo_modelo.attname), _identidade))
+        else:
+            passos.append((nome, _leitor(campo, campo_modelo), _conversao(campo)))
+    passos = tuple(passos)
+
+    def representar(instancia):
+        dados = {}
+        for nome, ler, converter in passos:
+            try:
+                valor = ler(instancia)
+            except SkipField:
+                continue
+            dados[nome] = None if valor is None else converter(valor)
+        return dados
+    return representar
+
+
+class RepresentacaoCompiladaMixin:
+    """
+    Serializer de leitura representado pela função de 'compilar', montada
+    na primeira linha e reaproveitada nas demais (ex: cada item de uma
+    listagem). Os serializers aninhados entram na mesma função.
+    """
+
+    def to_representation(self, instance):
+        if not isinstance(instance, Model):
+            return super().to_representation(instance)  # Ex: validated_data
+        representar = self.__dict__.get('_representar')
+        if representar is None:
+            representar = self._representar = compilar(self) if ativa() else super().to_representation
+        return representar(instance)
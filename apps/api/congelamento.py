@@ -0,0 +1,138 @@
+import gzip
+import json
+import re
+
+from django.db.models import OuterRef, Subquery
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+
+from apps.plantao.models import EquipePlantao, ItemInventario
+from apps.users.models import Usuario
+from . import fotos
+from .models import FichaCongelada
+
+# --- Fichas Finalizadas Congeladas ---
+#
+# Finalizada, a ficha quase não muda, mas cada leitura refazia o
+# OcorrenciaReadSerializer: localização, pacientes e seus dados,
+# materiais e apoios, com várias consultas e serializers aninhados. A
+# representação completa fica em FichaCongelada: o JSON exatamente como a
+# API o renderiza, comprimido com gzip. O detalhe devolve esses bytes (sem
+# descomprimir, se o cliente aceita gzip) e a listagem os usa para as
+# fichas finalizadas da página, sem carregar as relações delas.
+#
+# Gerada quando a ficha é gravada finalizada (criação, edição, lote) e, se
+# faltar, na primeira leitura completa. Vale enquanto 'versao' for igual a
+# Ocorrencia.atualizado_em, que muda com qualquer edição da ficha ou dos
+# registros aninhados (ver ocorrencias/signals.py). O que a ficha mostra
+# de fora (equipe, item, usuário) descarta as fichas afetadas quando muda
+# (ver api/signals.py).
+#
+# As URLs das fotos e do áudio são absolutas: a base (esquema e host) da
+# geração é guardada e só requisições da mesma base usam a ficha. Enquanto
+# faltar alguma derivada das fotos (geradas em segundo plano), a ficha não
+# é congelada: o campo viria null para sempre.
+#
+# Só a leitura completa é congelada: sem parâmetros na URL e em JSON.
+
+# Modelo de fora -> (campos que aparecem na ficha, caminhos a partir de FichaCongelada)
+REFERENCIAS = {
+    EquipePlantao: (
+        ('vtr_sigla', 'data_plantao'),
+        ('ocorrencia__equipe', 'ocorrencia__viaturas_apoio__equipe_apoio'),
+    ),
+    ItemInventario: (('nome_item',), ('ocorrencia__materiais_utilizados__item',)),
+    Usuario: (('nome_completo', 'matricula'), ('ocorrencia__materiais_utilizados__usuario',)),
+}
+
+SUFIXOS_DERIVADAS = tuple(f'_{tipo}' for tipo in fotos.DERIVADAS)
+_aceita_gzip = re.compile(r'\bgzip\b')
+
+
+def base(request):
+    return request.build_absolute_uri('/')
+
+
+def aplicavel(request):
+    """ Leitura completa, em JSON compacto: a que é congelada. """
+    renderer = getattr(request, 'accepted_renderer', None)
+    return (
+        isinstance(renderer, JSONRenderer)
+        and request.accepted_media_type == renderer.media_type
+        and not request.query_params
+    )
+
+
+def _derivadas_pendentes(dados):
+    """ Alguma foto ainda sem miniatura/média (null até a tarefa gerar)? """
+    if isinstance(dados, list):
+        return any(_derivadas_pendentes(item) for item in dados)
+    if not isinstance(dados, dict):
+        return False
+    for chave, valor in dados.items():
+        if valor is None and chave.endswith(SUFIXOS_DERIVADAS) and dados.get(chave.rsplit('_', 1)[0]):
+            return True
+    return any(_derivadas_pendentes(valor) for valor in dados.values())
+
+
+def guardar(fichas_e_dados, request):
+    """ Congela as fichas finalizadas dentre os pares (ocorrencia, dados serializados). """
+    base_url, agora = base(request), timezone.now()
+    linhas = [
+        FichaCongelada(
+            ocorrencia_id=ocorrencia.pk, versao=ocorrencia.atualizado_em, base_url=base_url,
+            conteudo=gzip.compress(JSONRenderer().render(dados), mtime=0), gerada_em=agora,
+        )
+        for ocorrencia, dados in fichas_e_dados
+        if ocorrencia.finalizada and not _derivadas_pendentes(dados)
+    ]
+    FichaCongelada.objects.bulk_create(
+        linhas, update_conflicts=True, unique_fields=['ocorrencia'],
+        update_fields=['versao', 'base_url', 'conteudo', 'gerada_em'],
+    )
+
+
+def subconsulta(request):
+    """ Anotação (numa consulta de Ocorrencia) com os bytes da ficha congelada e em dia, ou None. """
+    return Subquery(
+        FichaCongelada.objects
+        .filter(
+            ocorrencia=OuterRef('pk'), versao=OuterRef('atualizado_em'), base_url=base(request),
+            ocorrencia__finalizada=True,
+        )
+        .values('conteudo')[:1]
+    )
+
+
+def ler_dados(ocorrencias, request):
+    """ {pk: dados} das fichas (já carregadas) congeladas e em dia. """
+    versoes = {ocorrencia.pk: ocorrencia.atualizado_em for ocorrencia in ocorrencias if ocorrencia.finalizada}
+    if not versoes:
+        return {}
+    linhas = FichaCongelada.objects.filter(ocorrencia_id__in=versoes, base_url=base(request)).values_list(
+        'ocorrencia_id', 'versao', 'conteudo',
+    )
+    return {
+        pk: json.loads(gzip.decompress(conteudo))
+        for pk, versao, conteudo in linhas
+        if versao == versoes[pk]
+    }
+
+
+def resposta(conteudo, request):
+    """ O JSON congelado: os próprios bytes gravados, se o cliente aceita gzip. """
+    if _aceita_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+        saida = HttpResponse(conteudo, content_type='application/json')
+        saida['Content-Encoding'] = 'gzip'
+    else:
+        saida = HttpResponse(gzip.decompress(conteudo), content_type='application/json')
+    patch_vary_headers(saida, ['Accept-Encoding'])
+    return saida
+
+
+def descartar(modelo, pk):
+    """ Remove as fichas congeladas que mostram o registro 'pk' de 'modelo' (ver REFERENCIAS). """
+    for caminho in REFERENCIAS[modelo][1]:
+        FichaCongelada.objects.filter(**{caminho: pk}).delete()
@@ -0,0 +1,96 @@
+import csv
+import json
+
+from django.db.models import QuerySet
+from rest_framework import serializers
+from rest_framework.utils.encoders import JSONEncoder
+
+# --- Exportação em Streaming (CSV / NDJSON) ---
+#
+# As linhas são lidas com QuerySet.iterator(chunk_size): no PostgreSQL isso
+# usa um cursor do lado do servidor e os prefetch_related (pacientes,
+# materiais...) são feitos por bloco. Cada linha é serializada, enviada e
+# descartada, então a memória não cresce com o tamanho da exportação.
+# Também aceitam um iterável de objetos já pronto (ex: fichas vivas e
+# arquivadas intercaladas, ver OcorrenciaViewSet.exportar).
+
+TAMANHO_BLOCO = 500
+
+
+class _Eco:
+    """ 'Arquivo' que devolve o que recebe, para usar o csv.writer sem buffer. """
+
+    def write(self, valor):
+        return valor
+
+
+def _json(valor):
+    return json.dumps(valor, cls=JSONEncoder, ensure_ascii=False)
+
+
+def _objetos(origem, tamanho_bloco):
+    if isinstance(origem, QuerySet):
+        return origem.iterator(chunk_size=tamanho_bloco)
+    return origem
+
+
+def linhas_ndjson(origem, serializer, tamanho_bloco=TAMANHO_BLOCO):
+    """ Um objeto JSON por linha (application/x-ndjson). """
+    for objeto in _objetos(origem, tamanho_bloco):
+        yield _json(serializer.to_representation(objeto)) + '\n'
+
+
+def _colunas(serializer, prefixo=''):
+    """ Nomes das colunas do CSV, achatando os serializers aninhados ('a.b'). """
+    colunas = []
+    for nome, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.BaseSerializer) and not isinstance(field, serializers.ListSerializer):
+            colunas.extend(_colunas(field, prefixo=f'{prefixo}{nome}.'))
+        else:
+            colunas.append(f'{prefixo}{nome}')
+    return colunas
+
+
+def _achatar(dados, prefixo='', saida=None):
+    """ {'a': {'b': 1}, 'c': [..]} -> {'a.b': 1, 'c': '[..]'} """
+    saida = {} if saida is None else saida
+    for chave, valor in (dados or {}).items():
+        nome = f'{prefixo}{chave}'
+        if isinstance(valor, dict):
+            _achatar(valor, f'{nome}.', saida)
+        elif isinstance(valor, list):
+            saida[nome] = _json(valor)
+        else:
+            saida[nome] = valor
+    return saida
+
+
+def linhas_csv(origem, serializer, explodir=None, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    CSV com uma linha por objeto. Se 'explodir' for uma lista aninhada do
+    serializer (ex: 'pacientes'), gera uma linha por item dela, repetindo as
+    colunas do objeto (objetos sem itens saem numa linha só). Outras listas
+    aninhadas vão numa célula, em JSON.
+    """
+    campo_explodido = serializer.fields.get(explodir) if explodir else None
+    if not isinstance(campo_explodido, serializers.ListSerializer):
+        campo_explodido, explodir = None, None
+
+    colunas = [c for c in _colunas(serializer) if c != explodir]
+    if campo_explodido is not None:
+        colunas += _colunas(campo_explodido.child, prefixo=f'{explodir}.')
+
+    escritor = csv.DictWriter(_Eco(), fieldnames=colunas, extrasaction='ignore')
+    yield escritor.writeheader()
+
+    for objeto in _objetos(origem, tamanho_bloco):
+        dados = serializer.to_representation(objeto)
+        itens = dados.pop(explodir, None) if explodir else None
+        linha = _achatar(dados)
+        if not itens:
+            yield escritor.writerow(linha)
+            continue
+        for item in itens:
+            yield escritor.writerow({**linha, **_achatar(item, prefixo=f'{explodir}.')})
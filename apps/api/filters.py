@@ -0,0 +1,70 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from rest_framework.filters import BaseFilterBackend
+
+from apps.plantao.models import MembroEquipe
+
+from .serializers import FiltroOcorrenciaSerializer
+
+# --- Filtros das Listagens (query string) ---
+
+class OcorrenciaFilterBackend(BaseFilterBackend):
+    """
+    Filtros de /ocorrencias/ (listagem e exportação):
+    - ?finalizada=true|false
+    - ?equipe=<id>
+    - ?bairro=<nome exato>
+    - ?data_inicio=AAAA-MM-DD / ?data_fim=AAAA-MM-DD (dias locais, inclusive)
+    - ?minhas_equipes=true (só as fichas das equipes em que o usuário esteve)
+    A exportação aplica os mesmos filtros ao arquivo (filtrar_arquivo).
+    As datas viram um intervalo em 'data_hora_inicio' (usa índice), em vez de
+    um '__date' calculado linha a linha.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if getattr(view, 'detail', False):
+            return queryset
+
+        dados = self._filtros(request)
+        if 'finalizada' in dados:
+            queryset = queryset.filter(finalizada=dados['finalizada'])
+        if dados.get('bairro'):
+            queryset = queryset.filter(localizacao__bairro=dados['bairro'])
+        return self._filtros_comuns(request, queryset, dados)
+
+    def filtrar_arquivo(self, request, queryset):
+        """
+        Os mesmos filtros sobre OcorrenciaArquivada (ver ocorrencias/arquivo.py).
+        Só há fichas finalizadas no arquivo: com ?finalizada=false, nenhuma.
+        """
+        dados = self._filtros(request)
+        if dados.get('finalizada') is False:
+            return queryset.none()
+        if dados.get('bairro'):
+            queryset = queryset.filter(bairro=dados['bairro'])
+        return self._filtros_comuns(request, queryset, dados)
+
+    def _filtros(self, request):
+        # .dict(): num QueryDict, um BooleanField ausente viraria 'False'
+        filtros = FiltroOcorrenciaSerializer(data=request.query_params.dict())
+        filtros.is_valid(raise_exception=True)
+        return filtros.validated_data
+
+    def _filtros_comuns(self, request, queryset, dados):
+        """ Colunas com o mesmo nome na ficha e no arquivo. """
+        if 'equipe' in dados:
+            queryset = queryset.filter(equipe_id=dados['equipe'])
+        if 'data_inicio' in dados:
+            queryset = queryset.filter(data_hora_inicio__gte=self._meia_noite(dados['data_inicio']))
+        if 'data_fim' in dados:
+            queryset = queryset.filter(data_hora_inicio__lt=self._meia_noite(dados['data_fim'] + timedelta(days=1)))
+        if dados.get('minhas_equipes'):
+            # Índice de membros (usuario, data_plantao, equipe) no lugar do OR entre as quatro FKs
+            equipes = MembroEquipe.objects.filter(usuario=request.user).values('equipe_id')
+            queryset = queryset.filter(equipe_id__in=equipes)
+        return queryset
+
+    @staticmethod
+    def _meia_noite(dia):
+        return timezone.make_aware(datetime.combine(dia, time.min), timezone.get_current_timezone())
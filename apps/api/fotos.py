@@ -0,0 +1,106 @@
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from . import tarefas
+
+# --- Derivadas das Fotos (miniatura e média) ---
+#
+# As fotos enviadas pelos celulares têm vários MB. Depois do upload (no
+# commit da transação), o pool de api/tarefas.py gera, ao lado do original,
+# versões reduzidas em JPEG, sem EXIF (localização, aparelho) e já na
+# orientação correta:
+#   fotos_locais/abc.png -> fotos_locais/abc__miniatura.jpg
+#                           fotos_locais/abc__media.jpg
+# Ao terminar, a tarefa grava o nome do original na coluna de marca do
+# model ('<campo>_derivadas', ex: foto_local_derivadas). Os serializers
+# expõem as URLs das derivadas (DerivadaFotoField) só quando a marca bate
+# com o nome atual da foto; enquanto não, o campo vem null. Assim a leitura
+# não consulta o storage (um exists() por derivada e por linha, bloqueante
+# na view assíncrona). Um upload novo ganha nome novo e invalida a marca.
+
+DERIVADAS = {
+    'miniatura': (256, 256),
+    'media': (1280, 1280),
+}
+QUALIDADE_JPEG = 82
+
+logger = logging.getLogger(__name__)
+
+
+def nome_derivada(nome, tipo):
+    """ Caminho (no storage) da derivada 'tipo' do arquivo 'nome'. """
+    raiz, _ = os.path.splitext(nome)
+    return f'{raiz}__{tipo}.jpg'
+
+
+def marca(campo):
+    """ Coluna que guarda o nome da foto de 'campo' cujas derivadas já existem. """
+    return f'{campo}_derivadas'
+
+
+def geradas(arquivo):
+    """ As derivadas do FieldFile 'arquivo' já foram geradas (pela marca, sem storage)? """
+    return bool(arquivo) and getattr(arquivo.instance, marca(arquivo.field.name), None) == arquivo.name
+
+
+def url_derivada(arquivo, tipo, storage=default_storage):
+    """ URL da derivada de um FieldFile, ou None se ainda não foi gerada. """
+    if not geradas(arquivo):
+        return None
+    return storage.url(nome_derivada(arquivo.name, tipo))
+
+
+def gerar_derivadas(nome, storage=default_storage):
+    """
+    Gera (ou regera) todas as derivadas do arquivo 'nome'. Decodifica o
+    original uma única vez, já reduzido pelo decodificador JPEG (draft)
+    ao tamanho da maior derivada. Retorna False se não for uma imagem.
+    """
+    try:
+        with storage.open(nome, 'rb') as arquivo:
+            imagem = Image.open(arquivo)
+            imagem.draft('RGB', max(DERIVADAS.values()))
+            imagem = ImageOps.exif_transpose(imagem).convert('RGB')
+    except (FileNotFoundError, UnidentifiedImageError, OSError):
+        logger.warning('Não foi possível gerar as derivadas de %s', nome, exc_info=True)
+        return False
+
+    # Da maior para a menor, reduzindo a partir da anterior
+    for tipo, tamanho in sorted(DERIVADAS.items(), key=lambda item: item[1], reverse=True):
+        imagem.thumbnail(tamanho, Image.Resampling.LANCZOS)
+        saida = io.BytesIO()
+        imagem.save(saida, 'JPEG', quality=QUALIDADE_JPEG, optimize=True, progressive=True)
+        destino = nome_derivada(nome, tipo)
+        storage.delete(destino)  # Sem isso o storage renomearia a nova
+        storage.save(destino, ContentFile(saida.getvalue()))
+    return True
+
+
+def faltam_derivadas(nome, storage=default_storage):
+    return any(not storage.exists(nome_derivada(nome, tipo)) for tipo in DERIVADAS)
+
+
+def processar(model, campo, nome, refazer=False, storage=default_storage):
+    """
+    Gera as derivadas de 'nome' (se faltarem, ou sempre com 'refazer') e
+    marca as linhas de 'model' cuja foto em 'campo' é 'nome'. Salva com
+    update_fields para que os sinais da ficha (data de modificação,
+    sincronização) vejam a mudança nas URLs.
+    """
+    if (refazer or faltam_derivadas(nome, storage)) and not gerar_derivadas(nome, storage):
+        return False
+    coluna = marca(campo)
+    for objeto in model._base_manager.filter(**{campo: nome}).exclude(**{coluna: nome}):
+        setattr(objeto, coluna, nome)
+        objeto.save(update_fields=[coluna])
+    return True
+
+
+def agendar(model, campo, nome):
+    """ Gera as derivadas de 'nome' (foto de model.campo) em segundo plano. """
+    return tarefas.agendar(processar, model, campo, nome)
@@ -0,0 +1,142 @@
+import asyncio
+import io
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.asgi import get_asgi_application
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.users.models import Usuario
+
+# Pares (WSGI, ASGI) das leituras consultadas pelos painéis
+ENDPOINTS = [
+    ('/ocorrencias/', '/async/ocorrencias/'),
+    ('/equipes/hoje/', '/async/equipes/hoje/'),
+    ('/itens-inventario/', '/async/itens-inventario/'),
+]
+HOST = 'localhost'
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara a vazão das leituras síncronas (WSGI, com um número fixo de "
+        "threads, como um servidor gthread) e assíncronas (ASGI, num event "
+        "loop) com N painéis consultando ao mesmo tempo. Os handlers rodam no "
+        "próprio processo (sem rede), contra o banco configurado e os dados "
+        "existentes (ver popular_dados / benchmark_indices --manter)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concorrencia', type=int, nargs='+', default=[50, 200, 1000],
+                            help='Quantidades de painéis simultâneos')
+        parser.add_argument('--requisicoes', type=int, default=5, help='Requisições por painel')
+        parser.add_argument('--threads-wsgi', type=int, default=16, help='Threads do servidor WSGI simulado')
+        parser.add_argument('--usuario', help='Matrícula do usuário (padrão: o primeiro superusuário)')
+
+    def handle(self, *args, **options):
+        self.cookie = self._sessao(options['usuario'])
+        self.requisicoes = max(1, options['requisicoes'])
+        wsgi, asgi = WSGIHandler(), get_asgi_application()
+        if settings.DEBUG:
+            self.stdout.write(self.style.WARNING('DEBUG=True guarda cada consulta na memória: meça com DEBUG=False.'))
+
+        self.stdout.write(f"{'painéis':>8} {'servidor':>8} {'endpoint':<26} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'erros':>6}")
+        for concorrencia in options['concorrencia']:
+            for caminho_wsgi, caminho_asgi in ENDPOINTS:
+                with ThreadPoolExecutor(max_workers=options['threads_wsgi']) as threads:
+                    resultado = asyncio.run(self._medir(
+                        concorrencia, lambda: self._chamar_wsgi(wsgi, threads, caminho_wsgi)
+                    ))
+                self._linha(concorrencia, 'WSGI', caminho_wsgi, resultado)
+                resultado = asyncio.run(self._medir(concorrencia, lambda: self._chamar_asgi(asgi, caminho_asgi)))
+                self._linha(concorrencia, 'ASGI', caminho_asgi, resultado)
+
+    def _sessao(self, matricula):
+        """ Cookie de sessão (autenticação por senha custaria mais que a própria leitura). """
+        usuarios = Usuario.objects.filter(matricula=matricula) if matricula else Usuario.objects.filter(is_superuser=True)
+        usuario = usuarios.order_by('pk').first()
+        if usuario is None:
+            raise CommandError('Usuário não encontrado: informe --usuario (matrícula).')
+        sessao = import_module(settings.SESSION_ENGINE).SessionStore()
+        sessao[SESSION_KEY] = str(usuario.pk)
+        sessao[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        sessao[HASH_SESSION_KEY] = usuario.get_session_auth_hash()
+        sessao.save()
+        return f'{settings.SESSION_COOKIE_NAME}={sessao.session_key}'
+
+    async def _medir(self, concorrencia, chamar):
+        """ 'concorrencia' painéis, cada um fazendo suas requisições em sequência. """
+        latencias, erros = [], 0
+
+        async def painel():
+            nonlocal erros
+            for _ in range(self.requisicoes):
+                inicio = time.perf_counter()
+                status = await chamar()
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                erros += status != 200
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(painel() for _ in range(concorrencia)))
+        duracao = time.perf_counter() - inicio
+        latencias.sort()
+        return {
+            'vazao': len(latencias) / duracao,
+            'p50': statistics.median(latencias),
+            'p95': latencias[int(len(latencias) * 0.95) - 1],
+            'erros': erros,
+        }
+
+    def _linha(self, concorrencia, servidor, caminho, r):
+        self.stdout.write(
+            f"{concorrencia:>8} {servidor:>8} {caminho:<26} {r['vazao']:>9.1f} {r['p50']:>9.1f} {r['p95']:>9.1f} {r['erros']:>6}"
+        )
+
+    async def _chamar_wsgi(self, handler, threads, caminho):
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': caminho, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+            'SERVER_NAME': HOST, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1', 'HTTP_HOST': HOST,
+            'HTTP_ACCEPT': 'application/json', 'HTTP_COOKIE': self.cookie,
+            'wsgi.input': io.BytesIO(), 'wsgi.errors': io.StringIO(), 'wsgi.url_scheme': 'http',
+            'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+        }
+        status = []
+
+        def executar():
+            resposta = handler(environ, lambda linha, cabecalhos, *_: status.append(int(linha.split()[0])))
+            for _ in resposta:
+                pass
+            resposta.close()  # request_finished: fecha/recicla a conexão como um servidor faria
+
+        await asyncio.get_running_loop().run_in_executor(threads, executar)
+        return status[0]
+
+    async def _chamar_asgi(self, app, caminho):
+        escopo = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': caminho, 'raw_path': caminho.encode(), 'query_string': b'',
+            'root_path': '', 'client': ('127.0.0.1', 0), 'server': (HOST, 80),
+            'headers': [(b'host', HOST.encode()), (b'accept', b'application/json'), (b'cookie', self.cookie.encode())],
+        }
+        status = []
+        corpo_enviado = asyncio.Event()
+        desconectar = asyncio.Event()
+
+        async def receive():
+            if not corpo_enviado.is_set():
+                corpo_enviado.set()
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await desconectar.wait()  # O cliente nunca desconecta antes da resposta
+            return {'type': 'http.disconnect'}
+
+        async def send(mensagem):
+            if mensagem['type'] == 'http.response.start':
+                status.append(mensagem['status'])
+
+        await app(escopo, receive, send)
+        return status[0]
@@ -0,0 +1,169 @@
+import json
+import math
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.users.models import Usuario
+from apps.api.urls import router
+
+# Parâmetros das ações que não respondem sem eles, e variantes filtradas
+# das listagens mais usadas pelos painéis. Datas relativas a hoje.
+PARAMETROS = {
+    'ocorrencia-busca': lambda hoje: {'q': 'queda'},
+    'ocorrencia-exportar': lambda hoje: {'data_inicio': (hoje - timedelta(days=7)).isoformat()},
+}
+VARIANTES = {
+    'ocorrencia-list?abertas': ('ocorrencia-list', lambda hoje: {'finalizada': 'false'}),
+    'ocorrencia-list?semana': ('ocorrencia-list', lambda hoje: {'data_inicio': (hoje - timedelta(days=7)).isoformat()}),
+}
+# Abaixo disto (ms), variações de latência são ruído: não contam como regressão
+FOLGA_MS = 2.0
+
+
+def _percentil(valores, p):
+    """ Percentil pelo método do posto mais próximo (valores já ordenados). """
+    return valores[max(0, math.ceil(p / 100 * len(valores)) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede, pelo cliente de testes do Django, todos os endpoints GET do "
+        "router da API (listagens, ações de listagem e o detalhe do primeiro "
+        "registro de cada uma): p50/p95/p99 em ms e número de consultas. "
+        "Compara com a baseline gravada (--gravar) e falha se um endpoint "
+        "ficou mais lento que a tolerância ou passou a fazer mais consultas. "
+        "Roda contra os dados existentes (ver popular_dados)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=30, help='Requisições medidas por endpoint')
+        parser.add_argument('--usuario', help='Matrícula do usuário (padrão: o primeiro superusuário)')
+        parser.add_argument('--endpoints', nargs='+', help='Só os endpoints cujo nome contém um destes trechos')
+        parser.add_argument(
+            '--baseline', default=getattr(settings, 'BENCHMARK_ENDPOINTS_BASELINE', 'benchmark_endpoints.json'),
+            help='Arquivo JSON da baseline',
+        )
+        parser.add_argument('--gravar', action='store_true', help='Grava os resultados como a nova baseline')
+        parser.add_argument('--tolerancia', type=float, default=0.25,
+                            help='Aumento relativo aceito no p95 (0.25 = 25%%)')
+
+    def handle(self, *args, **options):
+        usuarios = Usuario.objects.filter(matricula=options['usuario']) if options['usuario'] else Usuario.objects.filter(is_superuser=True)
+        usuario = usuarios.order_by('pk').first()
+        if usuario is None:
+            raise CommandError('Usuário não encontrado: informe --usuario (matrícula).')
+        if settings.DEBUG:
+            self.stdout.write(self.style.WARNING('DEBUG=True guarda cada consulta na memória: meça com DEBUG=False.'))
+
+        self.repeticoes = max(1, options['repeticoes'])
+        self.cliente = Client()
+        self.cliente.force_login(usuario)
+
+        resultados = {}
+        self.stdout.write(f"{'endpoint':<36} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'consultas':>9}")
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for nome, url, params in self._endpoints(options['endpoints']):
+                resultado = self._medir(url, params)
+                resultados[nome] = resultado
+                self.stdout.write(
+                    f"{nome:<36} {resultado['status']:>6} {resultado['p50']:>9.1f} {resultado['p95']:>9.1f} "
+                    f"{resultado['p99']:>9.1f} {resultado['consultas']:>9}"
+                )
+
+        caminho = Path(options['baseline'])
+        if options['gravar']:
+            caminho.write_text(json.dumps(resultados, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Baseline gravada em {caminho}.'))
+            return
+        if not caminho.exists():
+            self.stdout.write(f'Sem baseline em {caminho}: use --gravar para criar.')
+            return
+
+        regressoes = self._comparar(json.loads(caminho.read_text()), resultados, options['tolerancia'])
+        if regressoes:
+            raise CommandError('Regressões em relação à baseline:\n' + '\n'.join(regressoes))
+        self.stdout.write(self.style.SUCCESS(f'Sem regressões em relação a {caminho}.'))
+
+    def _endpoints(self, filtros):
+        """ (nome, url, params) de cada GET do router; o detalhe usa o 1º item da listagem. """
+        def pedido(nome):
+            return not filtros or any(trecho in nome for trecho in filtros)
+
+        hoje = timezone.localdate()
+        for _, viewset, basename in router.registry:
+            nomes = []
+            if hasattr(viewset, 'list'):
+                nomes.append(f'{basename}-list')
+            nomes += [
+                f'{basename}-{acao.url_name}' for acao in viewset.get_extra_actions()
+                if not acao.detail and 'get' in acao.mapping
+            ]
+            for nome in filter(pedido, nomes):
+                yield nome, reverse(nome), PARAMETROS.get(nome, lambda hoje: {})(hoje)
+            if hasattr(viewset, 'retrieve') and hasattr(viewset, 'list') and pedido(f'{basename}-detail'):
+                pk = self._primeiro_id(reverse(f'{basename}-list'))
+                if pk is not None:
+                    yield f'{basename}-detail', reverse(f'{basename}-detail', args=[pk]), {}
+
+        for nome, (url_name, params) in VARIANTES.items():
+            if pedido(nome):
+                yield nome, reverse(url_name), params(hoje)
+
+    def _primeiro_id(self, url):
+        resposta = self.cliente.get(url, {'page_size': 1})
+        if resposta.status_code != 200:
+            return None
+        dados = resposta.json()
+        linhas = dados.get('results', []) if isinstance(dados, dict) else dados
+        return linhas[0].get('id') if linhas else None
+
+    def _requisitar(self, url, params):
+        resposta = self.cliente.get(url, params)
+        if resposta.streaming:
+            for _ in resposta.streaming_content:  # A exportação só consulta enquanto é lida
+                pass
+        return resposta
+
+    def _medir(self, url, params):
+        # A primeira requisição (aquecimento) conta as consultas; as demais, o tempo
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self._requisitar(url, params)
+        total_consultas = len(consultas)
+
+        tempos = []
+        for _ in range(self.repeticoes):
+            inicio = time.perf_counter()
+            self._requisitar(url, params)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        tempos.sort()
+        return {
+            'status': resposta.status_code,
+            'p50': _percentil(tempos, 50),
+            'p95': _percentil(tempos, 95),
+            'p99': _percentil(tempos, 99),
+            'consultas': total_consultas,
+        }
+
+    def _comparar(self, baseline, resultados, tolerancia):
+        regressoes = []
+        for nome, atual in resultados.items():
+            anterior = baseline.get(nome)
+            if anterior is None:
+                continue
+            if atual['status'] != anterior['status']:
+                regressoes.append(f"{nome}: status {anterior['status']} -> {atual['status']}")
+            if atual['consultas'] > anterior['consultas']:
+                regressoes.append(f"{nome}: {anterior['consultas']} -> {atual['consultas']} consultas")
+            limite = anterior['p95'] * (1 + tolerancia) + FOLGA_MS
+            if atual['p95'] > limite:
+                regressoes.append(f"{nome}: p95 {anterior['p95']:.1f} -> {atual['p95']:.1f} ms (limite {limite:.1f} ms)")
+        return regressoes
@@ -0,0 +1,113 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from apps.plantao.models import EquipePlantao, ChecklistStatus
+from apps.ocorrencias.models import Ocorrencia, Localizacao, MaterialUtilizado
+from apps.api import seed
+
+# Modelos cujos índices (Meta.indexes) são medidos
+MODELOS = [Ocorrencia, Localizacao, MaterialUtilizado, ChecklistStatus, EquipePlantao]
+
+
+def _consultas(usuario_material, usuario_checklist):
+    """ As consultas quentes da API, como são feitas pelas views. """
+    agora = timezone.now()
+    return [
+        ('Ocorrências em aberto (painel)',
+         Ocorrencia.objects.filter(finalizada=False).order_by('-data_hora_inicio', '-id')[:25]),
+        ('Ocorrências da última semana',
+         Ocorrencia.objects.filter(data_hora_inicio__gte=agora - timedelta(days=7)).order_by('-data_hora_inicio', '-id')[:25]),
+        ('Ocorrências finalizadas do mês',
+         Ocorrencia.objects.filter(finalizada=True, data_hora_inicio__gte=agora - timedelta(days=30)).order_by('-data_hora_inicio', '-id')[:25]),
+        ('Ocorrências por bairro',
+         Ocorrencia.objects.filter(localizacao__bairro='Calungá').order_by('-data_hora_inicio', '-id')[:25]),
+        ('Checklists do usuário',
+         ChecklistStatus.objects.filter(usuario=usuario_checklist).order_by('-data_hora', '-id')[:50]),
+        ('Materiais do usuário',
+         MaterialUtilizado.objects.filter(usuario=usuario_material).order_by('-id')[:50]),
+        ('Equipes por data de plantão',
+         EquipePlantao.objects.order_by('-data_plantao', '-id')[:50]),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Popula o banco com dados simulados e compara, para as consultas quentes "
+        "da API, o plano (EXPLAIN) e o tempo sem e com os índices dos modelos. "
+        "Tudo roda numa transação desfeita no final (exceto com --manter)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ocorrencias', type=int, default=20000, help='Volume de fichas simuladas')
+        parser.add_argument('--repeticoes', type=int, default=5, help='Execuções por consulta (usa a mediana)')
+        parser.add_argument('--analyze', action='store_true', help='EXPLAIN ANALYZE (PostgreSQL)')
+        parser.add_argument('--manter', action='store_true', help='Não desfaz os dados simulados')
+
+    def handle(self, *args, **options):
+        self.repeticoes = max(1, options['repeticoes'])
+        self.analyze = options['analyze'] and connection.vendor == 'postgresql'
+
+        with transaction.atomic():
+            self.stdout.write(f"Gerando {options['ocorrencias']} fichas simuladas...")
+            resumo = seed.popular(ocorrencias=options['ocorrencias'])
+            self.stdout.write(', '.join(f'{nome}: {total}' for nome, total in resumo.items()))
+
+            usuario_material = MaterialUtilizado.objects.values_list('usuario', flat=True).first()
+            usuario_checklist = ChecklistStatus.objects.values_list('usuario', flat=True).first()
+            indices = [(model, indice) for model in MODELOS for indice in model._meta.indexes]
+            # Antes do pacote, as FKs cobertas por índices compostos tinham índice próprio
+            indices_fk = [
+                (model, models.Index(fields=[campo.name], name=f'bench_{model._meta.model_name}_{campo.name}'[:30]))
+                for model in MODELOS for campo in model._meta.local_fields
+                if isinstance(campo, models.ForeignKey) and not campo.db_index
+            ]
+
+            self._alterar(remover=indices, criar=indices_fk)
+            antes = self._medir(usuario_material, usuario_checklist)
+            self._alterar(remover=indices_fk, criar=indices)
+            depois = self._medir(usuario_material, usuario_checklist)
+
+            for nome, (tempo_antes, plano_antes) in antes.items():
+                tempo_depois, plano_depois = depois[nome]
+                self.stdout.write(self.style.MIGRATE_HEADING(f'\n=== {nome} ==='))
+                self.stdout.write(f'sem índices: {tempo_antes:.2f} ms')
+                self.stdout.write(plano_antes)
+                self.stdout.write(self.style.SUCCESS(f'com índices: {tempo_depois:.2f} ms'))
+                self.stdout.write(plano_depois)
+
+            if not options['manter']:
+                transaction.set_rollback(True)
+                self.stdout.write('\nDados simulados descartados.')
+
+    def _alterar(self, remover, criar):
+        """
+        Remove/cria índices com o SQL do schema editor, executado direto na
+        transação atual (o 'with schema_editor()' não pode ser usado dentro
+        de uma transação no SQLite) e atualiza as estatísticas do planejador.
+        """
+        editor = connection.schema_editor()
+        editor.deferred_sql = []  # Normalmente criado no __enter__
+        with connection.cursor() as cursor:
+            for model, indice in remover:
+                cursor.execute(str(indice.remove_sql(model, editor)))
+            for model, indice in criar:
+                cursor.execute(str(indice.create_sql(model, editor)))
+            cursor.execute('ANALYZE')
+
+    def _medir(self, usuario_material, usuario_checklist):
+        """ {nome: (mediana em ms, plano)} para cada consulta. """
+        resultado = {}
+        for nome, queryset in _consultas(usuario_material, usuario_checklist):
+            tempos = []
+            for _ in range(self.repeticoes):
+                inicio = time.perf_counter()
+                list(queryset.all())  # .all(): cópia sem cache de resultados
+                tempos.append((time.perf_counter() - inicio) * 1000)
+            plano = queryset.explain(analyze=True) if self.analyze else queryset.explain()
+            resultado[nome] = (statistics.median(tempos), plano)
+        return resultado
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from apps.ocorrencias.models import Ocorrencia
+from apps.pacientes.models import Paciente
+from apps.plantao.models import ChecklistStatus
+from apps.api import serializers
+from apps.api.query_plan import aplicar_plano
+
+# Serializers das listagens grandes -> (consulta, ordem da listagem)
+LISTAGENS = {
+    'OcorrenciaReadSerializer': (serializers.OcorrenciaReadSerializer, Ocorrencia, ('-data_hora_inicio', '-id')),
+    'PacienteReadSerializer': (serializers.PacienteReadSerializer, Paciente, ('-id',)),
+    'ChecklistStatusSerializer': (serializers.ChecklistStatusSerializer, ChecklistStatus, ('-data_hora', '-id')),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o tempo de CPU da serialização das listagens grandes "
+        "(ocorrências, pacientes, checklists) pelo DRF campo a campo e pela "
+        "função compilada (ver apps/api/compilacao.py), com as mesmas "
+        "instâncias já carregadas (sem banco na medição). Falha se as duas "
+        "saídas não forem idênticas byte a byte. Roda contra os dados "
+        "existentes (ver popular_dados)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--linhas', type=int, default=500, help='Linhas por listagem')
+        parser.add_argument('--repeticoes', type=int, default=5, help='Medições por modo (vale a menor)')
+
+    def handle(self, *args, **options):
+        repeticoes = max(1, options['repeticoes'])
+        contexto = {'request': Request(RequestFactory().get('/'))}
+
+        self.stdout.write(f"{'serializer':<28} {'linhas':>7} {'drf ms':>9} {'compilado ms':>13} {'ganho':>7}")
+        for nome, (classe, modelo, ordem) in LISTAGENS.items():
+            consulta = aplicar_plano(modelo.objects.order_by(*ordem), classe(context=contexto))
+            objetos = list(consulta[:options['linhas']])
+
+            medidas = {}
+            for compilada in (False, True):
+                with override_settings(SERIALIZACAO_COMPILADA=compilada):
+                    medidas[compilada] = self._medir(classe, objetos, contexto, repeticoes)
+            (tempo_drf, saida_drf), (tempo_compilado, saida_compilada) = medidas[False], medidas[True]
+            if saida_drf != saida_compilada:
+                raise CommandError(f'{nome}: a saída compilada difere da do DRF.')
+
+            ganho = tempo_drf / tempo_compilado if tempo_compilado else float('inf')
+            self.stdout.write(
+                f"{nome:<28} {len(objetos):>7} {tempo_drf:>9.1f} {tempo_compilado:>13.1f} {ganho:>6.1f}x"
+            )
+
+    def _medir(self, classe, objetos, contexto, repeticoes):
+        """ (menor tempo de CPU em ms, JSON renderizado) de 'repeticoes' serializações. """
+        tempos = []
+        for _ in range(repeticoes):
+            serializer = classe(objetos, many=True, context=contexto)
+            inicio = time.process_time()
+            dados = serializer.data
+            tempos.append((time.process_time() - inicio) * 1000)
+        return min(tempos), JSONRenderer().render(dados)
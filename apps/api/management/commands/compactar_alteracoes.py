@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.api import sincronizacao
+
+
+class Command(BaseCommand):
+    help = (
+        "Compacta o feed de sincronização dos tablets: mantém só a última "
+        "alteração de cada registro e remove as mais antigas que a retenção."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=sincronizacao.RETENCAO.days,
+            help='Retenção em dias (padrão: a validade dos tokens)',
+        )
+
+    def handle(self, *args, **options):
+        removidos = sincronizacao.compactar(timedelta(days=options['dias']))
+        self.stdout.write(self.style.SUCCESS(f'{removidos} registro(s) removido(s) do feed.'))
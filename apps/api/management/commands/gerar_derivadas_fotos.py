@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from apps.api import fotos
+from apps.api.signals import CAMPOS_FOTO
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera as miniaturas/versões médias das fotos já enviadas que ainda não "
+        "as têm (ex: fotos anteriores ao pipeline) e marca as linhas cujas "
+        "derivadas já existem (ex: depois de criar as colunas de marca). "
+        "Com --todas, regera todas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true', help='Regera também as derivadas existentes')
+
+    def handle(self, *args, **options):
+        geradas = falhas = 0
+        for model, campos in CAMPOS_FOTO.items():
+            for campo in campos:
+                consulta = model.objects.exclude(**{campo: ''}).exclude(**{f'{campo}__isnull': True})
+                if not options['todas']:
+                    consulta = consulta.exclude(**{fotos.marca(campo): F(campo)})
+                for nome in consulta.values_list(campo, flat=True).distinct().iterator():
+                    if fotos.processar(model, campo, nome, refazer=options['todas']):
+                        geradas += 1
+                    else:
+                        falhas += 1
+        self.stdout.write(self.style.SUCCESS(f'{geradas} foto(s) processada(s), {falhas} falha(s).'))
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.api import audio
+from apps.api.models import UploadAudio
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove os envios de áudio abandonados (sem trechos novos há mais de "
+        "--horas) com seus arquivos temporários, e os registros dos concluídos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horas', type=int, default=48, help='Inatividade para considerar abandonado')
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(hours=options['horas'])
+        abandonados = UploadAudio.objects.filter(concluido_em__isnull=True, atualizado_em__lt=limite)
+        total = 0
+        for upload in abandonados.iterator():
+            audio.descartar(upload)
+            total += 1
+        concluidos, _ = UploadAudio.objects.filter(concluido_em__lt=limite).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} upload(s) abandonado(s) e {concluidos} concluído(s) removido(s).'
+        ))
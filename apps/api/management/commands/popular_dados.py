@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.api import seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Popula o banco com dados simulados em volume de produção (ver "
+        "apps/api/seed.py). --escala 1 gera 20 mil fichas; --escala 10, "
+        "200 mil. Os dados ficam no banco: use um banco próprio para isso."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', type=float, default=1.0,
+                            help=f'Multiplica o volume base ({seed.OCORRENCIAS_POR_ESCALA} fichas)')
+        parser.add_argument('--dias', type=int, default=365, help='Período coberto, até hoje')
+        parser.add_argument('--semente', type=int, default=42, help='Semente dos sorteios')
+
+    def handle(self, *args, **options):
+        ocorrencias = round(options['escala'] * seed.OCORRENCIAS_POR_ESCALA)
+        if ocorrencias < 1 or options['dias'] < 1:
+            raise CommandError('--escala e --dias devem gerar ao menos uma ficha e um dia.')
+
+        self.stdout.write(f"Gerando {ocorrencias} fichas em {options['dias']} dias...")
+        inicio = time.perf_counter()
+        resumo = seed.popular(ocorrencias=ocorrencias, dias=options['dias'], semente=options['semente'])
+        for nome, total in resumo.items():
+            self.stdout.write(f'{nome:>20}: {total}')
+        self.stdout.write(self.style.SUCCESS(f'Concluído em {time.perf_counter() - inicio:.1f} s.'))
@@ -0,0 +1,250 @@
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from rest_framework import serializers
+
+# --- Métricas por Endpoint (Prometheus) ---
+#
+# Para cada requisição, o MetricasMiddleware mede: duração total, número e
+# tempo das consultas SQL, tempo de serialização (Serializer.data da raiz)
+# e bytes da resposta. Os valores vão para histogramas em memória, por rota
+# (nome da URL, ex: 'ocorrencia-list') e ação ('list', 'retrieve', ...),
+# expostos em /metricas/ no formato texto do Prometheus. Cada processo tem
+# os seus: o Prometheus soma as instâncias.
+#
+# As consultas são medidas por um execute_wrapper instalado em toda conexão
+# nova (ver api/signals.py); a coleta da requisição atual fica num
+# ContextVar, então vale também para as views assíncronas (o contexto é
+# copiado para as threads do sync_to_async).
+#
+# Requisições mais lentas que METRICAS_REQUISICAO_LENTA_MS vão para o log
+# 'apps.api.lentas' com as consultas mais demoradas.
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+BUCKETS_BYTES = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+TOP_CONSULTAS = 5
+
+logger = logging.getLogger('apps.api.lentas')
+
+_coleta = ContextVar('metricas_coleta', default=None)
+
+
+class Histograma:
+    """ Histograma com buckets fixos (contagens não acumuladas; acumula na exportação). """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.contagens = [0] * (len(buckets) + 1)  # Último: acima do maior bucket
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.contagens[bisect_left(self.buckets, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+
+class Registro:
+    """ Histogramas por (métrica, rota, ação). """
+
+    METRICAS = {
+        'gestaosaude_requisicao_segundos': ('Duração total da requisição.', BUCKETS_SEGUNDOS),
+        'gestaosaude_sql_consultas': ('Consultas SQL por requisição.', BUCKETS_CONSULTAS),
+        'gestaosaude_sql_segundos': ('Tempo em consultas SQL por requisição.', BUCKETS_SEGUNDOS),
+        'gestaosaude_serializacao_segundos': ('Tempo de serialização (Serializer.data) por requisição.', BUCKETS_SEGUNDOS),
+        'gestaosaude_resposta_bytes': ('Tamanho do corpo da resposta (exceto streaming).', BUCKETS_BYTES),
+    }
+
+    def __init__(self):
+        self._histogramas = {}
+        self._lock = threading.Lock()
+
+    def observar(self, rota, acao, valores):
+        with self._lock:
+            for nome, valor in valores.items():
+                if valor is None:
+                    continue
+                chave = (nome, rota, acao)
+                histograma = self._histogramas.get(chave)
+                if histograma is None:
+                    histograma = self._histogramas[chave] = Histograma(self.METRICAS[nome][1])
+                histograma.observar(valor)
+
+    def limpar(self):
+        with self._lock:
+            self._histogramas.clear()
+
+    def exportar(self):
+        """ Texto no formato de exposição do Prometheus (0.0.4). """
+        with self._lock:
+            itens = sorted(
+                (chave, list(h.contagens), h.soma, h.total, h.buckets)
+                for chave, h in self._histogramas.items()
+            )
+        linhas, atual = [], None
+        for (nome, rota, acao), contagens, soma, total, buckets in itens:
+            if nome != atual:
+                atual = nome
+                linhas.append(f'# HELP {nome} {self.METRICAS[nome][0]}')
+                linhas.append(f'# TYPE {nome} histogram')
+            rotulos = f'rota="{_escapar(rota)}",acao="{_escapar(acao)}"'
+            acumulado = 0
+            for limite, contagem in zip(buckets, contagens):
+                acumulado += contagem
+                linhas.append(f'{nome}_bucket{{{rotulos},le="{limite}"}} {acumulado}')
+            linhas.append(f'{nome}_bucket{{{rotulos},le="+Inf"}} {total}')
+            linhas.append(f'{nome}_sum{{{rotulos}}} {soma}')
+            linhas.append(f'{nome}_count{{{rotulos}}} {total}')
+        return '\n'.join(linhas) + '\n'
+
+
+registro = Registro()
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# --- Coleta da Requisição ---
+
+class Coleta:
+    __slots__ = ('consultas', 'tempo_sql', 'serializacao', 'serializando', 'mais_lentas')
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_sql = 0.0
+        self.serializacao = 0.0
+        self.serializando = False
+        self.mais_lentas = []  # heap (duração, sql), só as TOP_CONSULTAS maiores
+
+
+def medir_consulta(execute, sql, params, many, context):
+    """ execute_wrapper: soma as consultas na coleta da requisição atual, se houver. """
+    coleta = _coleta.get()
+    if coleta is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duracao = time.perf_counter() - inicio
+        coleta.consultas += 1
+        coleta.tempo_sql += duracao
+        if len(coleta.mais_lentas) < TOP_CONSULTAS:
+            heapq.heappush(coleta.mais_lentas, (duracao, sql))
+        elif duracao > coleta.mais_lentas[0][0]:
+            heapq.heapreplace(coleta.mais_lentas, (duracao, sql))
+
+
+def instalar_em_conexao(sender, connection, **kwargs):
+    """ Receptor de connection_created. """
+    if medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(medir_consulta)
+
+
+def _medir_data(propriedade):
+    """ Envolve Serializer.data: mede só o serializer raiz (os aninhados estão dentro dele). """
+    def data(self):
+        coleta = _coleta.get()
+        if coleta is None or coleta.serializando:
+            return propriedade.fget(self)
+        coleta.serializando = True
+        inicio = time.perf_counter()
+        try:
+            return propriedade.fget(self)
+        finally:
+            coleta.serializacao += time.perf_counter() - inicio
+            coleta.serializando = False
+    return property(data)
+
+
+def instrumentar_serializers():
+    """ Chamado uma vez no AppConfig.ready(). """
+    for classe in (serializers.Serializer, serializers.ListSerializer):
+        if not getattr(classe.data, '_medido', False):
+            classe.data = _medir_data(classe.data)
+            classe.data.fget._medido = True
+
+
+# --- Middleware ---
+
+def _rota_e_acao(request):
+    resolucao = getattr(request, 'resolver_match', None)
+    if resolucao is None:
+        return None, None
+    rota = resolucao.view_name or resolucao.route
+    funcao = resolucao.func
+    acoes = getattr(funcao, 'actions', None)  # ViewSets do DRF: {'get': 'list', ...}
+    if acoes:
+        acao = acoes.get(request.method.lower(), request.method.lower())
+    else:
+        acao = getattr(getattr(funcao, 'view_class', None), 'action', None) or request.method.lower()
+    return rota, acao
+
+
+class MetricasMiddleware:
+    """ Mede cada requisição resolvida (ver comentário do módulo). Síncrono e assíncrono. """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.assincrono = iscoroutinefunction(get_response)
+        if self.assincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.assincrono:
+            return self.__acall__(request)
+        coleta, token, inicio = self._iniciar()
+        try:
+            resposta = self.get_response(request)
+        finally:
+            _coleta.reset(token)
+        self._registrar(request, resposta, coleta, inicio)
+        return resposta
+
+    async def __acall__(self, request):
+        coleta, token, inicio = self._iniciar()
+        try:
+            resposta = await self.get_response(request)
+        finally:
+            _coleta.reset(token)
+        self._registrar(request, resposta, coleta, inicio)
+        return resposta
+
+    def _iniciar(self):
+        coleta = Coleta()
+        return coleta, _coleta.set(coleta), time.perf_counter()
+
+    def _registrar(self, request, resposta, coleta, inicio):
+        duracao = time.perf_counter() - inicio
+        rota, acao = _rota_e_acao(request)
+        if rota is None:
+            return
+        tamanho = None if resposta.streaming else len(resposta.content)
+        registro.observar(rota, acao, {
+            'gestaosaude_requisicao_segundos': duracao,
+            'gestaosaude_sql_consultas': coleta.consultas,
+            'gestaosaude_sql_segundos': coleta.tempo_sql,
+            'gestaosaude_serializacao_segundos': coleta.serializacao,
+            'gestaosaude_resposta_bytes': tamanho,
+        })
+
+        limite = getattr(settings, 'METRICAS_REQUISICAO_LENTA_MS', 1000)
+        if limite is not None and duracao * 1000 >= limite:
+            consultas = '\n'.join(
+                f'  {tempo * 1000:.1f} ms: {sql}' for tempo, sql in sorted(coleta.mais_lentas, reverse=True)
+            )
+            logger.warning(
+                'Requisição lenta: %s %s (%s/%s) %.0f ms, status %s, %d consultas (%.0f ms), serialização %.0f ms\n%s',
+                request.method, request.get_full_path(), rota, acao, duracao * 1000, resposta.status_code,
+                coleta.consultas, coleta.tempo_sql * 1000, coleta.serializacao * 1000, consultas,
+            )
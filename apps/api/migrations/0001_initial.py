@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:31
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistroAlteracao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tabela', models.CharField(max_length=50)),
+                ('objeto_id', models.BigIntegerField()),
+                ('operacao', models.CharField(choices=[('U', 'Criado/Atualizado'), ('D', 'Excluído')], max_length=1)),
+                ('criado_em', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Registro de Alteração',
+                'verbose_name_plural': 'Registros de Alterações',
+                'db_table': 'api_registro_alteracao',
+                'indexes': [models.Index(fields=['tabela', 'objeto_id', '-id'], name='alteracao_objeto_idx')],
+            },
+        ),
+    ]
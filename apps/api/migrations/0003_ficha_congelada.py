@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:39
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_uploadaudio'),
+        ('ocorrencias', '0007_ocorrencia_arquivada'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FichaCongelada',
+            fields=[
+                ('ocorrencia', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='congelada', serialize=False, to='ocorrencias.ocorrencia')),
+                ('versao', models.DateTimeField()),
+                ('base_url', models.CharField(max_length=200)),
+                ('conteudo', models.BinaryField()),
+                ('gerada_em', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Ficha Congelada',
+                'verbose_name_plural': 'Fichas Congeladas',
+                'db_table': 'api_ficha_congelada',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_ficha_congelada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registroalteracao',
+            name='dono',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
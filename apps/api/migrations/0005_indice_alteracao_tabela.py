@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_registro_alteracao_dono'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registroalteracao',
+            index=models.Index(fields=['tabela', '-id'], name='alteracao_tabela_idx'),
+        ),
+    ]
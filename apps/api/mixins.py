@@ -0,0 +1,238 @@
+import hashlib
+
+from django.db import transaction
+from django.db.models import Count, Max
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import congelamento, sincronizacao
+from .query_plan import aplicar_plano, carregar_plano
+from .signals import MODELOS_SINCRONIZADOS
+
+# --- Mixins Reutilizáveis pelos ViewSets ---
+
+class QueryPlanMixin:
+    """
+    Aplica automaticamente ao queryset o plano de carregamento
+    (select_related/Prefetch) declarado pelo serializer da ação atual.
+    Vale para 'list', 'retrieve' e também para o objeto usado em escritas.
+    Com ?fields= (CamposDinamicosMixin), só as colunas pedidas são lidas.
+    Só leitura: nos ViewSets com escrita, use QueryPlanEscritaMixin.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        # As chaves do cursor são lidas de cada linha: não podem ficar de fora do .only()
+        ordenacao = tuple(campo.lstrip('-') for campo in getattr(self, 'cursor_ordering', None) or ())
+        return aplicar_plano(queryset, self.get_serializer(), extras=ordenacao)
+
+
+class QueryPlanEscritaMixin(QueryPlanMixin):
+    """
+    QueryPlanMixin para ModelViewSets: a resposta de create/update também
+    sai com as relações carregadas pelo plano do serializer. Não usar em
+    ViewSets só de leitura (create/update passariam a ser roteados).
+    """
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        # A resposta lê as relações aninhadas: carrega tudo de uma vez
+        carregar_plano([serializer.instance], serializer)
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        # As relações carregadas por get_object() podem estar desatualizadas:
+        # relê o objeto com o mesmo plano de carregamento
+        try:
+            serializer.instance = self.filter_queryset(self.get_queryset()).get(pk=instance.pk)
+        except instance.DoesNotExist:
+            instance._prefetched_objects_cache = {}
+        return Response(serializer.data)
+
+
+class EscritaAtomicaMixin:
+    """
+    create/update/destroy numa transação: o que os sinais gravam junto
+    (ex: saldo de estoque, ver plantao/estoque.py) é confirmado ou
+    desfeito com a própria gravação.
+    """
+
+    def create(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().create(request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().update(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().destroy(request, *args, **kwargs)
+
+
+class ConditionalGetMixin:
+    """
+    GET condicional (ETag / Last-Modified) para 'list' e 'retrieve'.
+    Os validadores saem de uma consulta barata, antes de carregar as relações
+    e de serializar; se o cliente já tem a versão atual, responde 304.
+
+    - list: ETag = MAX(campo_modificacao) do filtro + um sinal das exclusões,
+      usuário e URL. Só ETag: o Last-Modified não enxerga exclusões.
+      O sinal é o COUNT(*) do filtro só quando a paginação conta de qualquer
+      forma (include_count / ?count=true), e ele é reaproveitado por ela; nas
+      demais, e nas tabelas grandes (include_count = False), é o último id
+      do feed de sincronização da tabela (toda gravação/exclusão gera um),
+      sem contar o filtro (com o filtro vazio vem null: a resposta também
+      não muda).
+    - retrieve: ETag e Last-Modified do próprio objeto.
+
+    Alterações feitas com QuerySet.update() fora dos sinais não mudam o campo.
+    """
+    campo_modificacao = 'atualizado_em'
+
+    def _consulta_validadores(self):
+        """ O queryset filtrado da view, sem JOINs/Prefetch/ordem. """
+        return self.filter_queryset(self.get_queryset()).select_related(None).prefetch_related(None).order_by()
+
+    def _etag(self, request, ultima, total):
+        formato = getattr(getattr(request, 'accepted_renderer', None), 'format', '')
+        chave = f"{ultima.isoformat() if ultima else '-'}|{total}|{request.user.pk}|{formato}|{request.get_full_path()}"
+        return f'W/"{hashlib.sha1(chave.encode()).hexdigest()}"'
+
+    def _nao_modificado(self, request, etag, ultima):
+        """ Resposta 304 (ou 412) se o cliente já tem esta versão; senão None. """
+        segundos = int(ultima.timestamp()) if ultima else None
+        resposta = get_conditional_response(request, etag=etag, last_modified=segundos)
+        if resposta is not None:
+            self._aplicar_validadores(resposta, etag, ultima)
+        return resposta
+
+    def _aplicar_validadores(self, resposta, etag, ultima):
+        resposta['ETag'] = etag
+        if ultima is not None:
+            resposta['Last-Modified'] = http_date(int(ultima.timestamp()))
+        # O conteúdo depende do usuário: só o cache do próprio cliente, revalidando sempre
+        resposta['Cache-Control'] = 'private, no-cache'
+        return resposta
+
+    def _responder(self, request, etag, ultima, gerar_resposta):
+        resposta = self._nao_modificado(request, etag, ultima)
+        if resposta is not None:
+            return resposta
+        resposta = gerar_resposta()
+        if resposta.status_code != status.HTTP_200_OK:
+            return resposta
+        return self._aplicar_validadores(resposta, etag, ultima)
+
+    def _conta_na_paginacao(self, request):
+        contar = getattr(self.paginator, 'get_include_count', None)
+        return contar is not None and contar(request, self)
+
+    def _etag_listagem(self, request):
+        consulta = self._consulta_validadores()
+        if self._conta_na_paginacao(request) or consulta.model not in MODELOS_SINCRONIZADOS:
+            validadores = consulta.aggregate(ultima=Max(self.campo_modificacao), total=Count('pk'))
+            self.total_conhecido = validadores['total']  # Usado pela paginação no lugar de outro COUNT(*)
+            return self._etag(request, validadores['ultima'], validadores['total'])
+        # Na mesma consulta: a subconsulta não depende da linha (avaliada uma vez)
+        validadores = consulta.aggregate(
+            ultima=Max(self.campo_modificacao), alteracao=Max(sincronizacao.ultima_alteracao(consulta.model))
+        )
+        return self._etag(request, validadores['ultima'], f"r{validadores['alteracao']}")
+
+    def _objeto_validado(self, request, consulta):
+        """ O objeto da URL lido de 'consulta' (só os validadores), com as permissões checadas. """
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        objeto = get_object_or_404(consulta, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(request, objeto)
+        return objeto
+
+    def list(self, request, *args, **kwargs):
+        etag = self._etag_listagem(request)
+        return self._responder(
+            request, etag, None, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        campos = (self.get_queryset().model._meta.pk.name, self.campo_modificacao)
+        objeto = self._objeto_validado(request, self._consulta_validadores().only(*campos))
+        ultima = getattr(objeto, self.campo_modificacao)
+        etag = self._etag(request, ultima, 1)
+        return self._responder(
+            request, etag, ultima, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
+        )
+
+
+class FichaCongeladaMixin:
+    """
+    Detalhe e listagem das fichas finalizadas a partir da representação
+    congelada (ver api/congelamento.py); as que faltam são congeladas na
+    leitura. Vai antes de ConditionalGetMixin, de quem usa os validadores:
+    no detalhe, a ficha congelada vem na mesma consulta deles.
+    'serializer_congelado' é o serializer da leitura completa.
+    """
+    serializer_congelado = None
+
+    def congelar_fichas(self, pks):
+        """ Congela as fichas finalizadas dentre 'pks' (ex: logo após a gravação). """
+        serializer = self.serializer_congelado(context=self.get_serializer_context())
+        fichas = list(aplicar_plano(self.get_queryset().filter(pk__in=pks, finalizada=True), serializer))
+        if fichas:
+            dados = self.serializer_congelado(fichas, many=True, context=self.get_serializer_context()).data
+            congelamento.guardar(zip(fichas, dados), self.request)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not congelamento.aplicavel(request):
+            return super().retrieve(request, *args, **kwargs)
+        consulta = (
+            self._consulta_validadores()
+            .only(self.get_queryset().model._meta.pk.name, self.campo_modificacao)
+            .annotate(conteudo_congelado=congelamento.subconsulta(request))
+        )
+        objeto = self._objeto_validado(request, consulta)
+        ultima = getattr(objeto, self.campo_modificacao)
+        etag = self._etag(request, ultima, 1)
+        return self._responder(request, etag, ultima, lambda: self._detalhe(request, objeto.conteudo_congelado))
+
+    def _detalhe(self, request, conteudo):
+        if conteudo is not None:
+            return congelamento.resposta(bytes(conteudo), request)
+        instance = self.get_object()
+        dados = self.get_serializer(instance).data
+        congelamento.guardar([(instance, dados)], request)
+        return Response(dados)
+
+    def list(self, request, *args, **kwargs):
+        if not congelamento.aplicavel(request):
+            return super().list(request, *args, **kwargs)
+        etag = self._etag_listagem(request)
+        return self._responder(request, etag, None, lambda: self._listagem(request))
+
+    def _listagem(self, request):
+        # As relações só são carregadas para as fichas que não estão congeladas
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        pagina = self.paginate_queryset(queryset)
+        fichas = list(queryset) if pagina is None else list(pagina)
+        congeladas = congelamento.ler_dados(fichas, request)
+
+        restantes = [ficha for ficha in fichas if ficha.pk not in congeladas]
+        serializer = self.get_serializer(restantes, many=True)
+        carregar_plano(restantes, serializer)
+        novas = dict(zip((ficha.pk for ficha in restantes), serializer.data))
+        congelamento.guardar(((ficha, novas[ficha.pk]) for ficha in restantes), request)
+
+        dados = [congeladas[ficha.pk] if ficha.pk in congeladas else novas[ficha.pk] for ficha in fichas]
+        if pagina is None:
+            return Response(dados)
+        return self.get_paginated_response(dados)
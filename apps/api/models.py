@@ -1,3 +1,94 @@
+import uuid
+
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
+
+# Tabela: REGISTRO_ALTERACOES (feed de sincronização dos tablets)
+class RegistroAlteracao(models.Model):
+    """
+    Uma linha por criação/alteração/exclusão de um registro sincronizado.
+    Guarda só a identificação do registro (o conteúdo é lido da tabela
+    de origem na hora do feed). O 'id' crescente é a posição no feed.
+    Alimentada por api/signals.py e pelas gravações em lote (ver
+    api/sincronizacao.py).
+    """
+    ATUALIZADO = 'U'
+    EXCLUIDO = 'D'
+    OPERACAO_CHOICES = [
+        (ATUALIZADO, 'Criado/Atualizado'),
+        (EXCLUIDO, 'Excluído'),
+    ]
+
+    tabela = models.CharField(max_length=50) # 'app.model', ex: 'ocorrencias.ocorrencia'
+    objeto_id = models.BigIntegerField()
+    operacao = models.CharField(max_length=1, choices=OPERACAO_CHOICES)
+    criado_em = models.DateTimeField(default=timezone.now)
+    # Exclusões em tabelas vistas só pelo dono (ver sincronizacao.DONOS): o usuário dono
+    dono = models.BigIntegerField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.get_operacao_display()} {self.tabela} #{self.objeto_id}"
+
+    class Meta:
+        verbose_name = 'Registro de Alteração'
+        verbose_name_plural = 'Registros de Alterações'
+        db_table = 'api_registro_alteracao'
+        indexes = [
+            # Compactação: encontra as linhas antigas do mesmo registro
+            models.Index(fields=['tabela', 'objeto_id', '-id'], name='alteracao_objeto_idx'),
+            # ETag das listagens: última alteração da tabela (ver ConditionalGetMixin)
+            models.Index(fields=['tabela', '-id'], name='alteracao_tabela_idx'),
+        ]
+
+
+# Tabela: UPLOADS_AUDIO (envio retomável de Ocorrencia.observacoes_audio)
+class UploadAudio(models.Model):
+    """
+    Envio em partes do áudio de uma ocorrência (ver api/audio.py).
+    Os bytes recebidos ficam num arquivo temporário fora do MEDIA_ROOT;
+    'offset' é quanto dele já foi gravado. Ao completar 'tamanho' bytes
+    com o 'sha256' esperado, o arquivo vai para a ocorrência.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    ocorrencia = models.ForeignKey('ocorrencias.Ocorrencia', on_delete=models.CASCADE, related_name='uploads_audio')
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='uploads_audio')
+    nome_arquivo = models.CharField(max_length=100)
+    tamanho = models.BigIntegerField()
+    sha256 = models.CharField(max_length=64)
+    offset = models.BigIntegerField(default=0)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Upload {self.nome_arquivo} ({self.offset}/{self.tamanho})"
+
+    class Meta:
+        verbose_name = 'Upload de Áudio'
+        verbose_name_plural = 'Uploads de Áudio'
+        db_table = 'api_upload_audio'
+
+
+# Tabela: FICHAS_CONGELADAS (representação pronta das fichas finalizadas)
+class FichaCongelada(models.Model):
+    """
+    JSON de uma ficha finalizada exatamente como o detalhe o renderiza,
+    comprimido com gzip. Vale enquanto 'versao' for igual ao
+    'atualizado_em' da ficha (ver api/congelamento.py).
+    """
+    ocorrencia = models.OneToOneField(
+        'ocorrencias.Ocorrencia', on_delete=models.CASCADE, primary_key=True, related_name='congelada'
+    )
+    versao = models.DateTimeField()  # Ocorrencia.atualizado_em na geração
+    base_url = models.CharField(max_length=200)  # Esquema e host das URLs absolutas (fotos, áudio)
+    conteudo = models.BinaryField()
+    gerada_em = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Ficha congelada #{self.ocorrencia_id}"
 
-# Create your models here.
+    class Meta:
+        verbose_name = 'Ficha Congelada'
+        verbose_name_plural = 'Fichas Congeladas'
+        db_table = 'api_ficha_congelada'
@@ -0,0 +1,212 @@
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import and_, or_
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginação por cursor (keyset) sobre chaves indexadas.
+
+    O cursor guarda os valores da última (ou primeira) linha da página e a
+    próxima página é lida com 'WHERE (a, b) < (x, y)', então a página 1000
+    custa o mesmo que a página 1. As colunas da ordenação devem ser NOT NULL
+    e a última deve ser única (normalmente a 'pk').
+
+    Configuração por ViewSet (atributos opcionais):
+    - cursor_ordering: ordenação usada como chave. Ex: ('-data_hora_inicio', '-id')
+    - page_size: tamanho padrão da página
+    - include_count: se o 'count' (COUNT(*)) é calculado por padrão
+
+    Parâmetros da requisição:
+    - ?cursor=...      posição (gerada pela própria API em 'next'/'previous')
+    - ?page_size=N     tamanho da página (limitado a 'max_page_size')
+    - ?count=false     não executa o COUNT(*) (ou ?count=true para forçar)
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+    max_page_size = 500
+    ordering = ('-pk',)
+    include_count = True
+
+    # --- Configuração ---
+
+    def get_page_size(self, request, view=None):
+        padrao = getattr(view, 'page_size', None) or api_settings.PAGE_SIZE
+        valor = request.query_params.get(self.page_size_query_param)
+        if valor is None:
+            return padrao
+        try:
+            tamanho = int(valor)
+        except ValueError:
+            return padrao
+        return min(tamanho, self.max_page_size) if tamanho > 0 else padrao
+
+    def get_ordering(self, view=None):
+        return tuple(getattr(view, 'cursor_ordering', None) or self.ordering)
+
+    def get_include_count(self, request, view=None):
+        valor = request.query_params.get(self.count_query_param)
+        if valor is None:
+            return getattr(view, 'include_count', self.include_count)
+        return valor.lower() not in ('0', 'false', 'nao', 'não')
+
+    # --- Cursor ---
+
+    def decode_cursor(self, request):
+        """ Retorna (valores, reverso) ou None se não houver cursor. """
+        codificado = request.query_params.get(self.cursor_query_param)
+        if not codificado:
+            return None
+        try:
+            dados = json.loads(base64.urlsafe_b64decode(codificado.encode('ascii')))
+            return list(dados['p']), bool(dados.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error, UnicodeEncodeError):
+            raise NotFound('Cursor inválido.')
+
+    def encode_cursor(self, obj, reverso=False):
+        valores = [
+            self._model_field(nome).value_to_string(obj) for nome in self._nomes
+        ]
+        dados = json.dumps({'p': valores, 'r': int(reverso)}, separators=(',', ':'))
+        codificado = base64.urlsafe_b64encode(dados.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, codificado)
+
+    def _model_field(self, nome):
+        return self.model._meta.get_field(nome)
+
+    def _filtro_posicao(self, valores, reverso):
+        """
+        Monta o filtro lexicográfico '(a, b, c) > (x, y, z)' como:
+        a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+        respeitando a direção (ASC/DESC) de cada coluna.
+        """
+        condicoes = []
+        for i, nome in enumerate(self._nomes):
+            iguais = [Q(**{n: v}) for n, v in zip(self._nomes[:i], valores[:i])]
+            # Avançar em DESC é ir para valores menores (e vice-versa)
+            menor = self._descendente[i] != reverso
+            lookup = f'{nome}__lt' if menor else f'{nome}__gt'
+            condicoes.append(reduce(and_, iguais + [Q(**{lookup: valores[i]})]))
+        return reduce(or_, condicoes)
+
+    # --- Paginação ---
+
+    def preparar(self, queryset, request, view=None):
+        """
+        Aplica ordenação, posição do cursor e limite ao queryset, sem executá-lo.
+        Retorna None quando a paginação está desativada para a view.
+        (Separado de 'paginate_queryset' para poder ser usado pelas views assíncronas.)
+        """
+        self.page_size = self.get_page_size(request, view)
+        if not self.page_size:
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+        ordenacao = self.get_ordering(view)
+        pk = self.model._meta.pk.name
+        ordenacao = tuple(campo.replace('pk', pk) if campo.lstrip('-') == 'pk' else campo for campo in ordenacao)
+        self._nomes = [campo.lstrip('-') for campo in ordenacao]
+        self._descendente = [campo.startswith('-') for campo in ordenacao]
+        self.incluir_total = self.get_include_count(request, view)
+        self.base_queryset = queryset
+
+        cursor = self.decode_cursor(request)
+        self.tem_cursor = cursor is not None
+        self.reverso = False
+        if cursor is not None:
+            valores, self.reverso = cursor
+            if len(valores) != len(self._nomes):
+                raise NotFound('Cursor inválido.')
+            try:
+                valores = [self._model_field(n).to_python(v) for n, v in zip(self._nomes, valores)]
+            except Exception:
+                raise NotFound('Cursor inválido.')
+            queryset = queryset.filter(self._filtro_posicao(valores, self.reverso))
+
+        if self.reverso:
+            # Página anterior: percorre na ordem inversa e depois desinverte
+            ordenacao = tuple(c[1:] if c.startswith('-') else f'-{c}' for c in ordenacao)
+        return queryset.order_by(*ordenacao)[:self.page_size + 1]
+
+    def montar_pagina(self, linhas, total=None):
+        """ Recebe as linhas lidas de 'preparar' e calcula os links. """
+        tem_mais = len(linhas) > self.page_size
+        linhas = linhas[:self.page_size]
+        if self.reverso:
+            linhas.reverse()
+            self.tem_proxima, self.tem_anterior = True, tem_mais
+        else:
+            self.tem_proxima, self.tem_anterior = tem_mais, self.tem_cursor
+        self.total = total
+        self.page = linhas
+        return linhas
+
+    def paginate_queryset(self, queryset, request, view=None):
+        fatia = self.preparar(queryset, request, view)
+        if fatia is None:
+            return None
+        total = None
+        if self.incluir_total:
+            # A view pode já ter contado o mesmo filtro (ex: ConditionalGetMixin)
+            total = getattr(view, 'total_conhecido', None)
+            if total is None:
+                total = self.base_queryset.count()
+        return self.montar_pagina(list(fatia), total)
+
+    def get_next_link(self):
+        if not self.tem_proxima or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.tem_anterior:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverso=True)
+
+    def get_paginated_data(self, data):
+        resposta = {}
+        if self.total is not None:
+            resposta['count'] = self.total
+        resposta['next'] = self.get_next_link()
+        resposta['previous'] = self.get_previous_link()
+        resposta['results'] = data
+        return resposta
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class BuscaPagination(PageNumberPagination):
+    """
+    Paginação por número de página para resultados ordenados por relevância
+    (a relevância é calculada na consulta, então não serve como cursor).
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,13 @@
+from rest_framework.parsers import BaseParser
+
+
+class TrechoBinarioParser(BaseParser):
+    """
+    Corpo binário bruto (trechos do envio retomável, ver api/audio.py).
+    Não lê nada: 'request.data' é o próprio fluxo da requisição, para ser
+    copiado em blocos sem carregar o trecho inteiro na memória.
+    """
+    media_type = 'application/offset+octet-stream'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return stream
@@ -0,0 +1,146 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch, prefetch_related_objects
+from rest_framework import relations, serializers
+
+# --- Plano de Consulta (select_related / Prefetch) ---
+#
+# Os serializers já declaram, através dos seus campos, quais relações
+# precisam ler. Este módulo percorre essa declaração e monta a árvore de
+# select_related/Prefetch correspondente, evitando o problema N+1.
+
+
+def _serializer_aninhado(field):
+    """Retorna o serializer 'filho' de um campo aninhado (ou None)."""
+    if isinstance(field, serializers.ListSerializer):
+        return field.child
+    if isinstance(field, serializers.BaseSerializer):
+        return field
+    return None
+
+
+def _apenas_pk(field):
+    """
+    PrimaryKeyRelatedField lê só a coluna '<campo>_id' (otimização do DRF),
+    então não precisa de JOIN.
+    """
+    return isinstance(field, relations.PrimaryKeyRelatedField) and field.use_pk_only_optimization()
+
+
+def montar_plano(serializer, model, prefixo=''):
+    """
+    Percorre os campos (de leitura) do serializer e devolve uma tupla
+    (select_related, prefetch_related) com os caminhos necessários.
+    """
+    select, prefetch = [], []
+    serializer = _serializer_aninhado(serializer) or serializer
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+
+        # Só a primeira parte do 'source' é uma relação do próprio model
+        attr = field.source_attrs[0] if field.source_attrs else field.source
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            continue  # Propriedade ou método do model
+        if not model_field.is_relation or _apenas_pk(field):
+            continue
+
+        caminho = f'{prefixo}{attr}'
+        aninhado = _serializer_aninhado(field)
+
+        if model_field.many_to_one or model_field.one_to_one:
+            # FK / OneToOne (direta ou reversa): resolvido com JOIN
+            select.append(caminho)
+            if aninhado is not None:
+                sub_select, sub_prefetch = montar_plano(
+                    aninhado, model_field.related_model, prefixo=f'{caminho}__'
+                )
+                select.extend(sub_select)
+                prefetch.extend(sub_prefetch)
+        else:
+            # Reversa de FK / ManyToMany: uma consulta extra por relação
+            queryset = model_field.related_model._default_manager.all()
+            if aninhado is not None:
+                # A FK de volta para o pai é necessária para distribuir os filhos
+                volta = (model_field.field.name,) if model_field.one_to_many else ()
+                queryset = aplicar_plano(queryset, aninhado, extras=volta)
+            prefetch.append(Prefetch(caminho, queryset=queryset))
+
+    return select, prefetch
+
+
+def _restrito(serializer):
+    """ Serializer com seleção de campos ativa (?fields=, ver CamposDinamicosMixin). """
+    serializer = _serializer_aninhado(serializer) or serializer
+    return getattr(serializer, 'selecao_campos', None) is not None
+
+
+def campos_carregados(serializer, model, prefixo=''):
+    """
+    Colunas que o serializer lê, no formato de QuerySet.only(): campos
+    simples, FKs e, para relações resolvidas com JOIN, os campos do
+    serializer aninhado (ou a relação inteira). Retorna None quando algum
+    campo não corresponde a uma coluna (propriedade, método, source='*'),
+    pois não há como saber o que ele lê.
+    """
+    serializer = _serializer_aninhado(serializer) or serializer
+    campos = [f'{prefixo}{model._meta.pk.name}']
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            return None
+        attr = field.source_attrs[0] if field.source_attrs else field.source
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+
+        caminho = f'{prefixo}{attr}'
+        campos.extend(f'{prefixo}{coluna}' for coluna in getattr(field, 'colunas_extras', ()))
+        if not model_field.is_relation or _apenas_pk(field):
+            campos.append(caminho)
+        elif model_field.many_to_one or model_field.one_to_one:
+            aninhado = _serializer_aninhado(field)
+            sub = None
+            if aninhado is not None and _restrito(aninhado):
+                sub = campos_carregados(aninhado, model_field.related_model, prefixo=f'{caminho}__')
+            if sub is None:
+                campos.append(caminho)  # Relação inteira
+            else:
+                campos.extend(sub)
+        # Reversa de FK / ManyToMany: vem do Prefetch, não ocupa coluna aqui
+
+    return campos
+
+
+def aplicar_plano(queryset, serializer, extras=()):
+    """
+    Aplica ao queryset o plano de carregamento exigido pelo serializer.
+    Com seleção de campos ativa, também restringe as colunas com .only();
+    'extras' são colunas lidas por quem chama (ex: chaves da ordenação).
+    """
+    select, prefetch = montar_plano(serializer, queryset.model)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    if _restrito(serializer):
+        campos = campos_carregados(serializer, queryset.model)
+        if campos is not None:
+            queryset = queryset.only(*campos, *extras)
+    return queryset
+
+
+def carregar_plano(instancias, serializer):
+    """
+    Carrega, para instâncias já em memória (ex: recém-criadas), as relações
+    exigidas pelo serializer. Relações já em cache não são consultadas.
+    """
+    if not instancias:
+        return
+    select, prefetch = montar_plano(serializer, type(instancias[0]))
+    prefetch_related_objects(instancias, *select, *prefetch)
@@ -0,0 +1,14 @@
+from rest_framework.renderers import BaseRenderer
+
+
+class PrometheusRenderer(BaseRenderer):
+    """ Formato texto de exposição do Prometheus (ver api/metricas.py). """
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data.encode(self.charset)
+        # Erros (401/403) chegam como dicionário
+        return '\n'.join(f'# {chave}: {valor}' for chave, valor in data.items()).encode(self.charset)
@@ -0,0 +1,229 @@
+import random
+import secrets
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.utils import timezone
+
+from apps.users.models import Usuario
+from apps.plantao.models import EquipePlantao, ItemInventario, ChecklistStatus, ChecklistDetalhe
+from apps.ocorrencias.models import Ocorrencia, Localizacao, MaterialUtilizado, ApoioOcorrencia
+from apps.ocorrencias.signals import ocorrencias_criadas_em_lote
+from apps.plantao import estoque, membros
+from apps.pacientes.models import Paciente, InformacaoClinica
+
+# --- Dados Simulados (benchmarks e ambientes de teste) ---
+#
+# Gera um volume realista de fichas com bulk_create: equipes por dia,
+# ocorrências espalhadas no período (as antigas finalizadas, as recentes
+# em aberto), bairros com distribuição desigual, pacientes, materiais e
+# checklists. Os identificadores levam um código da execução, então
+# pode ser rodado mais de uma vez no mesmo banco.
+#
+# As fichas são geradas e gravadas em blocos de FICHAS_POR_BLOCO (com as
+# relações de cada bloco), então centenas de milhares de fichas não ficam
+# todas na memória ao mesmo tempo.
+
+BAIRROS = [
+    ('Centro', 12), ('Caimbé', 8), ('Pintolândia', 8), ('Senador Hélio Campos', 7),
+    ('Asa Branca', 6), ('Mecejana', 6), ('Buritis', 5), ('Jardim Floresta', 5),
+    ('Cauamé', 4), ('Tancredo Neves', 4), ('Liberdade', 4), ('São Vicente', 3),
+    ('Aparecida', 3), ('Paraviana', 2), ('Calungá', 2), ('Cidade Satélite', 6),
+    ('Nova Cidade', 4), ('Cinturão Verde', 3),
+]
+TIPOS = [
+    ('Queda de moto', 10), ('Acidente de trânsito', 8), ('Clínico', 20), ('Trauma', 8),
+    ('Queda da própria altura', 6), ('Psiquiátrico', 4), ('Obstétrico', 3), ('Ferimento por arma branca', 2),
+]
+STATUS_FINAIS = [('Removido', 60), ('Atendido no local', 20), ('Recusa', 10), ('Cancelado', 7), ('Óbito', 3)]
+GRAVIDADES = ['Vermelho', 'Laranja', 'Amarelo', 'Verde', 'Azul']
+VIATURAS = ['USA-01', 'USA-02', 'USB-01', 'USB-02', 'USB-03', 'USB-04']
+ITENS = [
+    'Soro Fisiológico 500ml', 'Luva de Procedimento', 'Gaze Estéril', 'Atadura', 'Colar Cervical',
+    'Prancha Longa', 'Máscara de O2', 'Cateter Venoso', 'Seringa 10ml', 'Esparadrapo',
+    'Dipirona', 'Adrenalina', 'Glicose 50%', 'Ataduras Elásticas', 'Tala Moldável',
+]
+GRUPOS_EQUIPE = ['Médico', 'Enfermeiro', 'Técnico de Enfermagem', 'Condutor']
+
+TAMANHO_LOTE = 1000
+FICHAS_POR_BLOCO = 10000
+# Fichas por unidade de --escala do popular_dados
+OCORRENCIAS_POR_ESCALA = 20000
+
+
+def _sortear(rnd, opcoes):
+    valores, pesos = zip(*opcoes)
+    return rnd.choices(valores, weights=pesos)[0]
+
+
+def _novas_matriculas(quantidade):
+    """ Matrículas (6 dígitos) ainda livres. """
+    usadas = set(Usuario.objects.values_list('matricula', flat=True))
+    livres, numero = [], 900000
+    while len(livres) < quantidade:
+        matricula = f'{numero:06d}'
+        if matricula not in usadas:
+            livres.append(matricula)
+        numero = numero + 1 if numero < 999999 else 1
+    return livres
+
+
+def popular(ocorrencias=20000, dias=365, semente=42):
+    """
+    Cria 'ocorrencias' fichas distribuídas nos últimos 'dias' dias, com as
+    equipes, usuários, itens, pacientes, materiais, apoios e checklists.
+    Retorna um dicionário com a quantidade criada de cada tabela.
+    """
+    rnd = random.Random(semente)
+    codigo = secrets.token_hex(3)
+    hoje = timezone.localdate()
+    fuso = timezone.get_current_timezone()
+    senha = make_password(None)  # Senha inutilizável: usuários só para volume
+
+    with transaction.atomic():
+        # Usuários e grupos
+        grupos = {nome: Group.objects.get_or_create(name=nome)[0] for nome in GRUPOS_EQUIPE}
+        matriculas = _novas_matriculas(max(20, ocorrencias // 400))
+        usuarios = Usuario.objects.bulk_create([
+            Usuario(
+                matricula=matricula, nome_completo=f'Servidor Simulado {matricula}',
+                email=f'sim.{codigo}.{matricula}@gestaosaude.test', password=senha,
+            )
+            for matricula in matriculas
+        ], batch_size=TAMANHO_LOTE)
+        por_grupo = {nome: [] for nome in GRUPOS_EQUIPE}
+        vinculos = []
+        for i, usuario in enumerate(usuarios):
+            nome = GRUPOS_EQUIPE[i % len(GRUPOS_EQUIPE)]
+            por_grupo[nome].append(usuario)
+            vinculos.append(Usuario.groups.through(usuario_id=usuario.pk, group_id=grupos[nome].pk))
+        Usuario.groups.through.objects.bulk_create(vinculos, batch_size=TAMANHO_LOTE)
+
+        # Itens de inventário (reaproveita os existentes pelo nome)
+        existentes = set(ItemInventario.objects.filter(nome_item__in=ITENS).values_list('nome_item', flat=True))
+        ItemInventario.objects.bulk_create([
+            ItemInventario(nome_item=nome, responsavel_grupo=grupos['Médico'] if i % 3 == 0 else None)
+            for i, nome in enumerate(ITENS) if nome not in existentes
+        ])
+        itens = list(ItemInventario.objects.filter(nome_item__in=ITENS))
+
+        # Uma equipe por viatura por dia
+        equipes = EquipePlantao.objects.bulk_create([
+            EquipePlantao(
+                vtr_sigla=f'{vtr}-{codigo}', data_plantao=hoje - timedelta(days=dia),
+                condutor=rnd.choice(por_grupo['Condutor']),
+                tecnico_enf=rnd.choice(por_grupo['Técnico de Enfermagem']),
+                enfermeiro=rnd.choice(por_grupo['Enfermeiro']) if vtr.startswith('USA') else None,
+                medico=rnd.choice(por_grupo['Médico']) if vtr.startswith('USA') else None,
+            )
+            for dia in range(dias) for vtr in VIATURAS
+        ], batch_size=TAMANHO_LOTE)
+        membros.sincronizar(equipes)  # bulk_create não dispara os sinais
+        equipes_do_dia = {}
+        for equipe in equipes:
+            equipes_do_dia.setdefault(equipe.data_plantao, []).append(equipe)
+
+        # Ocorrências e relações, bloco a bloco
+        totais = {'ocorrencias': 0, 'localizacoes': 0, 'pacientes': 0, 'materiais': 0, 'apoios': 0}
+        for inicio_bloco in range(0, ocorrencias, FICHAS_POR_BLOCO):
+            quantidade = min(FICHAS_POR_BLOCO, ocorrencias - inicio_bloco)
+            bloco = _popular_fichas(rnd, codigo, inicio_bloco, quantidade, dias, equipes_do_dia, itens)
+            for nome, total in bloco.items():
+                totais[nome] += total
+
+        # Um checklist por equipe, assinado pelo técnico
+        checklists = ChecklistStatus.objects.bulk_create([
+            ChecklistStatus(equipe=equipe, usuario=equipe.tecnico_enf) for equipe in equipes
+        ], batch_size=TAMANHO_LOTE)
+        for checklist in checklists:  # 'data_hora' é auto_now_add: ajusta para o dia do plantão
+            checklist.data_hora = timezone.make_aware(
+                datetime.combine(checklist.equipe.data_plantao, time(7)), fuso
+            ) + timedelta(minutes=rnd.randint(0, 59))
+        ChecklistStatus.objects.bulk_update(checklists, ['data_hora'], batch_size=TAMANHO_LOTE)
+        detalhes = [
+            ChecklistDetalhe(
+                checklist=checklist, item=item, quantidade=rnd.randint(0, 20),
+                status_alerta=rnd.choices(['VERDE', 'AMARELO', 'VERMELHO'], weights=[80, 15, 5])[0],
+            )
+            for checklist in checklists for item in itens
+        ]
+        ChecklistDetalhe.objects.bulk_create(detalhes, batch_size=TAMANHO_LOTE)
+
+        # Materiais e checklists em lote não passam pelos sinais do estoque
+        saldos = estoque.recalcular([equipe.vtr_sigla for equipe in equipes_do_dia[hoje]])
+
+    return {
+        'usuarios': len(usuarios),
+        'equipes': len(equipes),
+        **totais,
+        'checklists': len(checklists),
+        'checklist_detalhes': len(detalhes),
+        'saldos_estoque': saldos['criados'],
+    }
+
+
+def _popular_fichas(rnd, codigo, primeira, quantidade, dias, equipes_do_dia, itens):
+    """ Um bloco de fichas com localização, pacientes, materiais e apoios. """
+    hoje = timezone.localdate()
+    fuso = timezone.get_current_timezone()
+
+    # As dos últimos 2 dias podem estar em aberto
+    fichas = []
+    for i in range(primeira, primeira + quantidade):
+        dia = hoje - timedelta(days=min(int(rnd.expovariate(1 / (dias / 3))), dias - 1))
+        inicio = timezone.make_aware(datetime.combine(dia, time.min), fuso) + timedelta(seconds=rnd.randrange(86400))
+        aberta = (hoje - dia).days < 2 and rnd.random() < 0.4
+        fichas.append(Ocorrencia(
+            equipe=rnd.choice(equipes_do_dia[dia]),
+            num_reg_central=f'SIM-{codigo}-{i:07d}',
+            data_hora_inicio=inicio,
+            tipo_ocorrencia=_sortear(rnd, TIPOS),
+            status_final='' if aberta else _sortear(rnd, STATUS_FINAIS),
+            finalizada=not aberta,
+            data_hora_finalizacao=None if aberta else inicio + timedelta(minutes=rnd.randint(20, 180)),
+        ))
+    Ocorrencia.objects.bulk_create(fichas, batch_size=TAMANHO_LOTE)
+
+    localizacoes, pacientes, materiais, apoios = [], [], [], []
+    for ficha in fichas:
+        localizacoes.append(Localizacao(
+            ocorrencia=ficha, bairro=_sortear(rnd, BAIRROS),
+            endereco=f'Rua {rnd.randint(1, 300)}, {rnd.randint(1, 2000)}',
+        ))
+        for n in range(rnd.choices([0, 1, 2, 3], weights=[5, 75, 15, 5])[0]):
+            pacientes.append(Paciente(
+                ocorrencia=ficha, nome=f'Paciente Simulado {ficha.pk}-{n}',
+                idade=rnd.randint(0, 95), sexo=rnd.choice('MFI'),
+            ))
+        for item in rnd.sample(itens, rnd.randint(0, 4)):
+            materiais.append(MaterialUtilizado(
+                ocorrencia=ficha, item=item, quantidade_usada=rnd.randint(1, 5),
+                usuario=ficha.equipe.tecnico_enf,
+            ))
+        if rnd.random() < 0.1:  # Outra viatura do mesmo dia presta apoio
+            outras = [e for e in equipes_do_dia[ficha.equipe.data_plantao] if e.pk != ficha.equipe_id]
+            equipe_apoio = rnd.choice(outras)
+            apoios.append(ApoioOcorrencia(
+                ocorrencia_mestre=ficha, equipe_apoio=equipe_apoio, vtr_apoio_sigla=equipe_apoio.vtr_sigla,
+                data_hora_apoio=ficha.data_hora_inicio + timedelta(minutes=rnd.randint(5, 40)),
+            ))
+    Localizacao.objects.bulk_create(localizacoes, batch_size=TAMANHO_LOTE)
+    Paciente.objects.bulk_create(pacientes, batch_size=TAMANHO_LOTE)
+    InformacaoClinica.objects.bulk_create([
+        InformacaoClinica(paciente=paciente, gravidade_cor=rnd.choice(GRAVIDADES), glasgow_total=rnd.randint(3, 15))
+        for paciente in pacientes
+    ], batch_size=TAMANHO_LOTE)
+    MaterialUtilizado.objects.bulk_create(materiais, batch_size=TAMANHO_LOTE)
+    ApoioOcorrencia.objects.bulk_create(apoios, batch_size=TAMANHO_LOTE)
+
+    # bulk_create não dispara post_save (ex: marcação dos relatórios)
+    ocorrencias_criadas_em_lote.send(sender=Ocorrencia, ocorrencias=fichas)
+    return {
+        'ocorrencias': len(fichas),
+        'localizacoes': len(localizacoes),
+        'pacientes': len(pacientes),
+        'materiais': len(materiais),
+        'apoios': len(apoios),
+    }
@@ -1,19 +1,176 @@
+from collections.abc import Mapping
+
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 from django.contrib.auth.models import Group
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import FileField
 
 # Importando Modelos
 from apps.users.models import Usuario
 from apps.plantao.models import ( # CORREÇÃO AQUI
-    EquipePlantao, ItemInventario, ChecklistStatus, ChecklistDetalhe
+    EquipePlantao, ItemInventario, ChecklistStatus, ChecklistDetalhe, SaldoEstoque
 )
 from apps.ocorrencias.models import (
-    Ocorrencia, Localizacao, MaterialUtilizado, ApoioOcorrencia
+    Ocorrencia, Localizacao, MaterialUtilizado, ApoioOcorrencia, OcorrenciaArquivada
 )
+from apps.ocorrencias.signals import ocorrencias_criadas_em_lote
+from apps.plantao import estoque
 from apps.pacientes.models import (
     Paciente, PertencesPaciente, InformacaoClinica, DadosEspecificosPaciente
 )
 from apps.dashboard.models import RelatorioGerencial
+from apps.dashboard import relatorios
+from .models import RegistroAlteracao, UploadAudio
+from . import audio
+from .sincronizacao import registrar
+from .signals import agendar_derivadas_em_lote
+from . import fotos
+from .compilacao import RepresentacaoCompiladaMixin
+
+# --- Campos Auxiliares (Escrita em Lote) ---
+
+class PrimaryKeyEmLoteField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField que usa objetos pré-carregados pelo
+    ListaEmLoteSerializer pai, em vez de um SELECT por item da lista.
+    """
+    cache_em_lote = None
+
+    def to_internal_value(self, data):
+        if self.cache_em_lote is not None:
+            try:
+                return self.cache_em_lote[self.get_queryset().model._meta.pk.to_python(data)]
+            except (KeyError, TypeError, DjangoValidationError):
+                pass # Cai na validação padrão (que gera a mensagem de erro)
+        return super().to_internal_value(data)
+
+class ListaEmLoteSerializer(serializers.ListSerializer):
+    """
+    ListSerializer que resolve, com um único 'in_bulk' por campo, todas as
+    chaves estrangeiras (PrimaryKeyEmLoteField) da lista recebida.
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            for nome, field in self.child.fields.items():
+                if isinstance(field, PrimaryKeyEmLoteField) and not field.read_only:
+                    field.cache_em_lote = self._carregar(field, [
+                        item.get(nome) for item in data if isinstance(item, Mapping)
+                    ])
+        return super().to_internal_value(data)
+
+    @staticmethod
+    def _carregar(field, valores):
+        queryset = field.get_queryset()
+        pks = set()
+        for valor in valores:
+            try:
+                pks.add(queryset.model._meta.pk.to_python(valor))
+            except (TypeError, DjangoValidationError):
+                continue
+        pks.discard(None)
+        return queryset.in_bulk(pks) if pks else {}
+
+# --- Campos Auxiliares (Fotos) ---
+
+class DerivadaFotoField(serializers.ReadOnlyField):
+    """
+    URL de uma derivada (miniatura/média) de um ImageField, ex:
+    foto_local_miniatura = DerivadaFotoField(source='foto_local', tipo='miniatura').
+    Vem null enquanto a derivada não foi gerada: lê a marca do model
+    ('<source>_derivadas'), não o storage (ver api/fotos.py).
+    """
+    def __init__(self, tipo, **kwargs):
+        self.tipo = tipo
+        super().__init__(**kwargs)
+
+    @property
+    def colunas_extras(self):
+        """ Colunas lidas além do source (para o .only() do QueryPlan). """
+        return [fotos.marca(self.source)]
+
+    def to_representation(self, value):
+        url = fotos.url_derivada(value, self.tipo)
+        request = self.context.get('request')
+        if url is not None and request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+# --- Campos Dinâmicos (?fields= / ?expand=) ---
+
+def _arvore_campos(valor):
+    """ 'a,b.c,b.d' -> {'a': {}, 'b': {'c': {}, 'd': {}}} """
+    arvore = {}
+    for caminho in valor.split(','):
+        no = arvore
+        for parte in caminho.split('.'):
+            parte = parte.strip()
+            if parte:
+                no = no.setdefault(parte, {})
+    return arvore
+
+class CamposDinamicosMixin:
+    """
+    Serializer de leitura cuja representação pode ser escolhida na URL:
+    - ?fields=num_reg_central,equipe,localizacao.bairro
+      Só esses campos. O ponto escolhe campos de um serializer aninhado.
+    - ?expand=equipe
+      Troca a representação resumida pela completa (ver 'campos_expansiveis')
+      e inclui a relação mesmo que 'fields' não a tenha pedido.
+    Sem parâmetros, a resposta é a completa. Relações fora da seleção não são
+    serializadas nem carregadas do banco (ver api/query_plan.py).
+    """
+    # nome do campo -> função que cria o serializer expandido
+    campos_expansiveis = {}
+    # Seleção ativa (None = todos os campos); o pai repassa aos aninhados
+    selecao_campos = None
+    selecao_expandir = None
+
+    def get_fields(self):
+        campos = super().get_fields()
+        self._ler_parametros()
+        selecao, expandir = self.selecao_campos, self.selecao_expandir or {}
+
+        for nome in expandir:
+            if nome in self.campos_expansiveis:
+                campos[nome] = self.campos_expansiveis[nome]()
+
+        desconhecidos = (set(selecao or {}) | set(expandir)) - set(campos)
+        if desconhecidos:
+            raise serializers.ValidationError(
+                {'fields': [f"Campo(s) desconhecido(s): {', '.join(sorted(desconhecidos))}."]}
+            )
+        if selecao is not None:
+            campos = {nome: campo for nome, campo in campos.items() if nome in selecao or nome in expandir}
+
+        # Repassa a seleção 'a.b' para o serializer aninhado 'a'
+        for nome, campo in campos.items():
+            sub_selecao, sub_expandir = (selecao or {}).get(nome), expandir.get(nome)
+            if not (sub_selecao or sub_expandir):
+                continue
+            filho = getattr(campo, 'child', campo)
+            if not isinstance(filho, CamposDinamicosMixin):
+                raise serializers.ValidationError(
+                    {'fields': [f"O campo '{nome}' não permite selecionar subcampos."]}
+                )
+            filho.selecao_campos, filho.selecao_expandir = sub_selecao or None, sub_expandir or None
+        return campos
+
+    def _ler_parametros(self):
+        """ Só o serializer raiz de uma leitura (GET) lê a query string. """
+        raiz = self.root
+        if raiz is not self and not (isinstance(raiz, serializers.ListSerializer) and self.parent is raiz):
+            return
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return
+        campos = request.query_params.get('fields')
+        expandir = request.query_params.get('expand')
+        if campos:
+            self.selecao_campos = _arvore_campos(campos)
+        if expandir:
+            self.selecao_expandir = _arvore_campos(expandir)
 
 # --- Serializers de Leitura Simples (Usados em Aninhamento) ---
 
@@ -49,27 +206,33 @@ class ItemInventarioSerializer(serializers.ModelSerializer):
         model = ItemInventario
         fields = ['id', 'nome_item', 'responsavel_grupo']
 
-class LocalizacaoSerializer(serializers.ModelSerializer):
+class LocalizacaoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    foto_local_miniatura = DerivadaFotoField(source='foto_local', tipo='miniatura')
+    foto_local_media = DerivadaFotoField(source='foto_local', tipo='media')
+
     class Meta:
         model = Localizacao
-        exclude = ['id', 'ocorrencia'] # Exclui campos redundantes
+        exclude = ['id', 'ocorrencia', 'foto_local_derivadas'] # Exclui campos redundantes
+
+class PertencesPacienteSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    foto_pertences_miniatura = DerivadaFotoField(source='foto_pertences', tipo='miniatura')
+    foto_pertences_media = DerivadaFotoField(source='foto_pertences', tipo='media')
 
-class PertencesPacienteSerializer(serializers.ModelSerializer):
     class Meta:
         model = PertencesPaciente
-        exclude = ['id', 'paciente']
+        exclude = ['id', 'paciente', 'foto_pertences_derivadas']
 
-class InformacaoClinicaSerializer(serializers.ModelSerializer):
+class InformacaoClinicaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = InformacaoClinica
         exclude = ['id', 'paciente']
 
-class DadosEspecificosPacienteSerializer(serializers.ModelSerializer):
+class DadosEspecificosPacienteSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = DadosEspecificosPaciente
         exclude = ['paciente'] # PK é o paciente
 
-class MaterialUtilizadoSerializer(serializers.ModelSerializer):
+class MaterialUtilizadoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     item = serializers.StringRelatedField(read_only=True)
     usuario = serializers.StringRelatedField(read_only=True)
     
@@ -84,7 +247,7 @@ class MaterialUtilizadoSerializer(serializers.ModelSerializer):
         read_only_fields = ('usuario',) # Usuário é definido automaticamente pela view
 
 
-class ApoioOcorrenciaSerializer(serializers.ModelSerializer):
+class ApoioOcorrenciaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     equipe_apoio_id = serializers.PrimaryKeyRelatedField(
         queryset=EquipePlantao.objects.all(), source='equipe_apoio'
     )
@@ -98,18 +261,21 @@ class ApoioOcorrenciaSerializer(serializers.ModelSerializer):
 
 class ChecklistDetalheSerializer(serializers.ModelSerializer):
     item = ItemInventarioSerializer(read_only=True)
-    item_id = serializers.PrimaryKeyRelatedField(
+    item_id = PrimaryKeyEmLoteField(
         queryset=ItemInventario.objects.all(), source='item', write_only=True
     )
 
     class Meta:
         model = ChecklistDetalhe
         fields = ['id', 'item', 'item_id', 'quantidade', 'status_alerta']
+        list_serializer_class = ListaEmLoteSerializer # Resolve todos os 'item_id' de uma vez
 
-class ChecklistStatusSerializer(serializers.ModelSerializer):
+class ChecklistStatusSerializer(RepresentacaoCompiladaMixin, serializers.ModelSerializer):
     equipe = serializers.StringRelatedField(read_only=True)
     usuario = serializers.StringRelatedField(read_only=True)
     detalhes = ChecklistDetalheSerializer(many=True) # Permite escrita aninhada
+    foto_vtr_miniatura = DerivadaFotoField(source='foto_vtr', tipo='miniatura')
+    foto_vtr_media = DerivadaFotoField(source='foto_vtr', tipo='media')
 
     equipe_id = serializers.PrimaryKeyRelatedField(
         queryset=EquipePlantao.objects.all(), source='equipe', write_only=True
@@ -119,68 +285,160 @@ class ChecklistStatusSerializer(serializers.ModelSerializer):
         model = ChecklistStatus
         fields = [
             'id', 'equipe', 'equipe_id', 'usuario', 'data_hora', 
-            'vtr_observacao', 'foto_vtr', 'detalhes'
+            'vtr_observacao', 'foto_vtr', 'foto_vtr_miniatura', 'foto_vtr_media', 'detalhes'
         ]
         read_only_fields = ('usuario',) # Definido automaticamente pela view
 
+    def validate_detalhes(self, value):
+        """ Cada item só pode aparecer uma vez (unique_together checklist/item). """
+        itens = [detalhe['item'].pk for detalhe in value]
+        if len(itens) != len(set(itens)):
+            raise serializers.ValidationError("Um mesmo item foi informado mais de uma vez no checklist.")
+        return value
+
     def create(self, validated_data):
         detalhes_data = validated_data.pop('detalhes', [])
-        checklist = ChecklistStatus.objects.create(**validated_data)
-        for detalhe_data in detalhes_data:
-            ChecklistDetalhe.objects.create(checklist=checklist, **detalhe_data)
+        with transaction.atomic():
+            checklist = ChecklistStatus.objects.create(**validated_data)
+            detalhes = ChecklistDetalhe.objects.bulk_create([
+                ChecklistDetalhe(checklist=checklist, **detalhe_data)
+                for detalhe_data in detalhes_data
+            ])
+            registrar(detalhes) # bulk_create não dispara post_save (feed de sincronização)
+            estoque.registrar_contagem(checklist, detalhes) # Nem o saldo de estoque
         return checklist
 
     def update(self, instance, validated_data):
         detalhes_data = validated_data.pop('detalhes', None)
-        
-        # Atualiza os campos do ChecklistStatus
-        instance.equipe = validated_data.get('equipe', instance.equipe)
-        instance.vtr_observacao = validated_data.get('vtr_observacao', instance.vtr_observacao)
-        instance.foto_vtr = validated_data.get('foto_vtr', instance.foto_vtr)
-        instance.save()
-
-        # Atualiza/Cria/Deleta detalhes
-        if detalhes_data is not None:
-            # (Lógica mais complexa de atualização de itens aninhados seria necessária aqui)
-            # Por simplicidade, vamos deletar os antigos e criar os novos
-            instance.detalhes.all().delete()
-            for detalhe_data in detalhes_data:
-                ChecklistDetalhe.objects.create(checklist=instance, **detalhe_data)
+
+        with transaction.atomic():
+            # Atualiza os campos do ChecklistStatus
+            instance.equipe = validated_data.get('equipe', instance.equipe)
+            instance.vtr_observacao = validated_data.get('vtr_observacao', instance.vtr_observacao)
+            instance.foto_vtr = validated_data.get('foto_vtr', instance.foto_vtr)
+            instance.save()
+
+            # Atualiza/Cria/Deleta apenas os detalhes que mudaram
+            if detalhes_data is not None:
+                self._sincronizar_detalhes(instance, detalhes_data)
 
         return instance
 
+    def _sincronizar_detalhes(self, instance, detalhes_data):
+        """
+        Compara os detalhes recebidos com os existentes pela chave
+        (checklist, item) e grava só a diferença, em lote:
+        - itens novos -> bulk_create
+        - itens com quantidade/status diferentes -> bulk_update
+        - itens que não vieram mais -> DELETE direto (sem sinais)
+        """
+        existentes = {detalhe.item_id: detalhe for detalhe in instance.detalhes.all()}
+        novos, alterados = [], []
+
+        for detalhe_data in detalhes_data:
+            item = detalhe_data['item']
+            detalhe = existentes.pop(item.pk, None)
+            if detalhe is None:
+                novos.append(ChecklistDetalhe(checklist=instance, **detalhe_data))
+                continue
+            quantidade = detalhe_data.get('quantidade', detalhe.quantidade)
+            status_alerta = detalhe_data.get('status_alerta', detalhe.status_alerta)
+            if (quantidade, status_alerta) != (detalhe.quantidade, detalhe.status_alerta):
+                detalhe.quantidade, detalhe.status_alerta = quantidade, status_alerta
+                alterados.append(detalhe)
+
+        # O que sobrou em 'existentes' não veio na requisição. Exclusão direta,
+        # sem sinais (nada de um recálculo do saldo por detalhe): o feed e o
+        # saldo são atualizados aqui, junto com os lotes
+        removidos = list(existentes.values())
+        if removidos:
+            ChecklistDetalhe.objects.filter(pk__in=[d.pk for d in removidos])._raw_delete(ChecklistDetalhe.objects.db)
+            registrar(removidos, RegistroAlteracao.EXCLUIDO)
+        if alterados:
+            ChecklistDetalhe.objects.bulk_update(alterados, ['quantidade', 'status_alerta'])
+        if novos:
+            ChecklistDetalhe.objects.bulk_create(novos)
+        if alterados or novos:
+            registrar(alterados + novos)
+        if alterados or novos or removidos:
+            # O checklist pode não ser a última contagem: recalcula os itens
+            estoque.recalcular(
+                [instance.equipe.vtr_sigla], [detalhe.item_id for detalhe in alterados + novos + removidos]
+            )
+
+
+class ChecklistUltimoSerializer(ChecklistStatusSerializer):
+    """
+    Último checklist de uma viatura (/checklists/ultimos/), só com os itens
+    em alerta. 'alertas' vem de um Prefetch(to_attr='alertas') da view.
+    """
+    detalhes = None
+    vtr_sigla = serializers.CharField(source='equipe.vtr_sigla', read_only=True)
+    alertas = ChecklistDetalheSerializer(many=True, read_only=True)
 
-class PacienteReadSerializer(serializers.ModelSerializer):
-    """ Serializer de LEITURA (GET) para Paciente (mostra tudo aninhado) """
+    class Meta(ChecklistStatusSerializer.Meta):
+        fields = [
+            'id', 'vtr_sigla', 'equipe', 'usuario', 'data_hora',
+            'vtr_observacao', 'foto_vtr', 'foto_vtr_miniatura', 'foto_vtr_media', 'alertas'
+        ]
+
+
+class PacienteReadSerializer(RepresentacaoCompiladaMixin, CamposDinamicosMixin, serializers.ModelSerializer):
+    """
+    Serializer de LEITURA (GET) para Paciente (mostra tudo aninhado).
+    Aceita ?fields= (ver CamposDinamicosMixin). Representação compilada
+    (ver api/compilacao.py).
+    """
     pertences = PertencesPacienteSerializer(read_only=True)
     info_clinica = InformacaoClinicaSerializer(read_only=True)
     dados_especificos = DadosEspecificosPacienteSerializer(read_only=True)
+    foto_recusa_miniatura = DerivadaFotoField(source='foto_recusa', tipo='miniatura')
+    foto_recusa_media = DerivadaFotoField(source='foto_recusa', tipo='media')
     
     class Meta:
         model = Paciente
         fields = [
             'id', 'ocorrencia', 'nome', 'idade', 'sexo', 'is_gestante', 
             'is_psiquiatrico', 'is_paliativo', 'recusa_atendimento', 
-            'foto_recusa', 'pertences', 'info_clinica', 'dados_especificos'
+            'foto_recusa', 'foto_recusa_miniatura', 'foto_recusa_media',
+            'pertences', 'info_clinica', 'dados_especificos'
         ]
 
-class OcorrenciaReadSerializer(serializers.ModelSerializer):
-    """ Serializer de LEITURA (GET) para Ocorrência (mostra tudo aninhado) """
+class OcorrenciaReadSerializer(RepresentacaoCompiladaMixin, CamposDinamicosMixin, serializers.ModelSerializer):
+    """
+    Serializer de LEITURA (GET) para Ocorrência (mostra tudo aninhado).
+    Aceita ?fields= e ?expand= (ver CamposDinamicosMixin).
+    Ex: ?fields=num_reg_central,equipe,status_final,localizacao.bairro
+    Representação compilada (ver api/compilacao.py).
+    """
     equipe = serializers.StringRelatedField()
     localizacao = LocalizacaoSerializer(read_only=True)
     pacientes = PacienteReadSerializer(many=True, read_only=True)
     materiais_utilizados = MaterialUtilizadoSerializer(many=True, read_only=True)
     viaturas_apoio = ApoioOcorrenciaSerializer(many=True, read_only=True)
 
+    # ?expand=equipe mostra a equipe completa em vez de "USA-01 - 01/01/2025"
+    campos_expansiveis = {
+        'equipe': lambda: EquipePlantaoSerializer(read_only=True),
+    }
+
     class Meta:
         model = Ocorrencia
         fields = [
             'id', 'num_reg_central', 'data_hora_inicio', 'tipo_ocorrencia', 
             'status_final', 'data_hora_finalizacao', 'finalizada', 
-            'observacoes_audio', 'equipe', 'localizacao', 'pacientes', 
+            'observacoes_audio', 'audio_formato', 'audio_duracao',
+            'equipe', 'localizacao', 'pacientes', 
             'materiais_utilizados', 'viaturas_apoio'
         ]
 
+class OcorrenciaBuscaSerializer(OcorrenciaReadSerializer):
+    """ Resultado da busca: a ficha completa e a relevância (maior = melhor). """
+    relevancia = serializers.FloatField(read_only=True)
+
+    class Meta(OcorrenciaReadSerializer.Meta):
+        fields = OcorrenciaReadSerializer.Meta.fields + ['relevancia']
+
 # --- Serializers de Escrita (Write-Only/Read-Write) ---
 
 class PacienteWriteSerializer(serializers.ModelSerializer):
@@ -197,47 +455,174 @@ class PacienteWriteSerializer(serializers.ModelSerializer):
             'foto_recusa', 'pertences', 'info_clinica', 'dados_especificos'
         ]
 
-    def _create_or_update_nested(self, paciente, data, model_class, field_name):
-        """Helper para criar/atualizar dados OneToOne aninhados."""
-        nested_data = data.pop(field_name, None)
-        if nested_data:
-            # Tenta pegar o objeto existente; se não existir, cria um novo
-            nested_instance, created = model_class.objects.update_or_create(
-                paciente=paciente, defaults=nested_data
-            )
-            return nested_instance
-        return None
+    def validate(self, attrs):
+        if self.partial and self.instance is not None:
+            erros = validar_criacoes_parciais(self, [(self.instance.pk, attrs)])[0]
+            if erros:
+                raise serializers.ValidationError(erros)
+        return attrs
 
     def create(self, validated_data):
-        pertences_data = validated_data.pop('pertences', None)
-        info_data = validated_data.pop('info_clinica', None)
-        dados_data = validated_data.pop('dados_especificos', None)
-        
-        paciente = Paciente.objects.create(**validated_data)
-        
-        if pertences_data:
-            PertencesPaciente.objects.create(paciente=paciente, **pertences_data)
-        if info_data:
-            InformacaoClinica.objects.create(paciente=paciente, **info_data)
-        if dados_data:
-            DadosEspecificosPaciente.objects.create(paciente=paciente, **dados_data)
-            
+        dados_aninhados = {campo: validated_data.pop(campo, None) for campo, _ in CAMPOS_ANINHADOS_PACIENTE}
+        with transaction.atomic():
+            paciente = Paciente.objects.create(**validated_data)
+            gravar_dados_pacientes([(paciente, dados_aninhados)])
         return paciente
 
     def update(self, instance, validated_data):
-        # Atualiza os campos OneToOne
-        self._create_or_update_nested(instance, validated_data, PertencesPaciente, 'pertences')
-        self._create_or_update_nested(instance, validated_data, InformacaoClinica, 'info_clinica')
-        self._create_or_update_nested(instance, validated_data, DadosEspecificosPaciente, 'dados_especificos')
-        
-        # Atualiza os campos do paciente
-        return super().update(instance, validated_data)
+        # OneToOne por upsert (um INSERT ... ON CONFLICT por tabela), junto com o paciente
+        dados_aninhados = {campo: validated_data.pop(campo, None) for campo, _ in CAMPOS_ANINHADOS_PACIENTE}
+        with transaction.atomic():
+            gravar_dados_pacientes([(instance, dados_aninhados)])
+            return super().update(instance, validated_data)
+
+class PacienteAninhadoSerializer(PacienteWriteSerializer):
+    """
+    Paciente dentro da ficha (OcorrenciaWriteSerializer): a ocorrência é a
+    própria ficha, então o campo 'ocorrencia' não é informado. Na edição da
+    ficha, 'id' indica um paciente já existente; sem 'id', o paciente é novo.
+    """
+    id = serializers.IntegerField(required=False, min_value=1)
+
+    class Meta(PacienteWriteSerializer.Meta):
+        fields = [campo for campo in PacienteWriteSerializer.Meta.fields if campo != 'ocorrencia']
+
+# Relações OneToOne do Paciente gravadas junto com ele: (campo, model)
+CAMPOS_ANINHADOS_PACIENTE = (
+    ('pertences', PertencesPaciente),
+    ('info_clinica', InformacaoClinica),
+    ('dados_especificos', DadosEspecificosPaciente),
+)
+
+def _obrigatorios_ausentes(serializer, dados):
+    """ Erros dos campos obrigatórios de 'serializer' que não estão em 'dados' (validados com partial). """
+    return {
+        nome: [campo.error_messages['required']]
+        for nome, campo in serializer.fields.items()
+        if campo.required and not campo.read_only and campo.source not in dados
+    }
+
+def validar_criacoes_parciais(serializer, pacientes):
+    """
+    Num PATCH (partial) os campos obrigatórios não são exigidos, mas o que é
+    criado a partir dos dados parciais precisa deles: o paciente sem 'id' e
+    os OneToOne que o paciente ainda não tem (ver gravar_dados_pacientes).
+    'serializer': o PacienteWriteSerializer dos dados; 'pacientes': lista de
+    (pk do paciente ou None, dados validados). Retorna um dict de erros por
+    paciente (vazio se estiver ok).
+    """
+    existentes = {}
+    for campo, model in CAMPOS_ANINHADOS_PACIENTE:
+        pks = [pk for pk, dados in pacientes if pk is not None and dados.get(campo)]
+        existentes[campo] = set(
+            model.objects.filter(paciente_id__in=pks).values_list('paciente_id', flat=True)
+        ) if pks else set()
+
+    erros = []
+    for pk, dados in pacientes:
+        erro = _obrigatorios_ausentes(serializer, dados) if pk is None else {}
+        for campo, _ in CAMPOS_ANINHADOS_PACIENTE:
+            relacao_data = dados.get(campo)
+            if relacao_data and pk not in existentes[campo]:
+                faltando = _obrigatorios_ausentes(serializer.fields[campo], relacao_data)
+                if faltando:
+                    erro[campo] = faltando
+        erros.append(erro)
+    return erros
+
+def gravar_dados_pacientes(dados_por_paciente):
+    """
+    Grava os OneToOne de pacientes já salvos como upsert: um INSERT ... ON
+    CONFLICT (paciente_id) DO UPDATE por tabela, atualizando só os campos
+    recebidos (pacientes com conjuntos de campos diferentes vão em lotes
+    separados). 'dados_por_paciente': [(paciente, {'pertences': {...}, ...})].
+    Não dispara post_save: registra no feed de sincronização e agenda as
+    derivadas das fotos aqui. Retorna os objetos gravados.
+    """
+    lotes = {}
+    for paciente, dados in dados_por_paciente:
+        for campo, model in CAMPOS_ANINHADOS_PACIENTE:
+            relacao_data = dados.get(campo)
+            if relacao_data:
+                chave = (model, tuple(sorted(relacao_data)))
+                lotes.setdefault(chave, []).append(model(paciente=paciente, **relacao_data))
+
+    gravados = []
+    with transaction.atomic():
+        for (model, campos), objetos in lotes.items():
+            model.objects.bulk_create(
+                objetos, update_conflicts=True, unique_fields=['paciente'], update_fields=list(campos),
+            )
+            gravados.extend(objetos)
+        if gravados:
+            registrar(gravados)
+    agendar_derivadas_em_lote(gravados)
+    return gravados
+
+def _gravar_arquivos(objetos, campos):
+    """ bulk_update não chama pre_save: envia ao storage os arquivos novos dos campos de arquivo. """
+    if not objetos:
+        return
+    for nome in campos:
+        campo = objetos[0]._meta.get_field(nome)
+        if isinstance(campo, FileField):
+            for objeto in objetos:
+                campo.pre_save(objeto, add=False)
+
+def gravar_fichas(fichas):
+    """
+    Grava fichas já validadas pelo OcorrenciaWriteSerializer usando um
+    bulk_create por tabela (Ocorrência, Localização, Paciente e cada
+    OneToOne do paciente). O número de consultas não depende da quantidade
+    de fichas nem de pacientes. Os dicionários recebidos não são alterados.
+    Retorna as Ocorrências criadas, na mesma ordem.
+    """
+    ocorrencias, localizacoes, pacientes = [], [], []
+    aninhados = {model: [] for _, model in CAMPOS_ANINHADOS_PACIENTE}
+
+    for dados in fichas:
+        dados = dict(dados)
+        localizacao_data = dados.pop('localizacao')
+        pacientes_data = dados.pop('pacientes', None) or []
+
+        ocorrencia = Ocorrencia(**dados)
+        ocorrencias.append(ocorrencia)
+        localizacoes.append(Localizacao(ocorrencia=ocorrencia, **localizacao_data))
+
+        for paciente_data in pacientes_data:
+            paciente_data = dict(paciente_data)
+            paciente_data.pop('id', None)  # Na criação, todo paciente é novo
+            relacoes = [(model, paciente_data.pop(campo, None)) for campo, model in CAMPOS_ANINHADOS_PACIENTE]
+            paciente = Paciente(ocorrencia=ocorrencia, **paciente_data)
+            pacientes.append(paciente)
+            for model, relacao_data in relacoes:
+                if relacao_data:
+                    aninhados[model].append(model(paciente=paciente, **relacao_data))
+
+    # bulk_create preenche as FKs dos filhos a partir dos pais já salvos
+    with transaction.atomic():
+        Ocorrencia.objects.bulk_create(ocorrencias)
+        Localizacao.objects.bulk_create(localizacoes)
+        Paciente.objects.bulk_create(pacientes)
+        for model, objetos in aninhados.items():
+            if objetos:
+                model.objects.bulk_create(objetos)
+        # bulk_create não dispara post_save: registra no feed de sincronização
+        # (um INSERT para todas as tabelas) e avisa os interessados (ex: relatórios)
+        gravados = [*ocorrencias, *localizacoes, *pacientes, *(objeto for objetos in aninhados.values() for objeto in objetos)]
+        registrar(gravados)
+        ocorrencias_criadas_em_lote.send(sender=Ocorrencia, ocorrencias=ocorrencias)
+    agendar_derivadas_em_lote(gravados)
+    return ocorrencias
+
+MENSAGEM_NUM_REG_DUPLICADO = "Já existe uma ocorrência com este Número de Registro Central."
 
 class OcorrenciaWriteSerializer(serializers.ModelSerializer):
     """ Serializer de ESCRITA (POST/PUT) para Ocorrência """
+    equipe = PrimaryKeyEmLoteField(queryset=EquipePlantao.objects.all())
     localizacao = LocalizacaoSerializer()
-    pacientes = PacienteWriteSerializer(many=True, required=False)
-    
+    pacientes = PacienteAninhadoSerializer(many=True, required=False)
+
     class Meta:
         model = Ocorrencia
         fields = [
@@ -245,13 +630,16 @@ class OcorrenciaWriteSerializer(serializers.ModelSerializer):
             'status_final', 'data_hora_finalizacao', 'finalizada', 
             'observacoes_audio', 'localizacao', 'pacientes'
         ]
-        validators = [
-            # Validador de unicidade para 'num_reg_central'
-            UniqueValidator(
-                queryset=Ocorrencia.objects.all(),
-                message="Já existe uma ocorrência com este Número de Registro Central."
-            )
-        ]
+        extra_kwargs = {
+            # Validador de unicidade para 'num_reg_central', também contra o arquivo
+            # (validador de campo: em Meta.validators ele recebia a ficha inteira)
+            'num_reg_central': {
+                'validators': [
+                    UniqueValidator(queryset=Ocorrencia.objects.all(), message=MENSAGEM_NUM_REG_DUPLICADO),
+                    UniqueValidator(queryset=OcorrenciaArquivada.objects.all(), message=MENSAGEM_NUM_REG_DUPLICADO),
+                ]
+            },
+        }
 
     def validate(self, data):
         """ Validação Nível de Objeto """
@@ -264,57 +652,263 @@ class OcorrenciaWriteSerializer(serializers.ModelSerializer):
             
         return data
 
+    def validate_pacientes(self, value):
+        """
+        Na edição, cada 'id' deve ser de um paciente desta ficha, uma vez só.
+        Num PATCH, pacientes novos precisam dos campos obrigatórios.
+        """
+        if self.partial:
+            erros = validar_criacoes_parciais(
+                self.fields['pacientes'].child, [(paciente.get('id'), paciente) for paciente in value]
+            )
+            if any(erros):
+                raise serializers.ValidationError(erros)
+        ids = [paciente['id'] for paciente in value if 'id' in paciente]
+        if not ids or self.instance is None:
+            return value
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError("Paciente repetido na lista.")
+        desta_ficha = set(self.instance.pacientes.filter(pk__in=ids).values_list('pk', flat=True))
+        outros = sorted(set(ids) - desta_ficha)
+        if outros:
+            raise serializers.ValidationError(f"Pacientes que não são desta ficha: {outros}.")
+        return value
+
     def create(self, validated_data):
-        localizacao_data = validated_data.pop('localizacao')
-        pacientes_data = validated_data.pop('pacientes', [])
-        
-        ocorrencia = Ocorrencia.objects.create(**validated_data)
-        
-        # Cria a Localização associada
-        Localizacao.objects.create(ocorrencia=ocorrencia, **localizacao_data)
-        
-        # Cria os Pacientes associados
-        for paciente_data in pacientes_data:
-            # (Remove dados aninhados do paciente para criar separadamente)
-            pertences_data = paciente_data.pop('pertences', None)
-            info_data = paciente_data.pop('info_clinica', None)
-            dados_data = paciente_data.pop('dados_especificos', None)
-            
-            paciente = Paciente.objects.create(ocorrencia=ocorrencia, **paciente_data)
-            
-            if pertences_data:
-                PertencesPaciente.objects.create(paciente=paciente, **pertences_data)
-            if info_data:
-                InformacaoClinica.objects.create(paciente=paciente, **info_data)
-            if dados_data:
-                DadosEspecificosPaciente.objects.create(paciente=paciente, **dados_data)
-                
-        return ocorrencia
+        # Mesmo caminho da ingestão em lote: Ocorrência, Localização,
+        # Pacientes e dados aninhados, um INSERT por tabela
+        return gravar_fichas([validated_data])[0]
 
     def update(self, instance, validated_data):
         localizacao_data = validated_data.pop('localizacao', None)
-        pacientes_data = validated_data.pop('pacientes', None) # Lógica de update de pacientes é complexa
+        pacientes_data = validated_data.pop('pacientes', None)
+
+        with transaction.atomic():
+            # Atualiza a localização
+            if localizacao_data:
+                Localizacao.objects.update_or_create(
+                    ocorrencia=instance, defaults=localizacao_data
+                )
+            # Sem 'pacientes' na requisição (ex: PATCH), os pacientes ficam como estão
+            if pacientes_data is not None:
+                self._sincronizar_pacientes(instance, pacientes_data)
+            return super().update(instance, validated_data)
+
+    def _sincronizar_pacientes(self, instance, pacientes_data):
+        """
+        Reconcilia os pacientes da ficha pelo 'id' e grava em lote:
+        - sem 'id' -> bulk_create
+        - com 'id' -> bulk_update (só os campos recebidos)
+        - que não vieram mais -> delete
+        - OneToOne de todos -> upsert (gravar_dados_pacientes)
+        O número de consultas não depende da quantidade de pacientes
+        (exceto as exclusões, que disparam post_delete por registro).
+        """
+        existentes = {paciente.pk: paciente for paciente in instance.pacientes.all()}
+        novos, alterados, campos_alterados, aninhados = [], [], set(), []
+
+        for paciente_data in pacientes_data:
+            paciente_data = dict(paciente_data)
+            relacoes = {campo: paciente_data.pop(campo, None) for campo, _ in CAMPOS_ANINHADOS_PACIENTE}
+            pk = paciente_data.pop('id', None)
+            if pk is None:
+                paciente = Paciente(ocorrencia=instance, **paciente_data)
+                novos.append(paciente)
+            else:
+                paciente = existentes.pop(pk, None)
+                if paciente is None:  # Excluído depois da validação
+                    raise serializers.ValidationError({'pacientes': [f"Paciente {pk} não é desta ficha."]})
+                for campo, valor in paciente_data.items():
+                    setattr(paciente, campo, valor)
+                campos_alterados.update(paciente_data)
+                alterados.append(paciente)
+            aninhados.append((paciente, relacoes))
+
+        # O que sobrou em 'existentes' não veio na requisição
+        # (o delete do queryset dispara post_delete; os lotes são registrados aqui)
+        if existentes:
+            Paciente.objects.filter(pk__in=list(existentes)).delete()
+        if alterados and campos_alterados:
+            _gravar_arquivos(alterados, campos_alterados)
+            Paciente.objects.bulk_update(alterados, sorted(campos_alterados))
+        if novos:
+            Paciente.objects.bulk_create(novos)
+        if alterados or novos:
+            registrar(alterados + novos)
+            agendar_derivadas_em_lote(alterados + novos)
+        gravar_dados_pacientes(aninhados)
+        # O cache do prefetch ainda tem a lista antiga
+        getattr(instance, '_prefetched_objects_cache', {}).pop('pacientes', None)
+
+class OcorrenciaLoteSerializer(serializers.Serializer):
+    """
+    Ingestão em lote de fichas coletadas offline (POST /ocorrencias/lote/).
+    - Cada ficha é validada pelo OcorrenciaWriteSerializer, mas 'equipe' e a
+      unicidade do 'num_reg_central' são resolvidas com uma consulta para o
+      lote inteiro (e não uma por ficha).
+    - As fichas válidas são gravadas juntas (gravar_fichas).
+    - Uma ficha inválida não impede a gravação das demais: o resultado é um
+      relatório por ficha.
+    """
+    LIMITE_FICHAS = 100
+
+    fichas = serializers.ListField(
+        child=serializers.DictField(), allow_empty=False, max_length=LIMITE_FICHAS
+    )
 
-        # Atualiza a localização
-        if localizacao_data:
-            Localizacao.objects.update_or_create(
-                ocorrencia=instance, defaults=localizacao_data
+    def create(self, validated_data):
+        fichas = validated_data['fichas']
+        resultados = [None] * len(fichas)
+        validas = self._validar_fichas(fichas, resultados)
+        self._gravar(validas, resultados)
+        return resultados
+
+    def _validar_fichas(self, fichas, resultados):
+        equipe_field = OcorrenciaWriteSerializer().fields['equipe']
+        equipes = ListaEmLoteSerializer._carregar(equipe_field, [ficha.get('equipe') for ficha in fichas])
+        numeros = {str(ficha['num_reg_central']) for ficha in fichas if ficha.get('num_reg_central')}
+        existentes = set(
+            Ocorrencia.objects.filter(num_reg_central__in=numeros)
+            .values_list('num_reg_central', flat=True)
+            .union(
+                OcorrenciaArquivada.objects.filter(num_reg_central__in=numeros)
+                .values_list('num_reg_central', flat=True)
             )
-        
-        # (A lógica de atualização de pacientes aninhados é omitida por complexidade)
-        # (Recomendado: Criar endpoints separados para /ocorrencias/<id>/pacientes/)
-        
-        return super().update(instance, validated_data)
+        )
+
+        validas, vistos = [], set()
+        for indice, ficha in enumerate(fichas):
+            serializer = OcorrenciaWriteSerializer(data=ficha, context=self.context)
+            serializer.fields['equipe'].cache_em_lote = equipes
+            # A unicidade é verificada abaixo, contra o conjunto carregado
+            num_field = serializer.fields['num_reg_central']
+            num_field.validators = [v for v in num_field.validators if not isinstance(v, UniqueValidator)]
+
+            if not serializer.is_valid():
+                resultados[indice] = self._erro(indice, serializer.errors)
+                continue
+            numero = serializer.validated_data['num_reg_central']
+            if numero in existentes or numero in vistos:
+                resultados[indice] = self._erro(indice, {
+                    'num_reg_central': [MENSAGEM_NUM_REG_DUPLICADO]
+                })
+                continue
+            vistos.add(numero)
+            validas.append((indice, serializer.validated_data))
+        return validas
+
+    def _gravar(self, validas, resultados):
+        if not validas:
+            return
+        try:
+            with transaction.atomic():
+                ocorrencias = gravar_fichas([dados for _, dados in validas])
+            gravadas = [(indice, ocorrencia) for (indice, _), ocorrencia in zip(validas, ocorrencias)]
+        except IntegrityError:
+            # Conflito com uma gravação concorrente: grava ficha a ficha
+            # para isolar as que falharam
+            gravadas = []
+            for indice, dados in validas:
+                try:
+                    with transaction.atomic():
+                        gravadas.append((indice, gravar_fichas([dados])[0]))
+                except IntegrityError:
+                    resultados[indice] = self._erro(indice, {
+                        'num_reg_central': [MENSAGEM_NUM_REG_DUPLICADO]
+                    })
+
+        for indice, ocorrencia in gravadas:
+            resultados[indice] = {
+                'indice': indice,
+                'status': 'criada',
+                'id': ocorrencia.pk,
+                'num_reg_central': ocorrencia.num_reg_central,
+            }
+
+    @staticmethod
+    def _erro(indice, erros):
+        return {'indice': indice, 'status': 'erro', 'erros': erros}
 
 # --- Serializers Padrão (Restantes) ---
 
-class EquipePlantaoSerializer(serializers.ModelSerializer):
+class EquipePlantaoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = EquipePlantao
         fields = '__all__'
 
+class SaldoEstoqueSerializer(serializers.ModelSerializer):
+    """ Saldo atual de um item numa viatura (ver plantao/estoque.py). """
+    item = ItemInventarioSerializer(read_only=True)
+
+    class Meta:
+        model = SaldoEstoque
+        fields = ['id', 'vtr_sigla', 'item', 'quantidade', 'quantidade_contada', 'checklist', 'contado_em', 'atualizado_em']
+
+
+class FiltroSaldoEstoqueSerializer(serializers.Serializer):
+    """ Filtros de /saldos-estoque/ (query string). """
+    vtr = serializers.CharField(required=False, max_length=20)
+    limite = serializers.IntegerField(required=False)
+
+
 class RelatorioGerencialSerializer(serializers.ModelSerializer):
     class Meta:
         model = RelatorioGerencial
         fields = '__all__'
 
+class PeriodoRelatorioSerializer(serializers.Serializer):
+    """ Período opcional para o recálculo dos relatórios. """
+    inicio = serializers.DateField(required=False)
+    fim = serializers.DateField(required=False)
+
+    def validate(self, data):
+        if data.get('fim') and not data.get('inicio'):
+            raise serializers.ValidationError("Informe 'inicio' junto com 'fim'.")
+        if data.get('fim') and data['fim'] < data['inicio']:
+            raise serializers.ValidationError("'fim' deve ser posterior a 'inicio'.")
+        if data.get('fim') and (data['fim'] - data['inicio']).days + 1 > relatorios.MAXIMO_DIAS_API:
+            raise serializers.ValidationError(
+                f"O período pode ter no máximo {relatorios.MAXIMO_DIAS_API} dias; "
+                "para períodos maiores, use o comando gerar_relatorios."
+            )
+        return data
+
+class FiltroOcorrenciaSerializer(serializers.Serializer):
+    """ Valida os filtros da listagem/exportação de Ocorrências (query string). """
+    finalizada = serializers.BooleanField(required=False)
+    equipe = serializers.IntegerField(required=False, min_value=1)
+    bairro = serializers.CharField(required=False, max_length=50)
+    data_inicio = serializers.DateField(required=False)
+    data_fim = serializers.DateField(required=False)
+    minhas_equipes = serializers.BooleanField(required=False)
+
+    def validate(self, data):
+        if data.get('data_inicio') and data.get('data_fim') and data['data_fim'] < data['data_inicio']:
+            raise serializers.ValidationError("'data_fim' deve ser posterior a 'data_inicio'.")
+        return data
+
+
+class UploadAudioSerializer(serializers.ModelSerializer):
+    """ Envio retomável do áudio da ocorrência (ver api/audio.py). """
+    concluido = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadAudio
+        fields = ['id', 'ocorrencia', 'nome_arquivo', 'tamanho', 'sha256', 'offset', 'concluido', 'criado_em']
+        read_only_fields = ['ocorrencia', 'offset', 'criado_em']
+
+    def get_concluido(self, obj):
+        return obj.concluido_em is not None
+
+    def validate_tamanho(self, value):
+        if not 0 < value <= audio.TAMANHO_MAXIMO:
+            raise serializers.ValidationError(
+                f"O áudio deve ter entre 1 byte e {audio.TAMANHO_MAXIMO // (1024 * 1024)} MB."
+            )
+        return value
+
+    def validate_sha256(self, value):
+        value = value.lower()
+        if len(value) != 64 or any(c not in '0123456789abcdef' for c in value):
+            raise serializers.ValidationError("Informe o SHA-256 do arquivo em hexadecimal.")
+        return value
@@ -0,0 +1,111 @@
+from functools import partial
+
+from django.db import transaction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.contrib.auth.models import Group
+from django.db.models.signals import post_delete, post_save
+
+from apps.plantao.models import EquipePlantao, ItemInventario, ChecklistStatus, ChecklistDetalhe
+from apps.ocorrencias.models import Ocorrencia, Localizacao, MaterialUtilizado, ApoioOcorrencia
+from apps.pacientes.models import Paciente, PertencesPaciente, InformacaoClinica, DadosEspecificosPaciente
+from .models import RegistroAlteracao
+from .sincronizacao import registrar
+from . import catalogo, congelamento, fotos, metricas
+
+# --- Feed de Sincronização (ver api/sincronizacao.py) ---
+#
+# Toda gravação/exclusão de um model sincronizado vira uma linha no feed.
+# As exclusões em cascata (ex: o paciente e seus dados ao excluir a
+# ocorrência) disparam post_delete para cada registro, então cada um ganha
+# seu tombstone. Gravações em lote (bulk_create/bulk_update) não disparam
+# sinais: quem as faz chama 'registrar' diretamente.
+
+MODELOS_SINCRONIZADOS = [
+    Ocorrencia, Localizacao, MaterialUtilizado, ApoioOcorrencia,
+    Paciente, PertencesPaciente, InformacaoClinica, DadosEspecificosPaciente,
+    EquipePlantao, ItemInventario, ChecklistStatus, ChecklistDetalhe,
+]
+
+
+def registrar_gravacao(sender, instance, **kwargs):
+    registrar([instance])
+
+
+def registrar_exclusao(sender, instance, **kwargs):
+    registrar([instance], RegistroAlteracao.EXCLUIDO)
+
+
+for _model in MODELOS_SINCRONIZADOS:
+    post_save.connect(registrar_gravacao, sender=_model)
+    post_delete.connect(registrar_exclusao, sender=_model)
+
+
+# --- Derivadas das Fotos (ver api/fotos.py) ---
+#
+# Um upload novo sempre ganha um nome novo no storage, então basta comparar
+# com a marca do model (sem consultar o storage no salvamento). A geração
+# começa só depois do commit (a foto pode ser descartada num rollback).
+
+CAMPOS_FOTO = {
+    Localizacao: ['foto_local'],
+    Paciente: ['foto_recusa'],
+    PertencesPaciente: ['foto_pertences'],
+    ChecklistStatus: ['foto_vtr'],
+}
+
+
+def agendar_derivadas(sender, instance, **kwargs):
+    for campo in CAMPOS_FOTO[sender]:
+        arquivo = getattr(instance, campo)
+        if arquivo and not fotos.geradas(arquivo):
+            transaction.on_commit(partial(fotos.agendar, sender, campo, arquivo.name))
+
+
+def agendar_derivadas_em_lote(objetos):
+    """ Para gravações em lote (bulk_create/bulk_update), que não disparam post_save. """
+    for objeto in objetos:
+        if type(objeto) in CAMPOS_FOTO:
+            agendar_derivadas(type(objeto), objeto)
+
+
+for _model in CAMPOS_FOTO:
+    post_save.connect(agendar_derivadas, sender=_model)
+
+
+# --- Versão do Catálogo de Inventário (ver api/catalogo.py) ---
+#
+# Incrementa já e de novo após o commit: entre os dois, uma leitura
+# concorrente ainda vê os dados antigos e pode guardá-los na versão nova.
+
+def invalidar_catalogo(sender, **kwargs):
+    catalogo.invalidar()
+    transaction.on_commit(catalogo.invalidar)
+
+
+for _model in (ItemInventario, Group):
+    post_save.connect(invalidar_catalogo, sender=_model)
+    post_delete.connect(invalidar_catalogo, sender=_model)
+
+
+# --- Fichas Congeladas (ver api/congelamento.py) ---
+#
+# Equipe, item ou usuário renomeado: as fichas que os mostram deixam de
+# valer. A ficha em si não muda, então a versão não pega isso.
+
+def descartar_fichas_congeladas(sender, instance, created, update_fields=None, **kwargs):
+    campos, _ = congelamento.REFERENCIAS[sender]
+    if created or (update_fields is not None and not set(update_fields) & set(campos)):
+        return  # Ex: só o 'last_login' do usuário
+    congelamento.descartar(sender, instance.pk)
+
+
+for _model in congelamento.REFERENCIAS:
+    post_save.connect(descartar_fichas_congeladas, sender=_model)
+
+
+# --- Métricas das Consultas SQL (ver api/metricas.py) ---
+
+connection_created.connect(metricas.instalar_em_conexao)
+for _conexao in connections.all(initialized_only=True):
+    metricas.instalar_em_conexao(None, _conexao)
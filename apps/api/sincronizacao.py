@@ -0,0 +1,190 @@
+import base64
+import binascii
+import json
+from datetime import timedelta
+from functools import lru_cache
+from operator import attrgetter
+
+from django.contrib.postgres.search import SearchVectorField
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Exists, OuterRef, Subquery
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.exceptions import APIException, NotFound
+
+from .models import RegistroAlteracao
+
+# --- Feed de Alterações (sincronização incremental dos tablets) ---
+#
+# Cada gravação num model sincronizado gera uma linha em RegistroAlteracao
+# (sinais em api/signals.py; gravações em lote chamam 'registrar'). O feed
+# devolve, desde a posição guardada no token, os registros atuais dos
+# objetos criados/alterados e os ids dos excluídos (tombstones), agrupados
+# por tabela, sem depender do tamanho do banco.
+#
+# Os atualizados passam pelo get_queryset de cada ViewSet; um tombstone
+# não tem mais o registro para filtrar. Nas tabelas em que o usuário não
+# gerencial só vê os próprios registros (DONOS), a exclusão guarda o dono
+# e o tombstone só vai para ele (e para o Gerencial, que vê tudo). Nas
+# demais, todo usuário vê todos os registros, e os tombstones também.
+
+LIMITE_REGISTROS = 1000
+# Transações que gravaram antes mas confirmaram depois podem ter ids menores
+# que os já lidos: o token só avança até as alterações com mais que isso de idade
+# (as mais recentes voltam no próximo feed; o cliente grava por id, então repetir é inofensivo).
+JANELA_SEGURANCA = timedelta(seconds=30)
+# Registros mais antigos que isso podem ser removidos (compactar_alteracoes);
+# um token mais velho exige sincronização completa.
+RETENCAO = timedelta(days=30)
+# Tabela -> caminho até o dono do registro (o mesmo filtro dos get_queryset)
+DONOS = {
+    'plantao.checkliststatus': 'usuario_id',
+    'plantao.checklistdetalhe': 'checklist.usuario_id',
+    'ocorrencias.materialutilizado': 'usuario_id',
+}
+
+
+class TokenExpirado(APIException):
+    status_code = 410
+    default_detail = 'Token de sincronização expirado: faça a sincronização completa.'
+    default_code = 'token_expirado'
+
+
+def _dono(objeto, tabela):
+    """ Dono de um registro excluído de uma tabela de DONOS (None se não der para saber). """
+    try:
+        return attrgetter(DONOS[tabela])(objeto)
+    except ObjectDoesNotExist:
+        return None
+
+
+def registrar(objetos, operacao=RegistroAlteracao.ATUALIZADO):
+    """ Registra, num único INSERT, a alteração de vários objetos (de qualquer model). """
+    agora = timezone.now()
+    linhas = []
+    for objeto in objetos:
+        tabela = objeto._meta.label_lower
+        dono = _dono(objeto, tabela) if operacao == RegistroAlteracao.EXCLUIDO and tabela in DONOS else None
+        linhas.append(RegistroAlteracao(
+            tabela=tabela, objeto_id=objeto.pk, operacao=operacao, criado_em=agora, dono=dono,
+        ))
+    RegistroAlteracao.objects.bulk_create(linhas)
+
+
+# --- Token ---
+
+def gerar_token(posicao):
+    dados = json.dumps({'p': posicao, 't': int(timezone.now().timestamp())}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(dados.encode('utf-8')).decode('ascii')
+
+
+def ler_token(token):
+    """ Retorna a posição (id do último registro lido) guardada no token. """
+    try:
+        dados = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        posicao, emitido = int(dados['p']), int(dados['t'])
+    except (TypeError, ValueError, KeyError, binascii.Error, UnicodeEncodeError):
+        raise NotFound('Token de sincronização inválido.')
+    if timezone.now().timestamp() - emitido > RETENCAO.total_seconds():
+        raise TokenExpirado()
+    return posicao
+
+
+def ultima_alteracao(model):
+    """ Subconsulta: id do último registro do feed da tabela de 'model'. """
+    return Subquery(
+        RegistroAlteracao.objects.filter(tabela=model._meta.label_lower).order_by('-id').values('id')[:1]
+    )
+
+
+def token_atual():
+    """ Token para começar a sincronizar a partir de agora (após a carga completa). """
+    ultimo = RegistroAlteracao.objects.order_by('-id').values_list('id', flat=True).first()
+    return gerar_token(ultimo or 0)
+
+
+# --- Feed ---
+
+@lru_cache(maxsize=None)
+def serializer_plano(model):
+    """ Serializer 'achatado' do model: todos os campos, FKs como ids (sem colunas internas de busca). """
+    excluir = [campo.name for campo in model._meta.concrete_fields if isinstance(campo, SearchVectorField)]
+    opcoes = {'model': model}
+    if excluir:
+        opcoes['exclude'] = excluir
+    else:
+        opcoes['fields'] = '__all__'
+    meta = type('Meta', (), opcoes)
+    return type(f'{model.__name__}SincronizacaoSerializer', (serializers.ModelSerializer,), {'Meta': meta})
+
+
+def montar_feed(posicao, consultas, contexto, usuario):
+    """
+    'consultas': {model: queryset dos objetos que o usuário pode ver}.
+    Tombstones das tabelas de DONOS só do próprio 'usuario' (exceto Gerencial).
+    Retorna {'token', 'mais', 'alteracoes': {tabela: {'atualizados': [...], 'excluidos': [ids]}}}.
+    """
+    modelos = {model._meta.label_lower: model for model in consultas}
+    registros = list(
+        RegistroAlteracao.objects
+        .filter(id__gt=posicao, tabela__in=list(modelos))
+        .order_by('id')
+        .values_list('id', 'tabela', 'objeto_id', 'operacao', 'criado_em', 'dono')[:LIMITE_REGISTROS + 1]
+    )
+    mais = len(registros) > LIMITE_REGISTROS
+    registros = registros[:LIMITE_REGISTROS]
+
+    # Só a última operação de cada objeto importa
+    ultimas = {}
+    for _, tabela, objeto_id, operacao, _, dono in registros:
+        ultimas[(tabela, objeto_id)] = (operacao, dono)
+
+    ve_tudo = usuario.is_gerencial
+    alteracoes = {}
+    for tabela, model in modelos.items():
+        atualizados = [
+            i for (t, i), (op, _) in ultimas.items() if t == tabela and op == RegistroAlteracao.ATUALIZADO
+        ]
+        excluidos = [
+            i for (t, i), (op, dono) in ultimas.items()
+            if t == tabela and op == RegistroAlteracao.EXCLUIDO
+            and (ve_tudo or tabela not in DONOS or dono == usuario.pk)
+        ]
+        if not (atualizados or excluidos):
+            continue
+        # Objetos excluídos depois (próximas páginas) ou que o usuário não vê ficam de fora
+        objetos = consultas[model].filter(pk__in=atualizados).order_by('pk') if atualizados else []
+        alteracoes[tabela] = {
+            'atualizados': serializer_plano(model)(objetos, many=True, context=contexto).data,
+            'excluidos': sorted(excluidos),
+        }
+
+    # Avança o token só até o último registro fora da JANELA_SEGURANCA, mesmo
+    # com mais páginas (os recentes voltam na próxima). Só quando nenhum da
+    # página está fora dela, e há mais páginas, avança até o fim da página:
+    # sem isso, mais de LIMITE_REGISTROS recentes nunca sairiam do lugar.
+    limite = timezone.now() - JANELA_SEGURANCA
+    antigos = [registro_id for registro_id, _, _, _, criado_em, _ in registros if criado_em <= limite]
+    if antigos:
+        nova_posicao = antigos[-1]
+    elif mais:
+        nova_posicao = registros[-1][0]
+    else:
+        nova_posicao = posicao
+    return {'token': gerar_token(nova_posicao), 'mais': mais, 'alteracoes': alteracoes}
+
+
+# --- Compactação ---
+
+def compactar(retencao=RETENCAO):
+    """
+    Remove as linhas substituídas por uma alteração mais nova do mesmo
+    registro (o feed só usa a última) e as mais antigas que a retenção
+    (tokens dessa idade já são recusados). Retorna o total removido.
+    """
+    mais_nova = RegistroAlteracao.objects.filter(
+        tabela=OuterRef('tabela'), objeto_id=OuterRef('objeto_id'), id__gt=OuterRef('id'),
+    )
+    substituidas, _ = RegistroAlteracao.objects.filter(Exists(mais_nova)).delete()
+    antigas, _ = RegistroAlteracao.objects.filter(criado_em__lt=timezone.now() - retencao).delete()
+    return substituidas + antigas
@@ -0,0 +1,72 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import connections
+
+# --- Tarefas em Segundo Plano ---
+#
+# Pool de threads do processo para trabalho que não precisa atrasar a
+# resposta (derivadas das fotos, metadados dos áudios). Quem agenda deve
+# fazê-lo no commit da transação (transaction.on_commit), para a tarefa
+# enxergar o que foi gravado. Cada tarefa fecha as conexões com o banco
+# que abriu na thread. Com TAREFAS_SINCRONAS = True (testes), a tarefa
+# roda na hora, na própria thread.
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pendentes = set()
+_lock = threading.Lock()
+
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'TAREFAS_THREADS', 2),
+                thread_name_prefix='tarefas',
+            )
+        return _executor
+
+
+def _executar(funcao, args):
+    try:
+        return funcao(*args)
+    except Exception:
+        logger.exception('Falha na tarefa em segundo plano %s', funcao.__qualname__)
+        raise
+    finally:
+        connections.close_all()
+
+
+def agendar(funcao, *args):
+    """ Executa funcao(*args) no pool. Retorna o Future. """
+    if getattr(settings, 'TAREFAS_SINCRONAS', False):
+        tarefa = Future()
+        try:
+            tarefa.set_result(funcao(*args))
+        except Exception as erro:
+            logger.exception('Falha na tarefa %s', funcao.__qualname__)
+            tarefa.set_exception(erro)
+        return tarefa
+
+    tarefa = _pool().submit(_executar, funcao, args)
+    with _lock:
+        _pendentes.add(tarefa)
+    tarefa.add_done_callback(_concluida)
+    return tarefa
+
+
+def _concluida(tarefa):
+    with _lock:
+        _pendentes.discard(tarefa)
+
+
+def aguardar(timeout=None):
+    """ Espera as tarefas agendadas até agora terminarem. """
+    with _lock:
+        pendentes = list(_pendentes)
+    wait(pendentes, timeout=timeout)
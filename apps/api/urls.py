@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import async_views, views
 
 # Cria um roteador padrão do DRF
 router = DefaultRouter()
@@ -12,6 +12,7 @@ router.register(r'equipes', views.EquipePlantaoViewSet, basename='equipe')
 router.register(r'itens-inventario', views.ItemInventarioViewSet, basename='item-inventario') # Correção aqui
 router.register(r'checklists', views.ChecklistStatusViewSet, basename='checklist')
 router.register(r'checklist-detalhes', views.ChecklistDetalheViewSet, basename='checklist-detalhe')
+router.register(r'saldos-estoque', views.SaldoEstoqueViewSet, basename='saldo-estoque')
 router.register(r'ocorrencias', views.OcorrenciaViewSet, basename='ocorrencia')
 router.register(r'localizacoes', views.LocalizacaoViewSet, basename='localizacao')
 router.register(r'materiais-utilizados', views.MaterialUtilizadoViewSet, basename='material-utilizado')
@@ -21,9 +22,19 @@ router.register(r'pertences', views.PertencesPacienteViewSet, basename='pertence
 router.register(r'info-clinicas', views.InformacaoClinicaViewSet, basename='info-clinica')
 router.register(r'dados-especificos', views.DadosEspecificosPacienteViewSet, basename='dados-especificos')
 router.register(r'relatorios', views.RelatorioGerencialViewSet, basename='relatorio')
+router.register(r'uploads-audio', views.UploadAudioViewSet, basename='upload-audio')
+router.register(r'sincronizacao', views.SincronizacaoViewSet, basename='sincronizacao')
+router.register(r'metricas', views.MetricasViewSet, basename='metricas')
 
 # As URLs da API são determinadas automaticamente pelo roteador
 urlpatterns = [
     path('', include(router.urls)),
+
+    # Leituras assíncronas (ASGI) dos endpoints consultados pelos painéis
+    # Mesmas permissões, filtros e respostas das versões síncronas acima
+    path('async/ocorrencias/', async_views.OcorrenciaListaAsync.as_view(), name='async-ocorrencia-list'),
+    path('async/ocorrencias/<int:pk>/', async_views.OcorrenciaDetalheAsync.as_view(), name='async-ocorrencia-detail'),
+    path('async/equipes/hoje/', async_views.EquipesHojeAsync.as_view(), name='async-equipe-hoje'),
+    path('async/itens-inventario/', async_views.ItemInventarioListaAsync.as_view(), name='async-item-inventario-list'),
 ]
 
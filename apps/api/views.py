@@ -1,20 +1,32 @@
+import heapq
+
 from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
 from rest_framework.response import Response
-from django.db.models import Q
+from django.db import connection
+from django.db.models import F, Prefetch, Q, Window
+from django.db.models.functions import RowNumber
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from django.contrib.auth.models import Group
 
 # Importando Modelos
+from apps.users import roles
 from apps.users.models import Usuario
 from apps.plantao.models import (
-    EquipePlantao, ItemInventario, ChecklistStatus, ChecklistDetalhe
+    EquipePlantao, ItemInventario, ChecklistStatus, ChecklistDetalhe, SaldoEstoque
 )
 from apps.ocorrencias.models import (
-    Ocorrencia, Localizacao, MaterialUtilizado, ApoioOcorrencia
+    Ocorrencia, Localizacao, MaterialUtilizado, ApoioOcorrencia, OcorrenciaArquivada
 )
+from apps.ocorrencias import arquivo
 from apps.pacientes.models import (
     Paciente, PertencesPaciente, InformacaoClinica, DadosEspecificosPaciente
 )
 from apps.dashboard.models import RelatorioGerencial
+from apps.dashboard import relatorios
 
 # Importando Serializers
 from . import serializers
@@ -22,9 +34,19 @@ from . import serializers
 # Importando Permissões Customizadas
 from .permissions import IsAdminOrGerencial, IsAssistencialSafe, IsOwnerOrGerencial
 
+# Importando Mixins
+from .mixins import ConditionalGetMixin, EscritaAtomicaMixin, FichaCongeladaMixin, QueryPlanEscritaMixin, QueryPlanMixin
+from .filters import OcorrenciaFilterBackend
+from .pagination import BuscaPagination
+from .query_plan import aplicar_plano
+from .models import UploadAudio
+from .parsers import TrechoBinarioParser
+from .renderers import PrometheusRenderer
+from . import audio, busca, catalogo, exportacao, metricas, sincronizacao
+
 # --- ViewSets ---
 
-class UsuarioViewSet(viewsets.ReadOnlyModelViewSet):
+class UsuarioViewSet(QueryPlanMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint para listar Usuários (apenas leitura).
     Apenas Gerencial/Admin podem ver.
@@ -33,7 +55,7 @@ class UsuarioViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = serializers.UsuarioSerializer
     permission_classes = [IsAdminOrGerencial] # Apenas Gerencial/Admin
 
-class EquipePlantaoViewSet(viewsets.ModelViewSet):
+class EquipePlantaoViewSet(ConditionalGetMixin, QueryPlanEscritaMixin, viewsets.ModelViewSet):
     """
     API endpoint para Equipes de Plantão.
     Assistencial pode criar/ler. Gerencial pode tudo.
@@ -41,8 +63,31 @@ class EquipePlantaoViewSet(viewsets.ModelViewSet):
     queryset = EquipePlantao.objects.all()
     serializer_class = serializers.EquipePlantaoSerializer
     permission_classes = [IsAssistencialSafe] # Assistencial pode criar/ler
+    cursor_ordering = ('-data_plantao', '-id')
+
+    def consulta_hoje(self):
+        """ Equipes do plantão de hoje (data local). """
+        return self.filter_queryset(self.get_queryset()).filter(data_plantao=timezone.localdate()).order_by('vtr_sigla', 'id')
+
+    @action(detail=False, methods=['get'], url_path='hoje')
+    def hoje(self, request):
+        """ Equipes do plantão de hoje, sem paginação (poucas linhas). """
+        return Response(self.get_serializer(self.consulta_hoje(), many=True).data)
+
+    @action(detail=False, methods=['get'], url_path='minha-atual')
+    def minha_atual(self, request):
+        """
+        A equipe do usuário no plantão de hoje, pelo índice de membros
+        (ver plantao/membros.py). 404 se ele não está escalado hoje.
+        """
+        equipe = self.filter_queryset(self.get_queryset()).filter(
+            membros__usuario=request.user, membros__data_plantao=timezone.localdate(),
+        ).order_by('-id').first()
+        if equipe is None:
+            raise NotFound('Você não está escalado em nenhuma equipe hoje.')
+        return Response(self.get_serializer(equipe).data)
 
-class ItemInventarioViewSet(viewsets.ModelViewSet):
+class ItemInventarioViewSet(ConditionalGetMixin, QueryPlanEscritaMixin, viewsets.ModelViewSet):
     """
     API endpoint para Itens de Inventário.
     - Filtra itens pelo grupo do usuário (ex: Médico só vê itens de Médico).
@@ -50,6 +95,8 @@ class ItemInventarioViewSet(viewsets.ModelViewSet):
     """
     serializer_class = serializers.ItemInventarioSerializer
     permission_classes = [IsAdminOrGerencial] # Apenas Gerencial/Admin gerencia itens
+    cursor_ordering = ('nome_item', 'id')
+    page_size = 200 # Catálogo pequeno, cabe numa página
 
     def get_queryset(self):
         """
@@ -75,7 +122,48 @@ class ItemInventarioViewSet(viewsets.ModelViewSet):
         
         return ItemInventario.objects.none()
 
-class ChecklistStatusViewSet(viewsets.ModelViewSet):
+    # --- Catálogo em cache (ver api/catalogo.py) ---
+
+    def catalogo_em_cache(self, request):
+        """
+        (chave, entrada) do catálogo para esta requisição. A chave é None se
+        a leitura não é cacheável; a entrada, None se ainda não está no cache.
+        """
+        renderer = getattr(request, 'accepted_renderer', None)
+        if request.query_params or getattr(renderer, 'format', None) != 'json':
+            return None, None
+        user = request.user
+        grupos = '*' if user.is_gerencial else '|'.join(sorted(roles.nomes_grupos(user)))
+        chave = catalogo.chave(grupos, request.get_host(), request.path)
+        return chave, catalogo.ler(chave)
+
+    def guardar_catalogo(self, request, chave, resposta):
+        conteudo = request.accepted_renderer.render(
+            resposta.data, request.accepted_media_type, self.get_renderer_context()
+        )
+        return catalogo.gravar(chave, conteudo)
+
+    def resposta_catalogo(self, request, entrada):
+        etag, conteudo = entrada
+        resposta = self._nao_modificado(request, etag, None)
+        if resposta is not None:
+            return resposta
+        resposta = HttpResponse(conteudo, content_type=request.accepted_renderer.media_type)
+        return self._aplicar_validadores(resposta, etag, None)
+
+    def list(self, request, *args, **kwargs):
+        chave, entrada = self.catalogo_em_cache(request)
+        if chave is None:
+            return super().list(request, *args, **kwargs)
+        if entrada is None:
+            # Sem os validadores do ConditionalGetMixin: o ETag passa a ser o da entrada
+            resposta = super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+            if resposta.status_code != status.HTTP_200_OK:
+                return resposta
+            entrada = self.guardar_catalogo(request, chave, resposta)
+        return self.resposta_catalogo(request, entrada)
+
+class ChecklistStatusViewSet(QueryPlanEscritaMixin, viewsets.ModelViewSet):
     """
     API endpoint para o Checklist (Cabeçalho).
     - Assistencial pode criar/ler/editar OS SEUS PRÓPRIOS checklists.
@@ -84,6 +172,9 @@ class ChecklistStatusViewSet(viewsets.ModelViewSet):
     queryset = ChecklistStatus.objects.all()
     # Usa permissão de "Dono"
     permission_classes = [IsOwnerOrGerencial]
+    cursor_ordering = ('-data_hora', '-id')
+    include_count = False # Tabela grande: COUNT(*) só com ?count=true
+    STATUS_ALERTA = ('VERMELHO', 'AMARELO')
 
     def get_serializer_class(self):
         """
@@ -92,6 +183,8 @@ class ChecklistStatusViewSet(viewsets.ModelViewSet):
         """
         if self.action in ['list', 'retrieve']:
             return serializers.ChecklistStatusSerializer
+        if self.action == 'ultimos':
+            return serializers.ChecklistUltimoSerializer
         
         # Para POST/PUT/PATCH (Ação de escrita)
         # (Idealmente, criaríamos um WriteSerializer simples)
@@ -118,7 +211,37 @@ class ChecklistStatusViewSet(viewsets.ModelViewSet):
         """
         serializer.save(usuario=self.request.user)
 
-class ChecklistDetalheViewSet(viewsets.ModelViewSet):
+    def consulta_ultimos(self):
+        """
+        O checklist mais recente de cada viatura (equipe__vtr_sigla), entre
+        os visíveis ao usuário: DISTINCT ON no PostgreSQL; nos demais bancos,
+        ROW_NUMBER() por viatura.
+        """
+        queryset = self.get_queryset()
+        if connection.vendor == 'postgresql':
+            ultimos = queryset.order_by('equipe__vtr_sigla', '-data_hora', '-id').distinct('equipe__vtr_sigla')
+        else:
+            ultimos = queryset.annotate(posicao=Window(
+                RowNumber(), partition_by=F('equipe__vtr_sigla'), order_by=(F('data_hora').desc(), F('id').desc()),
+            )).filter(posicao=1)
+        return queryset.filter(pk__in=ultimos.values('pk')).order_by('equipe__vtr_sigla')
+
+    @action(detail=False, methods=['get'], url_path='ultimos')
+    def ultimos(self, request):
+        """
+        Último checklist de cada viatura com os itens em alerta (VERMELHO
+        primeiro, depois AMARELO). Sem paginação: uma linha por viatura.
+        """
+        alertas = aplicar_plano(
+            ChecklistDetalhe.objects.filter(status_alerta__in=self.STATUS_ALERTA).order_by('-status_alerta', 'item__nome_item', 'id'),
+            serializers.ChecklistDetalheSerializer(),
+        )
+        queryset = self.filter_queryset(self.consulta_ultimos()).prefetch_related(
+            Prefetch('detalhes', queryset=alertas, to_attr='alertas')
+        )
+        return Response(self.get_serializer(queryset, many=True).data)
+
+class ChecklistDetalheViewSet(EscritaAtomicaMixin, QueryPlanEscritaMixin, viewsets.ModelViewSet):
     """
     API endpoint para os Itens (Detalhes) de um Checklist.
     (Permissão é herdada do 'pai', o ChecklistStatus)
@@ -143,13 +266,21 @@ class ChecklistDetalheViewSet(viewsets.ModelViewSet):
         # Assistencial vê apenas detalhes de checklists que ele assinou
         return ChecklistDetalhe.objects.filter(checklist__usuario=user)
 
-class OcorrenciaViewSet(viewsets.ModelViewSet):
+class OcorrenciaViewSet(
+    EscritaAtomicaMixin, FichaCongeladaMixin, ConditionalGetMixin, QueryPlanEscritaMixin, viewsets.ModelViewSet
+):
     """
     API endpoint para Ocorrências.
     Usa serializers diferentes para Leitura e Escrita.
+    Fichas finalizadas são lidas da representação congelada (ver api/congelamento.py).
     """
     queryset = Ocorrencia.objects.all()
+    serializer_congelado = serializers.OcorrenciaReadSerializer
     permission_classes = [IsAssistencialSafe] # Assistencial pode criar/ler
+    filter_backends = [OcorrenciaFilterBackend] # Filtros da listagem e da exportação
+    cursor_ordering = ('-data_hora_inicio', '-id')
+    page_size = 25
+    include_count = False # Tabela grande: COUNT(*) só com ?count=true
 
     def get_serializer_class(self):
         """
@@ -157,7 +288,9 @@ class OcorrenciaViewSet(viewsets.ModelViewSet):
         - GET: Usa OcorrenciaReadSerializer (mostra tudo aninhado)
         - POST/PUT/PATCH: Usa OcorrenciaWriteSerializer (valida e salva)
         """
-        if self.action in ['list', 'retrieve']:
+        if self.action == 'busca':
+            return serializers.OcorrenciaBuscaSerializer
+        if self.action in ['list', 'retrieve', 'exportar']:
             return serializers.OcorrenciaReadSerializer
         return serializers.OcorrenciaWriteSerializer
 
@@ -172,7 +305,135 @@ class OcorrenciaViewSet(viewsets.ModelViewSet):
         
         return Ocorrencia.objects.all()
 
-class LocalizacaoViewSet(viewsets.ModelViewSet):
+    def consulta_arquivo(self):
+        """ Fichas arquivadas visíveis (ver ocorrencias/arquivo.py): as mesmas regras de get_queryset. """
+        if not self.request.user.is_authenticated:
+            return OcorrenciaArquivada.objects.none()
+        return OcorrenciaArquivada.objects.all()
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        if serializer.instance.finalizada:
+            self.congelar_fichas([serializer.instance.pk])
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        if serializer.instance.finalizada:
+            self.congelar_fichas([serializer.instance.pk])
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            return self.detalhe_arquivado(request)
+
+    def detalhe_arquivado(self, request):
+        """
+        Detalhe de uma ficha que já saiu para o arquivo: mesmo formato e
+        mesmos validadores (ETag/Last-Modified) de quando estava nas tabelas.
+        Fichas arquivadas são só leitura: PUT/PATCH/DELETE continuam 404.
+        """
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        arquivada = get_object_or_404(self.consulta_arquivo(), pk=self.kwargs[lookup_url_kwarg])
+        etag = self._etag(request, arquivada.atualizado_em, 1)
+        return self._responder(
+            request, etag, arquivada.atualizado_em,
+            lambda: Response(self.get_serializer(arquivo.montar([arquivada])[0]).data),
+        )
+
+    @action(detail=False, methods=['post'], url_path='lote')
+    def lote(self, request):
+        """
+        Ingestão em lote de fichas coletadas offline.
+        Aceita uma lista de fichas (ou {"fichas": [...]}) no mesmo formato do
+        POST /ocorrencias/ e responde com o resultado de cada ficha:
+        - 201: todas as fichas foram criadas
+        - 207: parte das fichas tem erros (ver 'resultados')
+        """
+        dados = {'fichas': request.data} if isinstance(request.data, list) else request.data
+        serializer = serializers.OcorrenciaLoteSerializer(
+            data=dados, context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+        resultados = serializer.save()
+        self.congelar_fichas([resultado['id'] for resultado in resultados if resultado['status'] == 'criada'])
+
+        criadas = sum(1 for resultado in resultados if resultado['status'] == 'criada')
+        return Response(
+            {
+                'total': len(resultados),
+                'criadas': criadas,
+                'erros': len(resultados) - criadas,
+                'resultados': resultados,
+            },
+            status=status.HTTP_201_CREATED if criadas == len(resultados) else status.HTTP_207_MULTI_STATUS,
+        )
+
+    @action(detail=False, methods=['get'], url_path='busca', pagination_class=BuscaPagination)
+    def busca(self, request):
+        """
+        Busca por texto livre: ?q=<termo>
+        Procura no tipo da ocorrência, nº de registro, endereço e nome dos
+        pacientes; resultados ordenados por relevância e paginados por
+        número de página (?page=). Aceita os filtros da listagem.
+        """
+        termo = request.query_params.get('q', '').strip()
+        if len(termo) < busca.TAMANHO_MINIMO:
+            raise ValidationError({'q': f'Informe ao menos {busca.TAMANHO_MINIMO} caracteres.'})
+
+        queryset = busca.buscar_ocorrencias(self.filter_queryset(self.get_queryset()), termo)
+        pagina = self.paginate_queryset(queryset.order_by('-relevancia', '-data_hora_inicio', '-id'))
+        serializer = self.get_serializer(pagina, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'], url_path='exportar', permission_classes=[IsAdminOrGerencial])
+    def exportar(self, request):
+        """
+        Exporta as fichas (com pacientes, materiais e apoios) em streaming.
+        - ?formato=ndjson (padrão): um JSON por linha
+        - ?formato=csv: uma linha por paciente
+        Aceita os mesmos filtros da listagem e ?fields=/?expand=.
+        Inclui as fichas arquivadas, intercaladas na mesma ordem.
+        A memória usada não depende da quantidade de fichas exportadas.
+        """
+        formato = request.query_params.get('formato', 'ndjson')
+        if formato not in ('ndjson', 'csv'):
+            raise ValidationError({'formato': "Use 'ndjson' ou 'csv'."})
+
+        queryset = self.filter_queryset(self.get_queryset()).order_by(*self.cursor_ordering)
+        arquivadas = OcorrenciaFilterBackend().filtrar_arquivo(request, self.consulta_arquivo())
+        # As duas origens vêm em ordem decrescente de (início, id): basta intercalar
+        fichas = heapq.merge(
+            queryset.iterator(chunk_size=exportacao.TAMANHO_BLOCO),
+            arquivo.iterar(arquivadas.order_by(*self.cursor_ordering), exportacao.TAMANHO_BLOCO),
+            key=lambda ficha: (ficha.data_hora_inicio, ficha.pk), reverse=True,
+        )
+        serializer = self.get_serializer()
+        if formato == 'csv':
+            linhas = exportacao.linhas_csv(fichas, serializer, explodir='pacientes')
+            tipo = 'text/csv; charset=utf-8'
+        else:
+            linhas = exportacao.linhas_ndjson(fichas, serializer)
+            tipo = 'application/x-ndjson; charset=utf-8'
+
+        resposta = StreamingHttpResponse(linhas, content_type=tipo)
+        resposta['Content-Disposition'] = f'attachment; filename="ocorrencias.{formato}"'
+        return resposta
+
+    @action(detail=True, methods=['post'], url_path='audio', url_name='audio')
+    def enviar_audio(self, request, pk=None):
+        """
+        Inicia o envio retomável do áudio da ficha:
+        {"nome_arquivo": "...", "tamanho": <bytes>, "sha256": "<hex>"}.
+        Os bytes vão em trechos para /uploads-audio/{id}/ (ver api/audio.py).
+        """
+        ocorrencia = get_object_or_404(self.get_queryset().only('pk'), pk=pk)
+        serializer = serializers.UploadAudioSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(ocorrencia=ocorrencia, usuario=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+class LocalizacaoViewSet(QueryPlanEscritaMixin, viewsets.ModelViewSet):
     """
     API endpoint para Localização.
     (Permissão herdada da Ocorrência)
@@ -181,13 +442,14 @@ class LocalizacaoViewSet(viewsets.ModelViewSet):
     serializer_class = serializers.LocalizacaoSerializer
     permission_classes = [IsAssistencialSafe]
 
-class MaterialUtilizadoViewSet(viewsets.ModelViewSet):
+class MaterialUtilizadoViewSet(EscritaAtomicaMixin, QueryPlanEscritaMixin, viewsets.ModelViewSet):
     """
     API endpoint para Materiais Utilizados.
     """
     queryset = MaterialUtilizado.objects.all()
     serializer_class = serializers.MaterialUtilizadoSerializer
     permission_classes = [IsAssistencialSafe]
+    include_count = False # Tabela grande: COUNT(*) só com ?count=true
 
     def perform_create(self, serializer):
         """
@@ -211,7 +473,7 @@ class MaterialUtilizadoViewSet(viewsets.ModelViewSet):
         # Assistencial vê apenas os que ele registrou
         return MaterialUtilizado.objects.filter(usuario=user)
 
-class ApoioOcorrenciaViewSet(viewsets.ModelViewSet):
+class ApoioOcorrenciaViewSet(QueryPlanEscritaMixin, viewsets.ModelViewSet):
     """
     API endpoint para Viaturas de Apoio.
     """
@@ -219,7 +481,7 @@ class ApoioOcorrenciaViewSet(viewsets.ModelViewSet):
     serializer_class = serializers.ApoioOcorrenciaSerializer
     permission_classes = [IsAssistencialSafe]
 
-class PacienteViewSet(viewsets.ModelViewSet):
+class PacienteViewSet(QueryPlanEscritaMixin, viewsets.ModelViewSet):
     """
     API endpoint para Pacientes.
     Usa serializers diferentes para Leitura e Escrita.
@@ -237,7 +499,7 @@ class PacienteViewSet(viewsets.ModelViewSet):
             return serializers.PacienteReadSerializer
         return serializers.PacienteWriteSerializer
 
-class PertencesPacienteViewSet(viewsets.ModelViewSet):
+class PertencesPacienteViewSet(QueryPlanEscritaMixin, viewsets.ModelViewSet):
     """
     API endpoint para Pertences do Paciente.
     """
@@ -245,7 +507,7 @@ class PertencesPacienteViewSet(viewsets.ModelViewSet):
     serializer_class = serializers.PertencesPacienteSerializer
     permission_classes = [IsAssistencialSafe]
 
-class InformacaoClinicaViewSet(viewsets.ModelViewSet):
+class InformacaoClinicaViewSet(QueryPlanEscritaMixin, viewsets.ModelViewSet):
     """
     API endpoint para Informações Clínicas.
     """
@@ -253,7 +515,7 @@ class InformacaoClinicaViewSet(viewsets.ModelViewSet):
     serializer_class = serializers.InformacaoClinicaSerializer
     permission_classes = [IsAssistencialSafe]
 
-class DadosEspecificosPacienteViewSet(viewsets.ModelViewSet):
+class DadosEspecificosPacienteViewSet(QueryPlanEscritaMixin, viewsets.ModelViewSet):
     """
     API endpoint para Dados Específicos do Paciente.
     """
@@ -261,8 +523,151 @@ class DadosEspecificosPacienteViewSet(viewsets.ModelViewSet):
     serializer_class = serializers.DadosEspecificosPacienteSerializer
     permission_classes = [IsAssistencialSafe]
 
+class UploadAudioViewSet(viewsets.GenericViewSet):
+    """
+    Trechos do envio retomável do áudio (criado em POST /ocorrencias/{id}/audio/).
+    - GET/HEAD: offset atual (de onde continuar após uma queda).
+    - PATCH: corpo 'application/offset+octet-stream' com o cabeçalho
+      'Upload-Offset'; responde 204 com o novo 'Upload-Offset'. Com o
+      último trecho, responde 200 com o upload concluído. Offset errado: 409.
+    - DELETE: cancela.
+    Só quem iniciou o upload pode enviar os trechos.
+    """
+    serializer_class = serializers.UploadAudioSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [TrechoBinarioParser]
+
+    def get_queryset(self):
+        return UploadAudio.objects.filter(usuario=self.request.user)
+
+    def _responder(self, upload, **kwargs):
+        resposta = Response(**kwargs)
+        resposta['Upload-Offset'] = str(upload.offset)
+        resposta['Upload-Length'] = str(upload.tamanho)
+        resposta['Cache-Control'] = 'no-store'
+        return resposta
+
+    def retrieve(self, request, pk=None):
+        upload = self.get_object()
+        return self._responder(upload, data=self.get_serializer(upload).data)
+
+    def partial_update(self, request, pk=None):
+        upload = self.get_object()
+        fluxo = request.data  # 415 se não for 'application/offset+octet-stream'
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            tamanho_trecho = int(request.headers['Content-Length'])
+        except (KeyError, ValueError):
+            raise ValidationError({'Upload-Offset': 'Informe os cabeçalhos Upload-Offset e Content-Length.'})
+        if not 0 < tamanho_trecho <= audio.TAMANHO_MAXIMO_TRECHO:
+            raise ValidationError({'Content-Length': f'Envie trechos de até {audio.TAMANHO_MAXIMO_TRECHO} bytes.'})
+
+        try:
+            upload = audio.gravar_trecho(upload.pk, offset, fluxo, tamanho_trecho)
+        except audio.OffsetInvalido as erro:
+            upload.offset = erro.args[0]
+            return self._responder(upload, data={'detail': 'Upload-Offset não confere.'}, status=status.HTTP_409_CONFLICT)
+        except audio.ChecksumInvalido:
+            upload.offset = 0
+            return self._responder(
+                upload, data={'detail': 'SHA-256 não confere: reenvie o arquivo desde o início.'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+
+        if upload.concluido_em:
+            return self._responder(upload, data=self.get_serializer(upload).data)
+        return self._responder(upload, status=status.HTTP_204_NO_CONTENT)
+
+    def destroy(self, request, pk=None):
+        upload = self.get_object()
+        if upload.concluido_em:
+            raise PermissionDenied('Upload já concluído.')
+        audio.descartar(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class SaldoEstoqueViewSet(QueryPlanMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Saldo de estoque por viatura e item (somente leitura; mantido pelas
+    gravações de checklists e materiais, ver plantao/estoque.py).
+    - ?vtr=USA-01: só a viatura
+    - ?limite=N: só os itens com saldo <= N (estoque baixo), menores primeiro
+    Com ?vtr=, a leitura percorre só as linhas da viatura no índice
+    (vtr_sigla, quantidade), independente do tamanho do histórico.
+    """
+    serializer_class = serializers.SaldoEstoqueSerializer
+    permission_classes = [IsAssistencialSafe]
+    cursor_ordering = ('vtr_sigla', 'quantidade', 'id')
+    page_size = 200
+
+    def get_queryset(self):
+        queryset = SaldoEstoque.objects.all()
+        if self.action != 'list':
+            return queryset
+        filtros = serializers.FiltroSaldoEstoqueSerializer(data=self.request.query_params.dict())
+        filtros.is_valid(raise_exception=True)
+        if 'vtr' in filtros.validated_data:
+            queryset = queryset.filter(vtr_sigla=filtros.validated_data['vtr'])
+        if 'limite' in filtros.validated_data:
+            queryset = queryset.filter(quantidade__lte=filtros.validated_data['limite'])
+        return queryset
+
+# --- Sincronização dos Tablets ---
+class SincronizacaoViewSet(viewsets.ViewSet):
+    """
+    Feed incremental de alterações para os tablets (ver api/sincronizacao.py).
+    - GET /sincronizacao/ (sem token): token da posição atual, para guardar
+      logo após a carga completa.
+    - GET /sincronizacao/?since=<token>: alterações desde o token, agrupadas
+      por tabela ('atualizados': registros atuais; 'excluidos': ids), e o
+      próximo token. Com "mais": true, chamar de novo com o novo token.
+    Cada usuário só recebe o que veria nos endpoints da própria tabela,
+    inclusive os tombstones (ver sincronizacao.DONOS).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    # Model -> ViewSet cujo get_queryset define o que o usuário pode ver
+    viewsets_sincronizados = {
+        Ocorrencia: OcorrenciaViewSet,
+        Localizacao: LocalizacaoViewSet,
+        MaterialUtilizado: MaterialUtilizadoViewSet,
+        ApoioOcorrencia: ApoioOcorrenciaViewSet,
+        Paciente: PacienteViewSet,
+        PertencesPaciente: PertencesPacienteViewSet,
+        InformacaoClinica: InformacaoClinicaViewSet,
+        DadosEspecificosPaciente: DadosEspecificosPacienteViewSet,
+        EquipePlantao: EquipePlantaoViewSet,
+        ItemInventario: ItemInventarioViewSet,
+        ChecklistStatus: ChecklistStatusViewSet,
+        ChecklistDetalhe: ChecklistDetalheViewSet,
+    }
+
+    def list(self, request):
+        token = request.query_params.get('since')
+        if not token:
+            return Response({'token': sincronizacao.token_atual(), 'mais': False, 'alteracoes': {}})
+
+        posicao = sincronizacao.ler_token(token)
+        consultas = {
+            model: viewset_class(request=request, action='list', kwargs={}, format_kwarg=None).get_queryset()
+            for model, viewset_class in self.viewsets_sincronizados.items()
+        }
+        return Response(sincronizacao.montar_feed(posicao, consultas, {'request': request}, request.user))
+
+# --- Métricas ---
+class MetricasViewSet(viewsets.ViewSet):
+    """
+    GET /metricas/: histogramas por rota e ação (duração, consultas SQL,
+    tempo de SQL e de serialização, bytes da resposta) no formato do
+    Prometheus. Valores deste processo, desde que ele subiu.
+    Só administradores (is_staff).
+    """
+    permission_classes = [permissions.IsAdminUser]
+    renderer_classes = [PrometheusRenderer]
+
+    def list(self, request):
+        return Response(metricas.registro.exportar())
+
 # --- ViewSets Gerenciais ---
-class RelatorioGerencialViewSet(viewsets.ModelViewSet):
+class RelatorioGerencialViewSet(QueryPlanEscritaMixin, viewsets.ModelViewSet):
     """
     API endpoint para Relatórios Gerenciais.
     Apenas Gerencial/Admin podem acessar.
@@ -270,4 +675,20 @@ class RelatorioGerencialViewSet(viewsets.ModelViewSet):
     queryset = RelatorioGerencial.objects.all()
     serializer_class = serializers.RelatorioGerencialSerializer
     permission_classes = [IsAdminOrGerencial] # Apenas Gerencial/Admin
+    cursor_ordering = ('-data_referencia', '-id')
+
+    @action(detail=False, methods=['post'], url_path='gerar')
+    def gerar(self, request):
+        """
+        Recalcula os relatórios dos dias pendentes (ver dashboard/relatorios.py).
+        Opcional: {"inicio": "AAAA-MM-DD", "fim": "AAAA-MM-DD"} marca o período
+        inteiro como pendente antes do cálculo (até 366 dias; para períodos
+        maiores, o comando gerar_relatorios).
+        """
+        periodo = serializers.PeriodoRelatorioSerializer(data=request.data)
+        periodo.is_valid(raise_exception=True)
+        inicio = periodo.validated_data.get('inicio')
+        if inicio:
+            relatorios.marcar_periodo(inicio, periodo.validated_data.get('fim') or inicio)
+        return Response(relatorios.processar_pendentes())
 
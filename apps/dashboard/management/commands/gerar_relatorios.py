@@ -0,0 +1,32 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.dashboard import relatorios
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula os Relatórios Gerenciais (diário, semanal e mensal) dos dias "
+        "pendentes. Com --inicio/--fim, marca o período inteiro antes (útil na "
+        "primeira execução ou para reconstruir o histórico)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inicio', type=date.fromisoformat, help='Data inicial (AAAA-MM-DD)')
+        parser.add_argument('--fim', type=date.fromisoformat, help='Data final (AAAA-MM-DD), padrão: --inicio')
+
+    def handle(self, *args, **options):
+        inicio, fim = options['inicio'], options['fim']
+        if fim and not inicio:
+            raise CommandError('Informe --inicio junto com --fim.')
+        if inicio:
+            fim = fim or inicio
+            if fim < inicio:
+                raise CommandError('--fim deve ser posterior a --inicio.')
+            relatorios.marcar_periodo(inicio, fim)
+
+        resultado = relatorios.processar_pendentes()
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['dias']} dia(s) recalculado(s), {resultado['relatorios']} relatório(s) gravado(s)."
+        ))
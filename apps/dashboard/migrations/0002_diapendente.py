@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiaPendente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(unique=True)),
+                ('marcado_em', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Dia Pendente',
+                'verbose_name_plural': 'Dias Pendentes',
+                'db_table': 'dashboard_dia_pendente',
+            },
+        ),
+    ]
@@ -19,3 +19,21 @@ class RelatorioGerencial(models.Model):
         verbose_name_plural = 'Relatórios Gerenciais'
         db_table = 'dashboard_relatorio_gerencial'
 
+
+# Tabela: DIAS_PENDENTES (controle do motor de relatórios)
+class DiaPendente(models.Model):
+    """
+    Dia (no fuso local) cujas ocorrências mudaram e cujos relatórios
+    precisam ser recalculados. Alimentada pelos sinais em dashboard/signals.py
+    e consumida por dashboard/relatorios.py.
+    """
+    data = models.DateField(unique=True)
+    marcado_em = models.DateTimeField()
+
+    def __str__(self):
+        return f"Pendente - {self.data.strftime('%d/%m/%Y')}"
+
+    class Meta:
+        verbose_name = 'Dia Pendente'
+        verbose_name_plural = 'Dias Pendentes'
+        db_table = 'dashboard_dia_pendente'
@@ -0,0 +1,209 @@
+from collections import Counter
+from datetime import datetime, time, timedelta
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.ocorrencias.models import Ocorrencia, OcorrenciaArquivada
+from .models import DiaPendente, RelatorioGerencial
+
+# --- Motor Incremental de Relatórios Gerenciais ---
+#
+# As estatísticas são agregadas no banco (GROUP BY) por dia LOCAL
+# (America/Boa_Vista, o TIME_ZONE do projeto). Só os dias marcados como
+# pendentes são recalculados; os relatórios semanais e mensais são
+# consolidados a partir dos relatórios diários, sem reler as ocorrências.
+
+TIPO_DIARIO = 'Diário'
+TIPO_SEMANAL = 'Semanal'
+TIPO_MENSAL = 'Mensal'
+
+SEM_VALOR = 'Não informado'
+
+# chave no JSON 'estatistica_tipo' -> campo agrupado
+DIMENSOES = {
+    'por_bairro': 'localizacao__bairro',
+    'por_tipo': 'tipo_ocorrencia',
+    'por_status': 'status_final',
+}
+# O mesmo para as fichas arquivadas (ver ocorrencias/arquivo.py)
+DIMENSOES_ARQUIVO = {**DIMENSOES, 'por_bairro': 'bairro'}
+
+# Maior período recalculado numa requisição da API (POST /relatorios/gerar/);
+# reconstruções maiores do histórico vão pelo comando gerar_relatorios.
+MAXIMO_DIAS_API = 366
+
+
+# --- Dias Pendentes ---
+
+def dia_local(data_hora):
+    """ Data (no fuso do projeto) de um datetime. """
+    return timezone.localtime(data_hora, timezone.get_default_timezone()).date()
+
+
+def marcar_dias(dias):
+    """
+    Marca dias como pendentes. Um dia já pendente tem 'marcado_em'
+    atualizado, para não ser descartado por um processamento em andamento.
+    """
+    dias = {dia for dia in dias if dia is not None}
+    if not dias:
+        return
+    agora = timezone.now()
+    DiaPendente.objects.bulk_create(
+        [DiaPendente(data=dia, marcado_em=agora) for dia in dias],
+        update_conflicts=True, unique_fields=['data'], update_fields=['marcado_em'],
+    )
+
+
+def marcar_periodo(inicio, fim):
+    """ Marca todos os dias entre 'inicio' e 'fim' (inclusive). """
+    marcar_dias(inicio + timedelta(days=i) for i in range((fim - inicio).days + 1))
+
+
+# --- Agregação ---
+
+def _limites(dia):
+    """ Intervalo [início, fim) em UTC correspondente a um dia local. """
+    fuso = timezone.get_default_timezone()
+    inicio = timezone.make_aware(datetime.combine(dia, time.min), fuso)
+    fim = timezone.make_aware(datetime.combine(dia + timedelta(days=1), time.min), fuso)
+    return inicio, fim
+
+
+def _intervalos(dias):
+    """ Agrupa dias ordenados em intervalos contínuos [início, fim) em UTC. """
+    blocos = []
+    for dia in dias:
+        if blocos and blocos[-1][1] + timedelta(days=1) == dia:
+            blocos[-1][1] = dia
+        else:
+            blocos.append([dia, dia])
+    return [(_limites(primeiro)[0], _limites(ultimo)[1]) for primeiro, ultimo in blocos]
+
+
+def agregar_dias(dias):
+    """
+    Calcula as estatísticas de cada dia com uma consulta GROUP BY por
+    dimensão, nas fichas e no arquivo. Dias sem ocorrências retornam total 0.
+    Retorna {dia: {'total': int, 'por_bairro': {...}, 'por_tipo': {...}, 'por_status': {...}}}
+    """
+    dias = sorted(set(dias))
+    resultado = {dia: {'total': 0, **{chave: {} for chave in DIMENSOES}} for dia in dias}
+    if not dias:
+        return resultado
+
+    # Filtro por intervalos de datetime (usa índice); o agrupamento é por dia local
+    intervalos = reduce(or_, (
+        Q(data_hora_inicio__gte=inicio, data_hora_inicio__lt=fim)
+        for inicio, fim in _intervalos(dias)
+    ))
+    for modelo, dimensoes in ((Ocorrencia, DIMENSOES), (OcorrenciaArquivada, DIMENSOES_ARQUIVO)):
+        base = (
+            modelo.objects
+            .filter(intervalos)
+            .annotate(dia=TruncDate('data_hora_inicio', tzinfo=timezone.get_default_timezone()))
+            .order_by()
+        )
+
+        for linha in base.values('dia').annotate(total=Count('id')):
+            if linha['dia'] in resultado:
+                resultado[linha['dia']]['total'] += linha['total']
+
+        for chave, campo in dimensoes.items():
+            for linha in base.values('dia', campo).annotate(total=Count('id')):
+                if linha['dia'] in resultado:
+                    contagem = resultado[linha['dia']][chave]
+                    valor = linha[campo] or SEM_VALOR
+                    contagem[valor] = contagem.get(valor, 0) + linha['total']
+    return resultado
+
+
+def _somar(estatisticas):
+    """ Soma várias estatísticas diárias numa só (consolidação). """
+    total, somas = 0, {chave: Counter() for chave in DIMENSOES}
+    for estatistica in estatisticas:
+        total += estatistica.get('total', 0)
+        for chave in DIMENSOES:
+            somas[chave].update(estatistica.get(chave, {}))
+    return {'total': total, **{chave: dict(soma) for chave, soma in somas.items()}}
+
+
+def _gravar_relatorio(tipo, data_referencia, estatistica):
+    """ Cria ou atualiza o relatório (tipo, data); remove duplicatas antigas. """
+    dados = {
+        'total_ocorrencias': estatistica['total'],
+        'estatistica_tipo': {chave: estatistica[chave] for chave in DIMENSOES},
+        'data_geracao': timezone.now(),  # auto_now_add não vale para o update()
+    }
+    existentes = list(
+        RelatorioGerencial.objects
+        .filter(tipo_relatorio=tipo, data_referencia=data_referencia)
+        .order_by('id')
+    )
+    if not existentes:
+        RelatorioGerencial.objects.create(tipo_relatorio=tipo, data_referencia=data_referencia, **dados)
+        return
+    RelatorioGerencial.objects.filter(pk=existentes[0].pk).update(**dados)
+    if len(existentes) > 1:
+        RelatorioGerencial.objects.filter(pk__in=[r.pk for r in existentes[1:]]).delete()
+
+
+def _inicio_semana(dia):
+    return dia - timedelta(days=dia.weekday())  # Segunda-feira
+
+
+def _inicio_mes(dia):
+    return dia.replace(day=1)
+
+
+def _fim_mes(dia):
+    return (_inicio_mes(dia) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+
+def _consolidar(tipo, inicio, fim):
+    """ Soma os relatórios diários de [inicio, fim] num relatório consolidado. """
+    diarios = RelatorioGerencial.objects.filter(
+        tipo_relatorio=TIPO_DIARIO, data_referencia__range=(inicio, fim)
+    ).values('total_ocorrencias', 'estatistica_tipo')
+    _gravar_relatorio(tipo, inicio, _somar(
+        {'total': d['total_ocorrencias'] or 0, **(d['estatistica_tipo'] or {})} for d in diarios
+    ))
+
+
+def recalcular_dias(dias):
+    """
+    Recalcula os relatórios diários dos dias informados e os relatórios
+    semanais e mensais que os contêm. Retorna quantos relatórios gravou.
+    """
+    estatisticas = agregar_dias(dias)
+    semanas, meses = set(), set()
+    with transaction.atomic():
+        for dia, estatistica in estatisticas.items():
+            _gravar_relatorio(TIPO_DIARIO, dia, estatistica)
+            semanas.add(_inicio_semana(dia))
+            meses.add(_inicio_mes(dia))
+        for semana in semanas:
+            _consolidar(TIPO_SEMANAL, semana, semana + timedelta(days=6))
+        for mes in meses:
+            _consolidar(TIPO_MENSAL, mes, _fim_mes(mes))
+    return len(estatisticas) + len(semanas) + len(meses)
+
+
+def processar_pendentes():
+    """
+    Recalcula todos os dias pendentes e remove as marcações processadas.
+    Um dia remarcado durante o processamento continua pendente.
+    Retorna {'dias': int, 'relatorios': int}.
+    """
+    inicio = timezone.now()
+    dias = list(DiaPendente.objects.filter(marcado_em__lte=inicio).values_list('data', flat=True))
+    if not dias:
+        return {'dias': 0, 'relatorios': 0}
+    relatorios = recalcular_dias(dias)
+    DiaPendente.objects.filter(data__in=dias, marcado_em__lte=inicio).delete()
+    return {'dias': len(dias), 'relatorios': relatorios}
@@ -0,0 +1,43 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from apps.ocorrencias.models import Ocorrencia, Localizacao
+from apps.ocorrencias.signals import ocorrencias_criadas_em_lote
+from . import relatorios
+
+# --- Marcação dos Dias Pendentes do Motor de Relatórios ---
+
+
+@receiver(post_init, sender=Ocorrencia)
+def guardar_data_original(sender, instance, **kwargs):
+    """ Guarda a data de início carregada, para detectar mudança de dia. """
+    instance._data_hora_inicio_original = instance.__dict__.get('data_hora_inicio')
+
+
+@receiver(post_save, sender=Ocorrencia)
+@receiver(post_delete, sender=Ocorrencia)
+def marcar_dia_da_ocorrencia(sender, instance, **kwargs):
+    datas = {instance.data_hora_inicio, getattr(instance, '_data_hora_inicio_original', None)}
+    relatorios.marcar_dias(relatorios.dia_local(data) for data in datas if data)
+    instance._data_hora_inicio_original = instance.data_hora_inicio
+
+
+@receiver(post_save, sender=Localizacao)
+@receiver(post_delete, sender=Localizacao)
+def marcar_dia_da_localizacao(sender, instance, **kwargs):
+    """ O bairro entra nas estatísticas do dia da ocorrência. """
+    ocorrencia = instance._state.fields_cache.get('ocorrencia')
+    if ocorrencia is not None:
+        data = ocorrencia.data_hora_inicio
+    else:
+        data = (
+            Ocorrencia.objects.filter(pk=instance.ocorrencia_id)
+            .values_list('data_hora_inicio', flat=True).first()
+        )
+    if data:
+        relatorios.marcar_dias([relatorios.dia_local(data)])
+
+
+@receiver(ocorrencias_criadas_em_lote)
+def marcar_dias_do_lote(sender, ocorrencias, **kwargs):
+    relatorios.marcar_dias(relatorios.dia_local(o.data_hora_inicio) for o in ocorrencias)
@@ -1,3 +1,186 @@
+from datetime import date, datetime, timezone as dt_timezone
+from io import StringIO
+
+from django.contrib.auth.models import Group
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from apps.users.models import Usuario
+from apps.plantao.models import EquipePlantao
+from apps.ocorrencias.models import Ocorrencia, Localizacao
+from apps.api.serializers import gravar_fichas
+from .models import DiaPendente, RelatorioGerencial
+from . import relatorios
+
+
+def utc(ano, mes, dia, hora=0, minuto=0):
+    return datetime(ano, mes, dia, hora, minuto, tzinfo=dt_timezone.utc)
+
+
+class RelatoriosIncrementaisTests(TestCase):
+    """ Motor incremental: marcação de dias, agregação e consolidação. """
+
+    def setUp(self):
+        usuario = Usuario.objects.create_user(
+            matricula='000001', nome_completo='Usuário Teste',
+            email='000001@gestaosaude.test', password='senha-teste',
+        )
+        self.equipe = EquipePlantao.objects.create(
+            vtr_sigla='USA-01', data_plantao=date(2025, 3, 1),
+            condutor=usuario, tecnico_enf=usuario, medico=usuario,
+        )
+        self.sequencia = 0
+
+    def criar(self, data_hora, bairro='Centro', tipo='Clínico'):
+        self.sequencia += 1
+        ocorrencia = Ocorrencia.objects.create(
+            equipe=self.equipe, num_reg_central=f'REL-{self.sequencia:03d}',
+            data_hora_inicio=data_hora, tipo_ocorrencia=tipo, status_final='Removido',
+        )
+        Localizacao.objects.create(ocorrencia=ocorrencia, endereco='Rua A', bairro=bairro)
+        return ocorrencia
+
+    def pendentes(self):
+        return set(DiaPendente.objects.values_list('data', flat=True))
+
+    def relatorio(self, tipo, data_referencia):
+        return RelatorioGerencial.objects.get(tipo_relatorio=tipo, data_referencia=data_referencia)
+
+    def test_dia_local_respeita_o_fuso_do_projeto(self):
+        # 02:30 UTC ainda é 22:30 do dia anterior em Boa Vista (UTC-4)
+        self.criar(utc(2025, 3, 11, 2, 30))
+        self.criar(utc(2025, 3, 11, 4, 0))
+        self.assertEqual(self.pendentes(), {date(2025, 3, 10), date(2025, 3, 11)})
+
+        relatorios.processar_pendentes()
+        self.assertEqual(self.relatorio(relatorios.TIPO_DIARIO, date(2025, 3, 10)).total_ocorrencias, 1)
+        self.assertEqual(self.relatorio(relatorios.TIPO_DIARIO, date(2025, 3, 11)).total_ocorrencias, 1)
+        self.assertFalse(DiaPendente.objects.exists())
+
+    def test_estatisticas_por_dimensao(self):
+        self.criar(utc(2025, 3, 10, 15), bairro='Centro', tipo='Clínico')
+        self.criar(utc(2025, 3, 10, 16), bairro='Centro', tipo='Trauma')
+        self.criar(utc(2025, 3, 10, 17), bairro='Caimbé', tipo='Trauma')
+        relatorios.processar_pendentes()
+
+        estatistica = self.relatorio(relatorios.TIPO_DIARIO, date(2025, 3, 10)).estatistica_tipo
+        self.assertEqual(estatistica['por_bairro'], {'Centro': 2, 'Caimbé': 1})
+        self.assertEqual(estatistica['por_tipo'], {'Clínico': 1, 'Trauma': 2})
+        self.assertEqual(estatistica['por_status'], {'Removido': 3})
+
+    def test_recalcula_apenas_os_dias_alterados(self):
+        primeira = self.criar(utc(2025, 3, 10, 15))
+        self.criar(utc(2025, 3, 12, 15))
+        relatorios.processar_pendentes()
+
+        # Mudar o bairro marca só o dia da ocorrência
+        localizacao = Localizacao.objects.get(ocorrencia=primeira)
+        localizacao.bairro = 'Caimbé'
+        localizacao.save()
+        self.assertEqual(self.pendentes(), {date(2025, 3, 10)})
+
+        gerado_em = self.relatorio(relatorios.TIPO_DIARIO, date(2025, 3, 10)).data_geracao
+        resultado = relatorios.processar_pendentes()
+        self.assertEqual(resultado['dias'], 1)
+        relatorio = self.relatorio(relatorios.TIPO_DIARIO, date(2025, 3, 10))
+        self.assertEqual(relatorio.estatistica_tipo['por_bairro'], {'Caimbé': 1})
+        self.assertGreater(relatorio.data_geracao, gerado_em)  # Data do recálculo, não da primeira geração
+
+    def test_mudanca_de_dia_marca_o_dia_antigo_e_o_novo(self):
+        ocorrencia = self.criar(utc(2025, 3, 10, 15))
+        relatorios.processar_pendentes()
+
+        ocorrencia = Ocorrencia.objects.get(pk=ocorrencia.pk)
+        ocorrencia.data_hora_inicio = utc(2025, 3, 14, 15)
+        ocorrencia.save()
+        self.assertEqual(self.pendentes(), {date(2025, 3, 10), date(2025, 3, 14)})
+
+        relatorios.processar_pendentes()
+        self.assertEqual(self.relatorio(relatorios.TIPO_DIARIO, date(2025, 3, 10)).total_ocorrencias, 0)
+        self.assertEqual(self.relatorio(relatorios.TIPO_DIARIO, date(2025, 3, 14)).total_ocorrencias, 1)
+
+    def test_exclusao_marca_o_dia(self):
+        ocorrencia = self.criar(utc(2025, 3, 10, 15))
+        relatorios.processar_pendentes()
+        ocorrencia.delete()
+        self.assertEqual(self.pendentes(), {date(2025, 3, 10)})
+        relatorios.processar_pendentes()
+        self.assertEqual(self.relatorio(relatorios.TIPO_DIARIO, date(2025, 3, 10)).total_ocorrencias, 0)
+
+    def test_consolida_semana_e_mes_a_partir_dos_diarios(self):
+        self.criar(utc(2025, 3, 10, 15))  # Segunda-feira
+        self.criar(utc(2025, 3, 16, 15))  # Domingo da mesma semana
+        self.criar(utc(2025, 3, 17, 15))  # Semana seguinte
+        relatorios.processar_pendentes()
+
+        self.assertEqual(self.relatorio(relatorios.TIPO_SEMANAL, date(2025, 3, 10)).total_ocorrencias, 2)
+        self.assertEqual(self.relatorio(relatorios.TIPO_SEMANAL, date(2025, 3, 17)).total_ocorrencias, 1)
+        mensal = self.relatorio(relatorios.TIPO_MENSAL, date(2025, 3, 1))
+        self.assertEqual(mensal.total_ocorrencias, 3)
+        self.assertEqual(mensal.estatistica_tipo['por_bairro'], {'Centro': 3})
+
+        # Um novo registro atualiza os consolidados sem duplicá-los
+        self.criar(utc(2025, 3, 20, 15))
+        relatorios.processar_pendentes()
+        self.assertEqual(self.relatorio(relatorios.TIPO_MENSAL, date(2025, 3, 1)).total_ocorrencias, 4)
+
+    def test_lote_marca_os_dias(self):
+        gravar_fichas([{
+            'equipe': self.equipe, 'num_reg_central': 'LOTE-1',
+            'data_hora_inicio': utc(2025, 3, 10, 15),
+            'tipo_ocorrencia': 'Clínico', 'status_final': 'Removido',
+            'localizacao': {'endereco': 'Rua B', 'bairro': 'Centro'},
+        }])
+        self.assertEqual(self.pendentes(), {date(2025, 3, 10)})
+
+    def test_comando_reconstroi_o_periodo(self):
+        self.criar(utc(2025, 3, 10, 15))
+        DiaPendente.objects.all().delete()
+        saida = StringIO()
+        call_command('gerar_relatorios', '--inicio', '2025-03-09', '--fim', '2025-03-11', stdout=saida)
+        self.assertIn('3 dia(s)', saida.getvalue())
+        self.assertEqual(self.relatorio(relatorios.TIPO_DIARIO, date(2025, 3, 10)).total_ocorrencias, 1)
+
+
+class GerarRelatoriosApiTests(APITestCase):
+    """ POST /api/relatorios/gerar/ (apenas Gerencial/Admin). """
+
+    def setUp(self):
+        self.gerente = Usuario.objects.create_user(
+            matricula='000001', nome_completo='Gerente',
+            email='gerente@gestaosaude.test', password='senha-teste',
+        )
+        self.gerente.groups.add(Group.objects.create(name='Administração'))
+
+    def test_gera_relatorios_do_periodo(self):
+        self.client.force_authenticate(self.gerente)
+        resposta = self.client.post(
+            reverse('relatorio-gerar'), {'inicio': '2025-03-10', 'fim': '2025-03-11'}, format='json'
+        )
+        self.assertEqual(resposta.status_code, 200, resposta.content)
+        self.assertEqual(resposta.data['dias'], 2)
+        self.assertTrue(RelatorioGerencial.objects.filter(tipo_relatorio='Mensal').exists())
+
+    def test_periodo_invertido_e_rejeitado(self):
+        self.client.force_authenticate(self.gerente)
+        resposta = self.client.post(
+            reverse('relatorio-gerar'), {'inicio': '2025-03-11', 'fim': '2025-03-10'}, format='json'
+        )
+        self.assertEqual(resposta.status_code, 400)
+
+    def test_periodo_longo_demais_e_rejeitado(self):
+        self.client.force_authenticate(self.gerente)
+        resposta = self.client.post(
+            reverse('relatorio-gerar'), {'inicio': '0001-01-01', 'fim': '9999-12-31'}, format='json'
+        )
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('gerar_relatorios', str(resposta.data))
+        self.assertFalse(DiaPendente.objects.exists())
 
-# Create your tests here.
+        resposta = self.client.post(
+            reverse('relatorio-gerar'), {'inicio': '2024-03-11', 'fim': '2025-03-11'}, format='json'
+        )
+        self.assertEqual(resposta.status_code, 200, resposta.content)
+        self.assertEqual(resposta.data['dias'], relatorios.MAXIMO_DIAS_API)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Ocorrencia, Localizacao, MaterialUtilizado, ApoioOcorrencia
+from .models import Ocorrencia, Localizacao, MaterialUtilizado, ApoioOcorrencia, OcorrenciaArquivada
 
 class LocalizacaoInline(admin.StackedInline):
     model = Localizacao
@@ -24,3 +24,16 @@ class OcorrenciaAdmin(admin.ModelAdmin):
     inlines = [LocalizacaoInline, MaterialUtilizadoInline, ApoioOcorrenciaInline]
     autocomplete_fields = ('equipe',)
 
+
+@admin.register(OcorrenciaArquivada)
+class OcorrenciaArquivadaAdmin(admin.ModelAdmin):
+    # Somente leitura: preenchida pelo comando arquivar_ocorrencias (ver ocorrencias/arquivo.py)
+    list_display = ('num_reg_central', 'equipe', 'data_hora_inicio', 'status_final', 'arquivada_em')
+    list_filter = ('status_final', 'data_hora_inicio', 'bairro')
+    search_fields = ('num_reg_central', 'equipe__vtr_sigla', 'bairro')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class OcorrenciasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.ocorrencias'
+
+    def ready(self):
+        # Registra os sinais que atualizam 'Ocorrencia.atualizado_em'
+        from . import signals  # noqa: F401
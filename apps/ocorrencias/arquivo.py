@@ -0,0 +1,226 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
+from django.core import serializers
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from apps.pacientes.models import Paciente, PertencesPaciente, InformacaoClinica, DadosEspecificosPaciente
+from apps.plantao.models import SaldoEstoque
+from .models import Ocorrencia, Localizacao, MaterialUtilizado, ApoioOcorrencia, OcorrenciaArquivada
+
+# --- Arquivo das Fichas Finalizadas ---
+#
+# Quase todo o tráfego é sobre fichas abertas ou recentes, mas as tabelas de
+# ocorrências, pacientes e materiais só crescem. 'arquivar' move as fichas
+# finalizadas há mais de ARQUIVO_OCORRENCIAS_DIAS (pelo início, a coluna
+# indexada) para OcorrenciaArquivada, uma linha por ficha com os registros
+# aninhados serializados, em lotes de uma transação cada.
+#
+# A leitura continua transparente: o detalhe da ficha, a exportação e os
+# relatórios também consultam o arquivo (ver api/views.py, api/filters.py e
+# dashboard/relatorios.py), com 'montar' devolvendo as fichas como
+# instâncias com as relações já em cache, prontas para os serializers de
+# leitura. Fichas arquivadas não são editadas nem aparecem na listagem ou
+# na busca.
+#
+# As linhas saem das tabelas com DELETE direto, sem sinais: nada muda nos
+# dados, então o saldo de estoque, os relatórios e o feed de sincronização
+# não devem reagir. Por isso ficam de fora as fichas cujos materiais ainda
+# contam num saldo (início a partir da última contagem da viatura) e as
+# referenciadas por outras tabelas (ex: envio de áudio ainda registrado),
+# exceto as derivadas da própria ficha (DESCARTADAS), removidas junto.
+#
+# Uma tabela de arquivo, e não partições do PostgreSQL: as tabelas
+# aninhadas não têm chave de partição própria (só chegam ao início da
+# ficha pela FK), e a mudança de tabela permite o DELETE direto acima.
+
+# Modelo arquivado -> caminho até a ficha (pais antes dos filhos)
+MODELOS = {
+    Ocorrencia: 'pk',
+    Localizacao: 'ocorrencia',
+    Paciente: 'ocorrencia',
+    PertencesPaciente: 'paciente__ocorrencia',
+    InformacaoClinica: 'paciente__ocorrencia',
+    DadosEspecificosPaciente: 'paciente__ocorrencia',
+    MaterialUtilizado: 'ocorrencia',
+    ApoioOcorrencia: 'ocorrencia_mestre',
+}
+# Tabelas derivadas da ficha (refeitas quando faltam): não impedem o arquivamento
+DESCARTADAS = {'api.FichaCongelada'}
+FICHAS_POR_LOTE = 200
+
+
+def _dias():
+    return getattr(settings, 'ARQUIVO_OCORRENCIAS_DIAS', 365)
+
+
+def _campos(modelo):
+    """ Campos serializados: todos, menos o vetor de busca (mantido pelo banco). """
+    return [campo.name for campo in modelo._meta.concrete_fields if not isinstance(campo, SearchVectorField)]
+
+
+def _outras_relacoes():
+    """ Relações de outras tabelas com a ficha: (relacao, descartada?). """
+    return [
+        (relacao, relacao.related_model._meta.label in DESCARTADAS)
+        for relacao in Ocorrencia._meta.related_objects
+        if relacao.related_model not in MODELOS
+    ]
+
+
+def _fks_externas(modelo):
+    """ FKs para fora do arquivo (equipes, itens, usuários). """
+    return [
+        campo for campo in modelo._meta.concrete_fields
+        if campo.is_relation and campo.related_model not in MODELOS
+    ]
+
+
+# --- Arquivamento ---
+
+def candidatas(dias=None):
+    """ Fichas que podem ser arquivadas, mais antigas primeiro. """
+    limite = timezone.now() - timedelta(days=_dias() if dias is None else dias)
+    saldo_aberto = SaldoEstoque.objects.filter(
+        vtr_sigla=OuterRef('equipe__vtr_sigla'), contado_em__lte=OuterRef('data_hora_inicio'),
+    )
+    queryset = Ocorrencia.objects.filter(finalizada=True, data_hora_inicio__lt=limite).exclude(Exists(saldo_aberto))
+    for relacao, descartada in _outras_relacoes():
+        if not descartada:
+            queryset = queryset.exclude(Exists(
+                relacao.related_model._base_manager.filter(**{relacao.field.name: OuterRef('pk')})
+            ))
+    return queryset.order_by('data_hora_inicio', 'id')
+
+
+def arquivar(dias=None, tamanho_lote=FICHAS_POR_LOTE, limite=None):
+    """
+    Arquiva as fichas candidatas, 'tamanho_lote' por transação, até
+    'limite' fichas (todas, se None). Retorna quantas arquivou.
+    """
+    total = 0
+    while limite is None or total < limite:
+        tamanho = tamanho_lote if limite is None else min(tamanho_lote, limite - total)
+        with transaction.atomic():
+            ids = list(
+                candidatas(dias).select_for_update(of=('self',))
+                .values_list('pk', flat=True)[:tamanho]
+            )
+            if not ids:
+                break
+            _mover(ids)
+        total += len(ids)
+    return total
+
+
+def _mover(ids):
+    """ Grava as fichas no arquivo e as remove (com os aninhados) das tabelas. """
+    objetos = {
+        modelo: list(
+            modelo._base_manager.filter(**{f'{caminho}__in': ids})
+            .annotate(ficha_arquivo=F(caminho)).order_by('pk')
+        )
+        for modelo, caminho in MODELOS.items()
+    }
+    dados = defaultdict(list)
+    for modelo, linhas in objetos.items():
+        serializados = serializers.serialize('python', linhas, fields=_campos(modelo))
+        for objeto, serializado in zip(linhas, serializados):
+            dados[objeto.ficha_arquivo].append(serializado)
+
+    bairros = {localizacao.ocorrencia_id: localizacao.bairro for localizacao in objetos[Localizacao]}
+    agora = timezone.now()
+    OcorrenciaArquivada.objects.bulk_create([
+        OcorrenciaArquivada(
+            id=ocorrencia.pk, equipe_id=ocorrencia.equipe_id, num_reg_central=ocorrencia.num_reg_central,
+            data_hora_inicio=ocorrencia.data_hora_inicio, tipo_ocorrencia=ocorrencia.tipo_ocorrencia,
+            status_final=ocorrencia.status_final, bairro=bairros.get(ocorrencia.pk),
+            atualizado_em=ocorrencia.atualizado_em, arquivada_em=agora, dados=dados[ocorrencia.pk],
+        )
+        for ocorrencia in objetos[Ocorrencia]
+    ])
+
+    # Filhos antes dos pais; sem sinais nem coleta de cascata (ver acima)
+    for relacao, descartada in _outras_relacoes():
+        if descartada:
+            relacao.related_model._base_manager.filter(**{f'{relacao.field.name}__in': ids})._raw_delete(
+                relacao.related_model._base_manager.db
+            )
+    for modelo in reversed(MODELOS):
+        if objetos[modelo]:
+            modelo._base_manager.filter(pk__in=[objeto.pk for objeto in objetos[modelo]])._raw_delete(
+                modelo._base_manager.db
+            )
+
+
+# --- Leitura ---
+
+def _guardar_lista(objeto, relacao, itens):
+    """ Deixa a lista no cache como o prefetch_related: '.all()' não consulta o banco. """
+    queryset = getattr(objeto, relacao.get_accessor_name()).get_queryset()
+    queryset._result_cache = itens
+    queryset._prefetch_done = True
+    if not hasattr(objeto, '_prefetched_objects_cache'):
+        objeto._prefetched_objects_cache = {}
+    objeto._prefetched_objects_cache[relacao.cache_name] = queryset
+
+
+def montar(arquivadas):
+    """
+    As fichas das OcorrenciaArquivada informadas, na mesma ordem, como
+    instâncias de Ocorrencia (não salvas) com localização, pacientes,
+    materiais e apoios em cache. As FKs externas são lidas com uma consulta
+    por modelo para todas as fichas; o que foi excluído depois do
+    arquivamento (ex: um item do inventário) fica None.
+    """
+    por_modelo = defaultdict(list)
+    for arquivada in arquivadas:
+        for registro in serializers.deserialize('python', arquivada.dados):
+            por_modelo[type(registro.object)].append(registro.object)
+
+    externas = defaultdict(set)
+    for modelo, objetos in por_modelo.items():
+        for campo in _fks_externas(modelo):
+            externas[campo.related_model].update(getattr(objeto, campo.attname) for objeto in objetos)
+    carregados = {
+        modelo: modelo._base_manager.in_bulk(ids - {None}) if ids - {None} else {}
+        for modelo, ids in externas.items()
+    }
+    for modelo, objetos in por_modelo.items():
+        for campo in _fks_externas(modelo):
+            for objeto in objetos:
+                campo.set_cached_value(objeto, carregados[campo.related_model].get(getattr(objeto, campo.attname)))
+
+    # Relações internas: cada filho no cache do pai e vice-versa
+    for modelo in MODELOS:
+        pais = por_modelo.get(modelo, [])
+        for relacao in modelo._meta.related_objects:
+            if relacao.related_model not in MODELOS:
+                continue
+            filhos = defaultdict(list)
+            for filho in por_modelo.get(relacao.related_model, []):
+                filhos[getattr(filho, relacao.field.attname)].append(filho)
+            for pai in pais:
+                itens = filhos.get(pai.pk, [])
+                for filho in itens:
+                    relacao.field.set_cached_value(filho, pai)
+                if relacao.one_to_one:
+                    relacao.set_cached_value(pai, itens[0] if itens else None)
+                else:
+                    _guardar_lista(pai, relacao, itens)
+    return por_modelo.get(Ocorrencia, [])
+
+
+def iterar(queryset, tamanho_bloco=FICHAS_POR_LOTE):
+    """ Fichas montadas de um queryset de OcorrenciaArquivada, lidas em blocos. """
+    bloco = []
+    for arquivada in queryset.iterator(chunk_size=tamanho_bloco):
+        bloco.append(arquivada)
+        if len(bloco) >= tamanho_bloco:
+            yield from montar(bloco)
+            bloco = []
+    yield from montar(bloco)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from apps.ocorrencias import arquivo
+
+
+class Command(BaseCommand):
+    help = (
+        "Move as fichas finalizadas antigas (com pacientes, materiais e apoios) "
+        "para o arquivo. Continuam disponíveis no detalhe, na exportação e nos "
+        "relatórios. Para rodar periodicamente (ex: diariamente, fora do pico)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, help='Idade mínima em dias (padrão: ARQUIVO_OCORRENCIAS_DIAS)')
+        parser.add_argument('--lote', type=int, default=arquivo.FICHAS_POR_LOTE, help='Fichas por transação')
+        parser.add_argument('--limite', type=int, help='Máximo de fichas nesta execução')
+
+    def handle(self, *args, **options):
+        total = arquivo.arquivar(dias=options['dias'], tamanho_lote=options['lote'], limite=options['limite'])
+        self.stdout.write(self.style.SUCCESS(f'{total} ficha(s) arquivada(s).'))
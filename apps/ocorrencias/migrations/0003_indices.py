@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocorrencias', '0002_initial'),
+        ('plantao', '0002_indices'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='localizacao',
+            index=models.Index(fields=['bairro', 'ocorrencia'], name='localizacao_bairro_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='materialutilizado',
+            index=models.Index(fields=['usuario', '-id'], name='material_usuario_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ocorrencia',
+            index=models.Index(fields=['-data_hora_inicio', '-id'], name='ocorrencia_inicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ocorrencia',
+            index=models.Index(condition=models.Q(('finalizada', False)), fields=['-data_hora_inicio', '-id'], name='ocorrencia_abertas_idx'),
+        ),
+        migrations.AlterField(
+            model_name='materialutilizado',
+            name='usuario',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='materiais_registrados', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
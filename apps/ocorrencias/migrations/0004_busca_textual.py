@@ -0,0 +1,65 @@
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# Busca textual (só PostgreSQL; no SQLite a API usa a busca simples):
+# - 'busca_vetor' é mantido por um trigger (vale também para bulk_create
+#   e UPDATEs feitos fora do Django) e indexado com GIN;
+# - 'endereco' ganha um índice GIN de trigramas (pg_trgm) para buscas por
+#   trechos do endereço.
+
+SQL_CRIAR = [
+    """
+    CREATE TRIGGER ocorrencia_busca_vetor_trigger
+    BEFORE INSERT OR UPDATE OF tipo_ocorrencia, status_final, num_reg_central
+    ON ocorrencias_ocorrencia FOR EACH ROW
+    EXECUTE FUNCTION tsvector_update_trigger(
+        busca_vetor, 'pg_catalog.portuguese', tipo_ocorrencia, status_final, num_reg_central
+    )
+    """,
+    """
+    UPDATE ocorrencias_ocorrencia SET busca_vetor = to_tsvector(
+        'pg_catalog.portuguese',
+        coalesce(tipo_ocorrencia, '') || ' ' || coalesce(status_final, '') || ' ' || coalesce(num_reg_central, '')
+    )
+    """,
+    "CREATE INDEX ocorrencia_busca_vetor_idx ON ocorrencias_ocorrencia USING gin (busca_vetor)",
+    "CREATE INDEX localizacao_endereco_trgm_idx ON ocorrencias_localizacao USING gin (endereco gin_trgm_ops)",
+]
+
+SQL_REMOVER = [
+    "DROP INDEX IF EXISTS localizacao_endereco_trgm_idx",
+    "DROP INDEX IF EXISTS ocorrencia_busca_vetor_idx",
+    "DROP TRIGGER IF EXISTS ocorrencia_busca_vetor_trigger ON ocorrencias_ocorrencia",
+]
+
+
+def criar(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in SQL_CRIAR:
+        schema_editor.execute(sql)
+
+
+def remover(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in SQL_REMOVER:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocorrencias', '0003_indices'),
+    ]
+
+    operations = [
+        TrigramExtension(),  # Ignorado fora do PostgreSQL
+        migrations.AddField(
+            model_name='ocorrencia',
+            name='busca_vetor',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(criar, remover),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocorrencias', '0004_busca_textual'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocorrencia',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocorrencias', '0005_atualizado_em'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocorrencia',
+            name='audio_duracao',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Duração do áudio (s)'),
+        ),
+        migrations.AddField(
+            model_name='ocorrencia',
+            name='audio_formato',
+            field=models.CharField(blank=True, editable=False, max_length=10),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:33
+
+import apps.ocorrencias.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocorrencias', '0006_metadados_audio'),
+        ('plantao', '0006_membro_equipe'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OcorrenciaArquivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('num_reg_central', models.CharField(max_length=20, unique=True, verbose_name='Nº Registro Central')),
+                ('data_hora_inicio', models.DateTimeField()),
+                ('tipo_ocorrencia', models.TextField()),
+                ('status_final', models.CharField(max_length=50)),
+                ('bairro', models.CharField(blank=True, max_length=50, null=True)),
+                ('atualizado_em', models.DateTimeField()),
+                ('arquivada_em', models.DateTimeField()),
+                ('dados', models.JSONField(encoder=apps.ocorrencias.models.DadosArquivoEncoder)),
+                ('equipe', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ocorrencias_arquivadas', to='plantao.equipeplantao')),
+            ],
+            options={
+                'verbose_name': 'Ocorrência Arquivada',
+                'verbose_name_plural': 'Ocorrências Arquivadas',
+                'db_table': 'ocorrencias_ocorrencia_arquivada',
+                'indexes': [models.Index(fields=['-data_hora_inicio', '-id'], name='arquivada_inicio_idx')],
+            },
+        ),
+    ]
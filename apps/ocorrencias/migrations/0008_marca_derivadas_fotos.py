@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocorrencias', '0007_ocorrencia_arquivada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='localizacao',
+            name='foto_local_derivadas',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+    ]
@@ -1,5 +1,9 @@
+import datetime
+
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
+from django.core.serializers.json import DjangoJSONEncoder
 
 # Tabela: OCORRENCIAS
 # Garanta que o nome da classe é 'Ocorrencia' (com 'O' maiúsculo)
@@ -12,6 +16,14 @@ class Ocorrencia(models.Model):
     data_hora_finalizacao = models.DateTimeField(null=True, blank=True)
     finalizada = models.BooleanField(default=False)
     observacoes_audio = models.FileField(upload_to='audios_ocorrencias/', null=True, blank=True)
+    # Preenchidos em segundo plano a partir do arquivo (ver api/audio.py)
+    audio_formato = models.CharField(max_length=10, blank=True, editable=False)
+    audio_duracao = models.FloatField(null=True, blank=True, editable=False, verbose_name='Duração do áudio (s)')
+
+    # Busca textual (PostgreSQL): mantido por trigger no banco, ver migração 0004
+    busca_vetor = SearchVectorField(null=True, editable=False)
+    # Atualizado também quando os registros aninhados mudam (ver signals.py)
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"Ocorrência {self.num_reg_central}"
@@ -20,6 +32,15 @@ class Ocorrencia(models.Model):
         verbose_name = 'Ocorrência'
         verbose_name_plural = 'Ocorrências'
         db_table = 'ocorrencias_ocorrencia'
+        indexes = [
+            # Listagem/paginação por cursor e filtros de período
+            models.Index(fields=['-data_hora_inicio', '-id'], name='ocorrencia_inicio_idx'),
+            # Ocorrências em aberto (poucas linhas): índice parcial
+            models.Index(
+                fields=['-data_hora_inicio', '-id'], name='ocorrencia_abertas_idx',
+                condition=models.Q(finalizada=False),
+            ),
+        ]
 
 # Tabela: LOCALIZACAO
 class Localizacao(models.Model):
@@ -27,6 +48,8 @@ class Localizacao(models.Model):
     endereco = models.TextField()
     bairro = models.CharField(max_length=50)
     foto_local = models.ImageField(upload_to='fotos_locais/', null=True, blank=True)
+    # Nome da foto cujas derivadas já foram geradas (ver api/fotos.py)
+    foto_local_derivadas = models.CharField(max_length=100, blank=True, default='', editable=False)
     meios_acionados = models.TextField(null=True, blank=True)
     info_transito = models.TextField(null=True, blank=True, verbose_name='Informações DPVAT')
     link_gps = models.URLField(max_length=255, null=True, blank=True)
@@ -38,13 +61,18 @@ class Localizacao(models.Model):
         verbose_name = 'Localização'
         verbose_name_plural = 'Localizações'
         db_table = 'ocorrencias_localizacao'
+        indexes = [
+            # Filtro por bairro (a ocorrência no índice evita ler a tabela no JOIN)
+            models.Index(fields=['bairro', 'ocorrencia'], name='localizacao_bairro_idx'),
+        ]
 
 # Tabela: MATERIAIS_UTILIZADOS
 class MaterialUtilizado(models.Model):
     ocorrencia = models.ForeignKey('ocorrencias.Ocorrencia', on_delete=models.CASCADE, related_name='materiais_utilizados')
     item = models.ForeignKey('plantao.ItemInventario', on_delete=models.PROTECT, related_name='usos_em_ocorrencias')
     quantidade_usada = models.PositiveIntegerField()
-    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name='materiais_registrados')
+    # Sem índice próprio: coberto por 'material_usuario_idx'
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name='materiais_registrados', db_index=False)
 
     def __str__(self):
         return f"{self.quantidade_usada}x {self.item.nome_item} em {self.ocorrencia.num_reg_central}"
@@ -53,6 +81,10 @@ class MaterialUtilizado(models.Model):
         verbose_name = 'Material Utilizado'
         verbose_name_plural = 'Materiais Utilizados'
         db_table = 'ocorrencias_material_utilizado'
+        indexes = [
+            # Assistencial lista só os materiais que registrou
+            models.Index(fields=['usuario', '-id'], name='material_usuario_idx'),
+        ]
 
 # Tabela: APOIO_OCORRENCIA
 class ApoioOcorrencia(models.Model):
@@ -69,3 +101,41 @@ class ApoioOcorrencia(models.Model):
         verbose_name_plural = 'Apoios de Ocorrências'
         db_table = 'ocorrencias_apoio_ocorrencia'
 
+
+class DadosArquivoEncoder(DjangoJSONEncoder):
+    """ Datas com microssegundos (o DjangoJSONEncoder corta em milissegundos): a ficha volta igual. """
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+# Tabela: OCORRENCIAS_ARQUIVADAS
+# Fichas finalizadas antigas, fora das tabelas quentes: uma linha por ficha,
+# com ela e os registros aninhados (localização, pacientes, materiais,
+# apoios) em 'dados'. As colunas repetem o que filtros, exportação e
+# relatórios consultam. Ver ocorrencias/arquivo.py.
+class OcorrenciaArquivada(models.Model):
+    id = models.BigIntegerField(primary_key=True)  # O mesmo id da ficha
+    equipe = models.ForeignKey('plantao.EquipePlantao', on_delete=models.PROTECT, related_name='ocorrencias_arquivadas')
+    num_reg_central = models.CharField(max_length=20, unique=True, verbose_name='Nº Registro Central')
+    data_hora_inicio = models.DateTimeField()
+    tipo_ocorrencia = models.TextField()
+    status_final = models.CharField(max_length=50)
+    bairro = models.CharField(max_length=50, null=True, blank=True)  # Null: ficha sem localização
+    # Copiado da ficha: ETag/Last-Modified do detalhe não mudam com o arquivamento
+    atualizado_em = models.DateTimeField()
+    arquivada_em = models.DateTimeField()
+    dados = models.JSONField(encoder=DadosArquivoEncoder)
+
+    def __str__(self):
+        return f"Ocorrência {self.num_reg_central} (arquivada)"
+
+    class Meta:
+        verbose_name = 'Ocorrência Arquivada'
+        verbose_name_plural = 'Ocorrências Arquivadas'
+        db_table = 'ocorrencias_ocorrencia_arquivada'
+        indexes = [
+            # Exportação (mesma ordem da listagem) e filtros de período dos relatórios
+            models.Index(fields=['-data_hora_inicio', '-id'], name='arquivada_inicio_idx'),
+        ]
@@ -0,0 +1,42 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from .models import Ocorrencia, Localizacao, MaterialUtilizado, ApoioOcorrencia
+
+# Enviado após gravações em lote (bulk_create), que não disparam post_save.
+# Argumentos: ocorrencias (lista de Ocorrencia já salvas, com localização
+# e pacientes).
+ocorrencias_criadas_em_lote = Signal()
+
+
+# --- Data de Modificação da Ficha ---
+#
+# 'Ocorrencia.atualizado_em' representa a ficha inteira: muda também quando
+# localização, materiais, apoios ou pacientes (e seus dados) mudam. Na
+# exclusão em cascata da própria ocorrência não há o que atualizar.
+
+def tocar_ocorrencias(**filtros):
+    """ Atualiza 'atualizado_em' das ocorrências filtradas (um UPDATE, sem sinais). """
+    Ocorrencia.objects.filter(**filtros).update(atualizado_em=timezone.now())
+
+
+def excluido_em_cascata(kwargs, *models):
+    """ O post_delete veio da exclusão de um dos 'models' (ex: a própria ocorrência)? """
+    return isinstance(kwargs.get('origin'), models)
+
+
+@receiver(post_save, sender=Localizacao)
+@receiver(post_delete, sender=Localizacao)
+@receiver(post_save, sender=MaterialUtilizado)
+@receiver(post_delete, sender=MaterialUtilizado)
+def tocar_ocorrencia_do_registro(sender, instance, **kwargs):
+    if not excluido_em_cascata(kwargs, Ocorrencia):
+        tocar_ocorrencias(pk=instance.ocorrencia_id)
+
+
+@receiver(post_save, sender=ApoioOcorrencia)
+@receiver(post_delete, sender=ApoioOcorrencia)
+def tocar_ocorrencia_do_apoio(sender, instance, **kwargs):
+    if not excluido_em_cascata(kwargs, Ocorrencia):
+        tocar_ocorrencias(pk=instance.ocorrencia_mestre_id)
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+# Índice GIN de trigramas (pg_trgm) para buscar pacientes por parte do nome.
+# Só PostgreSQL; a extensão é criada em ocorrencias/0004.
+
+
+def criar(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX paciente_nome_trgm_idx ON pacientes_paciente USING gin (nome gin_trgm_ops)"
+    )
+
+
+def remover(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS paciente_nome_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pacientes', '0001_initial'),
+        ('ocorrencias', '0004_busca_textual'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar, remover),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pacientes', '0002_busca_nome'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paciente',
+            name='foto_recusa_derivadas',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='pertencespaciente',
+            name='foto_pertences_derivadas',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+    ]
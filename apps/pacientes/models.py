@@ -17,6 +17,8 @@ class Paciente(models.Model):
     is_paliativo = models.BooleanField(default=False)
     recusa_atendimento = models.BooleanField(default=False)
     foto_recusa = models.ImageField(upload_to='fotos_recusa/', null=True, blank=True)
+    # Nome da foto cujas derivadas já foram geradas (ver api/fotos.py)
+    foto_recusa_derivadas = models.CharField(max_length=100, blank=True, default='', editable=False)
 
     def __str__(self):
         return self.nome
@@ -31,6 +33,8 @@ class PertencesPaciente(models.Model):
     valores_encontrados = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     entregue_para = models.CharField(max_length=100, null=True, blank=True)
     foto_pertences = models.ImageField(upload_to='fotos_pertences/', null=True, blank=True)
+    # Nome da foto cujas derivadas já foram geradas (ver api/fotos.py)
+    foto_pertences_derivadas = models.CharField(max_length=100, blank=True, default='', editable=False)
 
     def __str__(self):
         return f"Pertences de {self.paciente.nome}"
@@ -0,0 +1,27 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.ocorrencias.models import Ocorrencia
+from apps.ocorrencias.signals import excluido_em_cascata, tocar_ocorrencias
+from .models import Paciente, PertencesPaciente, InformacaoClinica, DadosEspecificosPaciente
+
+# --- Data de Modificação da Ficha (ver ocorrencias/signals.py) ---
+
+
+@receiver(post_save, sender=Paciente)
+@receiver(post_delete, sender=Paciente)
+def tocar_ocorrencia_do_paciente(sender, instance, **kwargs):
+    if not excluido_em_cascata(kwargs, Ocorrencia):
+        tocar_ocorrencias(pk=instance.ocorrencia_id)
+
+
+@receiver(post_save, sender=PertencesPaciente)
+@receiver(post_delete, sender=PertencesPaciente)
+@receiver(post_save, sender=InformacaoClinica)
+@receiver(post_delete, sender=InformacaoClinica)
+@receiver(post_save, sender=DadosEspecificosPaciente)
+@receiver(post_delete, sender=DadosEspecificosPaciente)
+def tocar_ocorrencia_dos_dados_do_paciente(sender, instance, **kwargs):
+    # Na exclusão do paciente, o sinal do próprio paciente já atualiza a ficha
+    if not excluido_em_cascata(kwargs, Ocorrencia, Paciente):
+        tocar_ocorrencias(pacientes=instance.paciente_id)
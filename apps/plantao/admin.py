@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import EquipePlantao, ItemInventario, ChecklistStatus, ChecklistDetalhe
+from .models import EquipePlantao, ItemInventario, ChecklistStatus, ChecklistDetalhe, SaldoEstoque
 
 @admin.register(EquipePlantao)
 class EquipePlantaoAdmin(admin.ModelAdmin):
@@ -27,3 +27,16 @@ class ChecklistStatusAdmin(admin.ModelAdmin):
     search_fields = ('equipe__vtr_sigla', 'usuario__nome_completo')
     inlines = [ChecklistDetalheInline]
     autocomplete_fields = ('equipe', 'usuario')
+
+@admin.register(SaldoEstoque)
+class SaldoEstoqueAdmin(admin.ModelAdmin):
+    # Somente leitura: mantido pelos checklists e materiais (ver plantao/estoque.py)
+    list_display = ('vtr_sigla', 'item', 'quantidade', 'quantidade_contada', 'contado_em')
+    list_filter = ('vtr_sigla',)
+    search_fields = ('vtr_sigla', 'item__nome_item')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
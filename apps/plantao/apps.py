@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PlantaoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.plantao'
+
+    def ready(self):
+        # Registra os sinais que mantêm o saldo de estoque das viaturas
+        from . import signals  # noqa: F401
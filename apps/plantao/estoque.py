@@ -0,0 +1,127 @@
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.ocorrencias.models import Ocorrencia, MaterialUtilizado
+from .models import ChecklistDetalhe, SaldoEstoque
+
+# --- Saldo de Estoque por Viatura ---
+#
+# saldo (viatura, item) = quantidade da última contagem do item num
+# checklist da viatura - materiais usados nas ocorrências da viatura
+# iniciadas a partir dessa contagem. Sem contagem, não há saldo.
+#
+# Mantido junto com cada gravação, na mesma transação:
+# - checklist enviado: o saldo dos itens contados volta à contagem
+#   (registrar_contagem, um upsert);
+# - material registrado/excluído: UPDATE ... SET quantidade = quantidade -/+ n
+#   (registrar_uso), sem ler o saldo antes.
+# Edições do histórico (checklist antigo, item de um detalhe, equipe ou
+# horário de uma ficha) recalculam só as linhas afetadas (recalcular).
+# Mudanças feitas com QuerySet.update() ou na sigla de uma equipe não
+# passam por aqui: o comando reconstruir_saldos confere e corrige a tabela.
+
+
+def registrar_contagem(checklist, detalhes):
+    """ Checklist novo (o mais recente): o saldo de cada item contado passa a ser a contagem. """
+    if not detalhes:
+        return
+    vtr_sigla = checklist.equipe.vtr_sigla
+    agora = timezone.now()
+    SaldoEstoque.objects.bulk_create(
+        [
+            SaldoEstoque(
+                vtr_sigla=vtr_sigla, item_id=detalhe.item_id, quantidade=detalhe.quantidade,
+                quantidade_contada=detalhe.quantidade, checklist=checklist,
+                contado_em=checklist.data_hora, atualizado_em=agora,
+            )
+            for detalhe in detalhes
+        ],
+        update_conflicts=True, unique_fields=['vtr_sigla', 'item'],
+        update_fields=['quantidade', 'quantidade_contada', 'checklist', 'contado_em', 'atualizado_em'],
+    )
+
+
+def registrar_uso(ocorrencia_id, item_id, quantidade):
+    """ Desconta (ou devolve, se negativa) a quantidade do saldo da viatura da ocorrência. """
+    ocorrencia = Ocorrencia.objects.filter(pk=ocorrencia_id).values_list('equipe__vtr_sigla', 'data_hora_inicio').first()
+    if ocorrencia is None or not quantidade:
+        return
+    vtr_sigla, inicio = ocorrencia
+    # Uso anterior à última contagem já está refletido nela
+    SaldoEstoque.objects.filter(vtr_sigla=vtr_sigla, item_id=item_id, contado_em__lte=inicio).update(
+        quantidade=F('quantidade') - quantidade, atualizado_em=timezone.now(),
+    )
+
+
+def recalcular(vtr_siglas=None, itens=None):
+    """
+    Refaz a partir do histórico os saldos das viaturas em 'vtr_siglas'
+    (todas, se None), só dos 'itens' informados (ids) ou de todos.
+    Retorna quantos saldos foram criados, corrigidos e removidos.
+    """
+    detalhes = ChecklistDetalhe.objects.all()
+    saldos = SaldoEstoque.objects.all()
+    if vtr_siglas is not None:
+        detalhes = detalhes.filter(checklist__equipe__vtr_sigla__in=vtr_siglas)
+        saldos = saldos.filter(vtr_sigla__in=vtr_siglas)
+    if itens is not None:
+        detalhes = detalhes.filter(item__in=itens)
+        saldos = saldos.filter(item__in=itens)
+
+    with transaction.atomic():
+        antes = {
+            (vtr_sigla, item_id): (pk, quantidade, quantidade_contada, checklist_id)
+            for pk, vtr_sigla, item_id, quantidade, quantidade_contada, checklist_id
+            in saldos.values_list('pk', 'vtr_sigla', 'item_id', 'quantidade', 'quantidade_contada', 'checklist_id')
+        }
+
+        # Última contagem de cada (viatura, item)
+        contagens = {}
+        linhas = detalhes.order_by('-checklist__data_hora', '-checklist_id').values_list(
+            'checklist__equipe__vtr_sigla', 'item_id', 'quantidade', 'checklist_id', 'checklist__data_hora',
+        )
+        for vtr_sigla, item_id, quantidade, checklist_id, data_hora in linhas.iterator():
+            contagens.setdefault((vtr_sigla, item_id), (quantidade, checklist_id, data_hora))
+
+        # Saldos sem nenhuma contagem (ex: o único checklist foi excluído)
+        removidos = [valor[0] for chave, valor in antes.items() if chave not in contagens]
+        if removidos:
+            SaldoEstoque.objects.filter(pk__in=removidos).delete()
+
+        agora = timezone.now()
+        SaldoEstoque.objects.bulk_create(
+            [
+                SaldoEstoque(
+                    vtr_sigla=vtr_sigla, item_id=item_id, quantidade=quantidade, quantidade_contada=quantidade,
+                    checklist_id=checklist_id, contado_em=data_hora, atualizado_em=agora,
+                )
+                for (vtr_sigla, item_id), (quantidade, checklist_id, data_hora) in contagens.items()
+            ],
+            update_conflicts=True, unique_fields=['vtr_sigla', 'item'],
+            update_fields=['quantidade', 'quantidade_contada', 'checklist', 'contado_em', 'atualizado_em'],
+            batch_size=1000,
+        )
+
+        # Desconta o uso desde a contagem, num único UPDATE
+        uso = (
+            MaterialUtilizado.objects
+            .filter(
+                ocorrencia__equipe__vtr_sigla=OuterRef('vtr_sigla'), item=OuterRef('item'),
+                ocorrencia__data_hora_inicio__gte=OuterRef('contado_em'),
+            )
+            .order_by().values('item').annotate(total=Sum('quantidade_usada')).values('total')
+        )
+        saldos.update(quantidade=F('quantidade_contada') - Coalesce(Subquery(uso), 0))
+
+        depois = {
+            (vtr_sigla, item_id): (pk, quantidade, quantidade_contada, checklist_id)
+            for pk, vtr_sigla, item_id, quantidade, quantidade_contada, checklist_id
+            in saldos.values_list('pk', 'vtr_sigla', 'item_id', 'quantidade', 'quantidade_contada', 'checklist_id')
+        }
+    return {
+        'criados': sum(chave not in antes for chave in depois),
+        'corrigidos': sum(chave in antes and antes[chave] != valor for chave, valor in depois.items()),
+        'removidos': len(removidos),
+    }
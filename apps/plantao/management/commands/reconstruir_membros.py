@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from apps.plantao import membros
+
+
+class Command(BaseCommand):
+    help = (
+        "Refaz a tabela de membros das equipes (usuário, função e data do "
+        "plantão) a partir das equipes. Use após cargas ou correções feitas "
+        "fora da API (bulk_create, QuerySet.update(), SQL)."
+    )
+
+    def handle(self, *args, **options):
+        total = membros.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f'{total} membro(s) registrado(s).'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from apps.plantao import estoque
+
+
+class Command(BaseCommand):
+    help = (
+        "Confere a tabela de saldo de estoque contra o histórico (última "
+        "contagem de cada item em checklist menos o uso nas ocorrências desde "
+        "então) e corrige o que divergir. Use após cargas ou correções feitas "
+        "fora da API (QuerySet.update(), SQL, mudança da sigla de uma equipe)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vtr', nargs='+', help='Só estas viaturas (padrão: todas)')
+
+    def handle(self, *args, **options):
+        resultado = estoque.recalcular(options['vtr'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['criados']} saldo(s) criado(s), {resultado['corrigidos']} corrigido(s), "
+            f"{resultado['removidos']} removido(s)."
+        ))
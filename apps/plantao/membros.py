@@ -0,0 +1,59 @@
+from django.db import transaction
+
+from .models import EquipePlantao, MembroEquipe
+
+# --- Membros das Equipes ---
+#
+# Quem está em cada equipe fica espalhado em quatro FKs de EquipePlantao:
+# achar a equipe de um usuário seria um OR entre elas sobre a tabela
+# inteira. A tabela MembroEquipe repete cada função preenchida com a data
+# do plantão, indexada por (usuario, data_plantao): a equipe de hoje é uma
+# busca no índice.
+#
+# Mantida pelo post_save de EquipePlantao (ver plantao/signals.py); as
+# exclusões vão em cascata. Gravações em lote (bulk_create, QuerySet.update)
+# não disparam sinais: quem as faz chama 'sincronizar', e o comando
+# reconstruir_membros refaz a tabela inteira.
+
+FUNCOES = [funcao for funcao, _ in MembroEquipe.FUNCOES]
+EQUIPES_POR_LOTE = 2000
+
+
+def estado(equipe):
+    """ O que define as linhas da equipe: a data e quem ocupa cada função. """
+    return (equipe.data_plantao, *(getattr(equipe, f'{funcao}_id') for funcao in FUNCOES))
+
+
+def _linhas(equipe):
+    return [
+        MembroEquipe(equipe_id=equipe.pk, usuario_id=usuario_id, funcao=funcao, data_plantao=equipe.data_plantao)
+        for funcao in FUNCOES
+        if (usuario_id := getattr(equipe, f'{funcao}_id')) is not None
+    ]
+
+
+def sincronizar(equipes):
+    """ Reescreve as linhas das equipes informadas (já gravadas). """
+    equipes = list(equipes)
+    if not equipes:
+        return
+    with transaction.atomic():
+        MembroEquipe.objects.filter(equipe__in=[equipe.pk for equipe in equipes]).delete()
+        MembroEquipe.objects.bulk_create(
+            [linha for equipe in equipes for linha in _linhas(equipe)], batch_size=1000,
+        )
+
+
+def reconstruir():
+    """ Refaz a tabela inteira a partir de EquipePlantao. Retorna o número de linhas. """
+    campos = ['id', 'data_plantao', *(f'{funcao}_id' for funcao in FUNCOES)]
+    with transaction.atomic():
+        MembroEquipe.objects.all().delete()
+        lote = []
+        for equipe in EquipePlantao.objects.only(*campos).order_by('pk').iterator(chunk_size=EQUIPES_POR_LOTE):
+            lote.extend(_linhas(equipe))
+            if len(lote) >= EQUIPES_POR_LOTE:
+                MembroEquipe.objects.bulk_create(lote)
+                lote = []
+        MembroEquipe.objects.bulk_create(lote)
+    return MembroEquipe.objects.count()
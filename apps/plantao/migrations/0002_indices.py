@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plantao', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='checkliststatus',
+            index=models.Index(fields=['usuario', '-data_hora', '-id'], name='checklist_usuario_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipeplantao',
+            index=models.Index(fields=['-data_plantao', '-id'], name='equipe_data_plantao_idx'),
+        ),
+        migrations.AlterField(
+            model_name='checkliststatus',
+            name='usuario',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='checklists_assinados', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plantao', '0003_atualizado_em'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoEstoque',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vtr_sigla', models.CharField(max_length=20, verbose_name='Sigla VTR')),
+                ('quantidade', models.IntegerField(help_text='Contado menos usado (negativo: usou mais que o contado)')),
+                ('quantidade_contada', models.IntegerField()),
+                ('contado_em', models.DateTimeField()),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('checklist', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='plantao.checkliststatus')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos', to='plantao.iteminventario')),
+            ],
+            options={
+                'verbose_name': 'Saldo de Estoque',
+                'verbose_name_plural': 'Saldos de Estoque',
+                'db_table': 'plantao_saldo_estoque',
+                'indexes': [models.Index(fields=['vtr_sigla', 'quantidade', 'id'], name='saldo_vtr_quantidade_idx')],
+                'constraints': [models.UniqueConstraint(fields=('vtr_sigla', 'item'), name='saldo_vtr_item_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plantao', '0004_saldo_estoque'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Cria o índice composto antes de remover o da FK, que ele passa a cobrir
+        migrations.AddIndex(
+            model_name='checkliststatus',
+            index=models.Index(fields=['equipe', '-data_hora', '-id'], name='checklist_equipe_data_idx'),
+        ),
+        migrations.AlterField(
+            model_name='checkliststatus',
+            name='equipe',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='checklists', to='plantao.equipeplantao'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+FUNCOES = ('condutor', 'tecnico_enf', 'enfermeiro', 'medico')
+
+
+def preencher_membros(apps, schema_editor):
+    """ Uma linha por função preenchida das equipes já existentes. """
+    EquipePlantao = apps.get_model('plantao', 'EquipePlantao')
+    MembroEquipe = apps.get_model('plantao', 'MembroEquipe')
+    lote = []
+    for equipe in EquipePlantao.objects.order_by('pk').iterator(chunk_size=2000):
+        for funcao in FUNCOES:
+            usuario_id = getattr(equipe, f'{funcao}_id')
+            if usuario_id is not None:
+                lote.append(MembroEquipe(
+                    equipe_id=equipe.pk, usuario_id=usuario_id, funcao=funcao, data_plantao=equipe.data_plantao,
+                ))
+        if len(lote) >= 2000:
+            MembroEquipe.objects.bulk_create(lote)
+            lote = []
+    MembroEquipe.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plantao', '0005_indice_checklist_equipe'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MembroEquipe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('funcao', models.CharField(choices=[('condutor', 'Condutor'), ('tecnico_enf', 'Técnico de Enfermagem'), ('enfermeiro', 'Enfermeiro'), ('medico', 'Médico')], max_length=20)),
+                ('data_plantao', models.DateField()),
+                ('equipe', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='membros', to='plantao.equipeplantao')),
+                ('usuario', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Membro de Equipe',
+                'verbose_name_plural': 'Membros de Equipe',
+                'db_table': 'plantao_membro_equipe',
+                'indexes': [models.Index(fields=['usuario', '-data_plantao', 'equipe'], name='membro_usuario_data_idx')],
+                'constraints': [models.UniqueConstraint(fields=('equipe', 'funcao'), name='membro_equipe_funcao_unico')],
+            },
+        ),
+        migrations.RunPython(preencher_membros, migrations.RunPython.noop),
+    ]
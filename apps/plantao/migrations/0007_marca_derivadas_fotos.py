@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plantao', '0006_membro_equipe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='checkliststatus',
+            name='foto_vtr_derivadas',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+    ]
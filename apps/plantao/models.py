@@ -30,6 +30,7 @@ class EquipePlantao(models.Model):
         null=True, 
         blank=True
     )
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.vtr_sigla} - {self.data_plantao.strftime('%d/%m/%Y')}"
@@ -39,6 +40,9 @@ class EquipePlantao(models.Model):
         verbose_name_plural = 'Equipes de Plantão'
         unique_together = ('vtr_sigla', 'data_plantao')
         db_table = 'plantao_equipe_plantao' # CORREÇÃO AQUI
+        indexes = [
+            models.Index(fields=['-data_plantao', '-id'], name='equipe_data_plantao_idx'),
+        ]
 
 # Tabela: INVENTARIO_ITENS
 class ItemInventario(models.Model):
@@ -53,6 +57,7 @@ class ItemInventario(models.Model):
         verbose_name='Grupo Responsável',
         help_text='Grupo responsável pelo checklist deste item (ex: Médico, Condutor)'
     )
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.nome_item
@@ -64,11 +69,15 @@ class ItemInventario(models.Model):
 
 # Tabela: CHECKLIST_STATUS
 class ChecklistStatus(models.Model):
-    equipe = models.ForeignKey('plantao.EquipePlantao', on_delete=models.CASCADE, related_name='checklists') # CORREÇÃO AQUI
-    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name='checklists_assinados')
+    # Sem índice próprio: coberto por 'checklist_equipe_data_idx'
+    equipe = models.ForeignKey('plantao.EquipePlantao', on_delete=models.CASCADE, related_name='checklists', db_index=False) # CORREÇÃO AQUI
+    # Sem índice próprio: coberto por 'checklist_usuario_data_idx'
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name='checklists_assinados', db_index=False)
     data_hora = models.DateTimeField(auto_now_add=True)
     vtr_observacao = models.TextField(null=True, blank=True, verbose_name='Observações da VTR')
     foto_vtr = models.ImageField(upload_to='fotos_vtr/', null=True, blank=True, verbose_name='Foto de Avaria')
+    # Nome da foto cujas derivadas já foram geradas (ver api/fotos.py)
+    foto_vtr_derivadas = models.CharField(max_length=100, blank=True, default='', editable=False)
 
     def __str__(self):
         return f"Checklist {self.equipe} - {self.data_hora.strftime('%d/%m/%Y %H:%M')}"
@@ -77,6 +86,12 @@ class ChecklistStatus(models.Model):
         verbose_name = 'Status do Checklist'
         verbose_name_plural = 'Status dos Checklists'
         db_table = 'plantao_checklist_status' # CORREÇÃO AQUI
+        indexes = [
+            # Assistencial lista só os checklists que assinou, mais recentes primeiro
+            models.Index(fields=['usuario', '-data_hora', '-id'], name='checklist_usuario_data_idx'),
+            # Último checklist de cada equipe/viatura (ver /checklists/ultimos/)
+            models.Index(fields=['equipe', '-data_hora', '-id'], name='checklist_equipe_data_idx'),
+        ]
 
 # Tabela: CHECKLIST_DETALHES
 class ChecklistDetalhe(models.Model):
@@ -99,3 +114,67 @@ class ChecklistDetalhe(models.Model):
         verbose_name = 'Detalhe do Checklist'
         verbose_name_plural = 'Detalhes do Checklist'
         db_table = 'plantao_checklist_detalhe' # CORREÇÃO AQUI
+
+# Tabela: SALDO_ESTOQUE
+# Quanto de cada item a viatura tem agora: a última contagem (checklist)
+# menos o que foi usado nas ocorrências desde então. Mantida pelas
+# gravações de checklists e materiais (ver apps/plantao/estoque.py).
+class SaldoEstoque(models.Model):
+    vtr_sigla = models.CharField(max_length=20, verbose_name='Sigla VTR')
+    item = models.ForeignKey('plantao.ItemInventario', on_delete=models.CASCADE, related_name='saldos')
+    quantidade = models.IntegerField(help_text='Contado menos usado (negativo: usou mais que o contado)')
+    quantidade_contada = models.IntegerField()
+    checklist = models.ForeignKey(
+        'plantao.ChecklistStatus', on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    contado_em = models.DateTimeField()
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.vtr_sigla} - {self.item}: {self.quantidade}"
+
+    class Meta:
+        verbose_name = 'Saldo de Estoque'
+        verbose_name_plural = 'Saldos de Estoque'
+        db_table = 'plantao_saldo_estoque'
+        constraints = [
+            models.UniqueConstraint(fields=['vtr_sigla', 'item'], name='saldo_vtr_item_unico'),
+        ]
+        indexes = [
+            # Estoque baixo de uma viatura: 'WHERE vtr_sigla = ? AND quantidade <= ?'
+            models.Index(fields=['vtr_sigla', 'quantidade', 'id'], name='saldo_vtr_quantidade_idx'),
+        ]
+
+# Tabela: MEMBROS_EQUIPE
+# Índice desnormalizado das quatro FKs de EquipePlantao (condutor,
+# tecnico_enf, enfermeiro, medico): uma linha por função preenchida.
+# Mantido a cada gravação da equipe (ver plantao/membros.py).
+class MembroEquipe(models.Model):
+    FUNCOES = [
+        ('condutor', 'Condutor'),
+        ('tecnico_enf', 'Técnico de Enfermagem'),
+        ('enfermeiro', 'Enfermeiro'),
+        ('medico', 'Médico'),
+    ]
+
+    # Sem índice próprio: coberto por 'membro_equipe_funcao_unico'
+    equipe = models.ForeignKey('plantao.EquipePlantao', on_delete=models.CASCADE, related_name='membros', db_index=False)
+    # Sem índice próprio: coberto por 'membro_usuario_data_idx'
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+', db_index=False)
+    funcao = models.CharField(max_length=20, choices=FUNCOES)
+    data_plantao = models.DateField()  # Cópia de equipe.data_plantao
+
+    def __str__(self):
+        return f"{self.usuario_id} - {self.equipe_id} ({self.funcao})"
+
+    class Meta:
+        verbose_name = 'Membro de Equipe'
+        verbose_name_plural = 'Membros de Equipe'
+        db_table = 'plantao_membro_equipe'
+        constraints = [
+            models.UniqueConstraint(fields=['equipe', 'funcao'], name='membro_equipe_funcao_unico'),
+        ]
+        indexes = [
+            # Equipe do usuário num dia (ou em qualquer dia): 'WHERE usuario_id = ? AND data_plantao = ?'
+            models.Index(fields=['usuario', '-data_plantao', 'equipe'], name='membro_usuario_data_idx'),
+        ]
@@ -0,0 +1,153 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.ocorrencias.models import Ocorrencia, MaterialUtilizado
+from .models import EquipePlantao, ChecklistStatus, ChecklistDetalhe
+from . import estoque, membros
+
+# --- Saldo de Estoque (ver plantao/estoque.py) ---
+#
+# Gravações de um objeto por vez (API, admin, exclusões em cascata)
+# atualizam o saldo aqui, dentro da transação da gravação. As gravações
+# em lote (bulk_create/bulk_update), que não disparam sinais, chamam o
+# estoque diretamente.
+
+
+def _vtr_da_equipe(equipe_id):
+    return EquipePlantao.objects.filter(pk=equipe_id).values_list('vtr_sigla', flat=True).first()
+
+
+def _vtr_do_checklist(checklist_id):
+    return ChecklistStatus.objects.filter(pk=checklist_id).values_list('equipe__vtr_sigla', flat=True).first()
+
+
+# Materiais: descontam/devolvem o uso
+
+@receiver(post_init, sender=MaterialUtilizado)
+def guardar_uso_original(sender, instance, **kwargs):
+    campos = instance.__dict__
+    instance._uso_original = (campos.get('ocorrencia_id'), campos.get('item_id'), campos.get('quantidade_usada'))
+
+
+@receiver(post_save, sender=MaterialUtilizado)
+def descontar_uso(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    atual = (instance.ocorrencia_id, instance.item_id, instance.quantidade_usada)
+    if created:
+        estoque.registrar_uso(*atual)
+    elif atual != instance._uso_original:
+        ocorrencia_id, item_id, quantidade = instance._uso_original
+        estoque.registrar_uso(ocorrencia_id, item_id, -quantidade)
+        estoque.registrar_uso(*atual)
+    instance._uso_original = atual
+
+
+@receiver(post_delete, sender=MaterialUtilizado)
+def devolver_uso(sender, instance, **kwargs):
+    estoque.registrar_uso(instance.ocorrencia_id, instance.item_id, -instance.quantidade_usada)
+
+
+# Detalhes de checklist gravados/excluídos um a um: recalcula o item.
+# Na exclusão em cascata do checklist, os itens são recalculados uma vez
+# só, pelo próprio checklist (abaixo), e não um recálculo por detalhe.
+
+def _excluido_com_o_checklist(kwargs):
+    """ A exclusão do detalhe veio da exclusão de outro model (o checklist)? """
+    origem = kwargs.get('origin')
+    if origem is None:
+        return False
+    modelo = origem.model if isinstance(origem, QuerySet) else type(origem)
+    return modelo is not ChecklistDetalhe
+
+
+@receiver(post_init, sender=ChecklistDetalhe)
+def guardar_item_original(sender, instance, **kwargs):
+    instance._item_original = instance.__dict__.get('item_id')
+
+
+@receiver(post_save, sender=ChecklistDetalhe)
+def recalcular_item_do_checklist(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    vtr_sigla = _vtr_do_checklist(instance.checklist_id)
+    if vtr_sigla is not None:
+        estoque.recalcular([vtr_sigla], {instance.item_id, instance._item_original} - {None})
+    instance._item_original = instance.item_id
+
+
+@receiver(post_delete, sender=ChecklistDetalhe)
+def recalcular_item_excluido(sender, instance, **kwargs):
+    if not _excluido_com_o_checklist(kwargs):
+        recalcular_item_do_checklist(sender, instance)
+
+
+@receiver(pre_delete, sender=ChecklistStatus)
+def guardar_itens_do_checklist(sender, instance, **kwargs):
+    # Antes da cascata: depois dela, os detalhes (e talvez a equipe) já não existem
+    instance._estoque_excluido = (
+        _vtr_do_checklist(instance.pk), list(instance.detalhes.values_list('item_id', flat=True))
+    )
+
+
+@receiver(post_delete, sender=ChecklistStatus)
+def recalcular_checklist_excluido(sender, instance, **kwargs):
+    vtr_sigla, itens = instance._estoque_excluido
+    if vtr_sigla is not None and itens:
+        estoque.recalcular([vtr_sigla], itens)
+
+
+# Mudança de equipe do checklist ou de equipe/horário da ficha: recalcula
+# os itens envolvidos nas viaturas de antes e de depois
+
+@receiver(post_init, sender=ChecklistStatus)
+def guardar_equipe_do_checklist(sender, instance, **kwargs):
+    instance._equipe_original = instance.__dict__.get('equipe_id')
+
+
+@receiver(post_save, sender=ChecklistStatus)
+def recalcular_checklist_movido(sender, instance, created, raw=False, **kwargs):
+    original, instance._equipe_original = instance._equipe_original, instance.equipe_id
+    if created or raw or original == instance.equipe_id:
+        return
+    itens = list(instance.detalhes.values_list('item_id', flat=True))
+    estoque.recalcular([_vtr_da_equipe(original), _vtr_da_equipe(instance.equipe_id)], itens)
+
+
+@receiver(post_init, sender=Ocorrencia)
+def guardar_equipe_e_inicio(sender, instance, **kwargs):
+    campos = instance.__dict__
+    instance._estoque_original = (campos.get('equipe_id'), campos.get('data_hora_inicio'))
+
+
+@receiver(post_save, sender=Ocorrencia)
+def recalcular_ficha_movida(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Gravações parciais que não tocam nesses campos (ex: metadados do áudio)
+    if created or raw or (update_fields and not update_fields & {'equipe', 'equipe_id', 'data_hora_inicio'}):
+        return
+    original, instance._estoque_original = instance._estoque_original, (instance.equipe_id, instance.data_hora_inicio)
+    if original == instance._estoque_original:
+        return
+    itens = list(instance.materiais_utilizados.values_list('item_id', flat=True))
+    if itens:
+        estoque.recalcular({_vtr_da_equipe(original[0]), _vtr_da_equipe(instance.equipe_id)}, itens)
+
+
+# --- Membros das Equipes (ver plantao/membros.py) ---
+
+@receiver(post_init, sender=EquipePlantao)
+def guardar_membros_originais(sender, instance, **kwargs):
+    # Só com todos os campos carregados (um .only() não diz o que mudou)
+    campos = instance.__dict__
+    instance._membros_originais = membros.estado(instance) if all(
+        nome in campos for nome in ('data_plantao', *(f'{funcao}_id' for funcao in membros.FUNCOES))
+    ) else None
+
+
+@receiver(post_save, sender=EquipePlantao)
+def sincronizar_membros(sender, instance, created, **kwargs):
+    atual = membros.estado(instance)
+    if created or atual != instance._membros_originais:
+        membros.sincronizar([instance])
+    instance._membros_originais = atual
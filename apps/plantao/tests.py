@@ -1,3 +1,232 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from apps.users.models import Usuario
+from apps.api.models import RegistroAlteracao
+from apps.ocorrencias.models import Ocorrencia, MaterialUtilizado
+from .models import EquipePlantao, ItemInventario, ChecklistStatus, ChecklistDetalhe, SaldoEstoque, MembroEquipe
+from . import estoque, membros
+
+
+class SaldoEstoqueTests(APITestCase):
+    """ Saldo por viatura: contagem do checklist menos o uso desde então. """
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            matricula='000001', nome_completo='Usuário Teste',
+            email='000001@gestaosaude.test', password='senha-teste',
+        )
+        self.usuario.groups.add(Group.objects.get_or_create(name='Médico')[0])
+        self.equipe = self.criar_equipe('USA-01')
+        self.outra_equipe = self.criar_equipe('USA-02')
+        self.soro = ItemInventario.objects.create(nome_item='Soro')
+        self.gaze = ItemInventario.objects.create(nome_item='Gaze')
+        self.client.force_authenticate(self.usuario)
+
+    def criar_equipe(self, vtr_sigla):
+        return EquipePlantao.objects.create(
+            vtr_sigla=vtr_sigla, data_plantao=date(2025, 1, 1),
+            condutor=self.usuario, tecnico_enf=self.usuario,
+        )
+
+    def enviar_checklist(self, equipe=None, **quantidades):
+        resposta = self.client.post(reverse('checklist-list'), {
+            'equipe_id': (equipe or self.equipe).pk,
+            'detalhes': [
+                {'item_id': getattr(self, nome).pk, 'quantidade': quantidade}
+                for nome, quantidade in quantidades.items()
+            ],
+        }, format='json')
+        self.assertEqual(resposta.status_code, 201, resposta.content)
+        return ChecklistStatus.objects.get(pk=resposta.json()['id'])
+
+    def criar_ocorrencia(self, equipe=None, inicio=None):
+        self.numero = getattr(self, 'numero', 0) + 1
+        return Ocorrencia.objects.create(
+            equipe=equipe or self.equipe, num_reg_central=f'REG-{self.numero}',
+            data_hora_inicio=inicio or timezone.now(), tipo_ocorrencia='Clínico',
+        )
+
+    def usar(self, ocorrencia, item, quantidade):
+        return MaterialUtilizado.objects.create(
+            ocorrencia=ocorrencia, item=item, quantidade_usada=quantidade, usuario=self.usuario,
+        )
+
+    def saldo(self, item, vtr_sigla='USA-01'):
+        return SaldoEstoque.objects.filter(vtr_sigla=vtr_sigla, item=item).values_list('quantidade', flat=True).first()
+
+    def test_checklist_define_e_material_desconta(self):
+        self.enviar_checklist(soro=10, gaze=3)
+        self.assertEqual((self.saldo(self.soro), self.saldo(self.gaze)), (10, 3))
+
+        ocorrencia = self.criar_ocorrencia()
+        material = self.usar(ocorrencia, self.soro, 4)
+        self.assertEqual(self.saldo(self.soro), 6)
+        material.quantidade_usada = 1
+        material.save()
+        self.assertEqual(self.saldo(self.soro), 9)
+        material.item = self.gaze
+        material.save()
+        self.assertEqual((self.saldo(self.soro), self.saldo(self.gaze)), (10, 2))
+        material.delete()
+        self.assertEqual(self.saldo(self.gaze), 3)
+
+        # Uso em ficha anterior à contagem já está refletido nela
+        self.usar(self.criar_ocorrencia(inicio=timezone.now() - timedelta(hours=2)), self.soro, 5)
+        self.assertEqual(self.saldo(self.soro), 10)
+        # Outra viatura: sem contagem, sem saldo
+        self.usar(self.criar_ocorrencia(equipe=self.outra_equipe), self.soro, 1)
+        self.assertIsNone(self.saldo(self.soro, 'USA-02'))
+
+        # Novo checklist zera o que foi usado
+        self.usar(ocorrencia, self.soro, 2)
+        self.enviar_checklist(soro=12)
+        self.assertEqual(self.saldo(self.soro), 12)
+
+    def test_edicoes_do_historico_recalculam(self):
+        antigo = self.enviar_checklist(soro=10)
+        self.usar(self.criar_ocorrencia(), self.soro, 3)
+        recente = self.enviar_checklist(soro=8)
+        ocorrencia = self.criar_ocorrencia()
+        self.usar(ocorrencia, self.soro, 2)
+        self.assertEqual(self.saldo(self.soro), 6)
+
+        # Corrigir o checklist antigo não muda a última contagem
+        resposta = self.client.patch(
+            reverse('checklist-detail', args=[antigo.pk]),
+            {'detalhes': [{'item_id': self.soro.pk, 'quantidade': 50}]}, format='json',
+        )
+        self.assertEqual(resposta.status_code, 200, resposta.content)
+        self.assertEqual(self.saldo(self.soro), 6)
+
+        # Ficha passada para outra viatura: o uso sai desta
+        ocorrencia.equipe = self.outra_equipe
+        ocorrencia.save()
+        self.assertEqual(self.saldo(self.soro), 8)
+
+        # Sem o checklist recente, vale o antigo menos o uso desde ele
+        recente.delete()
+        self.assertEqual(self.saldo(self.soro), 47)
+        antigo.delete()
+        self.assertFalse(SaldoEstoque.objects.exists())
+
+    def test_exclusao_de_detalhes_recalcula_uma_vez(self):
+        self.curativo = ItemInventario.objects.create(nome_item='Curativo')
+        antigo = self.enviar_checklist(soro=10, gaze=3, curativo=2)
+        recente = self.enviar_checklist(soro=8, gaze=1, curativo=1)
+
+        # Itens que não vieram mais: um recálculo para todos, voltando ao checklist antigo
+        with mock.patch.object(estoque, 'recalcular', wraps=estoque.recalcular) as recalcular:
+            resposta = self.client.patch(
+                reverse('checklist-detail', args=[recente.pk]),
+                {'detalhes': [{'item_id': self.soro.pk, 'quantidade': 8}]}, format='json',
+            )
+        self.assertEqual(resposta.status_code, 200, resposta.content)
+        self.assertEqual(recalcular.call_count, 1)
+        self.assertEqual((self.saldo(self.soro), self.saldo(self.gaze), self.saldo(self.curativo)), (8, 3, 2))
+        self.assertEqual(
+            RegistroAlteracao.objects.filter(tabela='plantao.checklistdetalhe', operacao=RegistroAlteracao.EXCLUIDO).count(), 2
+        )
+
+        # Exclusão do checklist: a cascata dos detalhes também recalcula uma vez só
+        with mock.patch.object(estoque, 'recalcular', wraps=estoque.recalcular) as recalcular:
+            antigo.delete()
+        self.assertEqual(recalcular.call_count, 1)
+        self.assertEqual((self.saldo(self.soro), self.saldo(self.gaze), self.saldo(self.curativo)), (8, None, None))
+
+    def test_reconstruir_corrige_divergencias(self):
+        self.enviar_checklist(soro=10, gaze=3)
+        self.usar(self.criar_ocorrencia(), self.soro, 4)
+        MaterialUtilizado.objects.update(quantidade_usada=5)  # Sem sinais
+        SaldoEstoque.objects.filter(item=self.gaze).update(quantidade=99)
+
+        saida = StringIO()
+        call_command('reconstruir_saldos', stdout=saida)
+        self.assertIn('2 corrigido(s)', saida.getvalue())
+        self.assertEqual((self.saldo(self.soro), self.saldo(self.gaze)), (5, 3))
+        self.assertEqual(estoque.recalcular(), {'criados': 0, 'corrigidos': 0, 'removidos': 0})
+
+    def test_estoque_baixo_por_viatura(self):
+        self.enviar_checklist(soro=10, gaze=1)
+        self.enviar_checklist(self.outra_equipe, soro=0)
+        url = reverse('saldo-estoque-list')
+
+        resposta = self.client.get(url, {'vtr': 'USA-01', 'limite': 2})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual([(s['item']['nome_item'], s['quantidade']) for s in resposta.json()['results']], [('Gaze', 1)])
+        resposta = self.client.get(url, {'limite': 2})
+        self.assertEqual([s['vtr_sigla'] for s in resposta.json()['results']], ['USA-01', 'USA-02'])
+        self.assertEqual(self.client.get(url, {'limite': 'pouco'}).status_code, 400)
+
+        # O número de consultas não depende de quantos itens/viaturas existem
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(url, {'vtr': 'USA-01', 'limite': 2})
+        antes = len(consultas)
+        ItemInventario.objects.bulk_create([ItemInventario(nome_item=f'Item {i}') for i in range(5)])
+        estoque.registrar_contagem(
+            ChecklistStatus.objects.create(equipe=self.equipe, usuario=self.usuario),
+            [ChecklistDetalhe(item=item, quantidade=0) for item in ItemInventario.objects.all()],
+        )
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.get(url, {'vtr': 'USA-01', 'limite': 2})
+        self.assertEqual(len(consultas), antes)
+        self.assertEqual(len(resposta.json()['results']), 7)
+
+
+class MembroEquipeTests(APITestCase):
+    """ Índice (usuário, data do plantão) das quatro funções da equipe. """
+
+    def setUp(self):
+        self.condutor, self.tecnico, self.medico = (
+            Usuario.objects.create_user(
+                matricula=matricula, nome_completo=f'Usuário {matricula}',
+                email=f'{matricula}@gestaosaude.test', password='senha-teste',
+            )
+            for matricula in ('000001', '000002', '000003')
+        )
+        self.equipe = EquipePlantao.objects.create(
+            vtr_sigla='USA-01', data_plantao=date(2025, 1, 1), condutor=self.condutor, tecnico_enf=self.tecnico,
+        )
+
+    def membros(self):
+        return set(MembroEquipe.objects.values_list('usuario_id', 'funcao', 'data_plantao'))
+
+    def test_acompanha_as_gravacoes_da_equipe(self):
+        dia = date(2025, 1, 1)
+        self.assertEqual(self.membros(), {(self.condutor.pk, 'condutor', dia), (self.tecnico.pk, 'tecnico_enf', dia)})
+
+        self.equipe.medico = self.medico
+        self.equipe.tecnico_enf = self.medico
+        self.equipe.data_plantao = dia = date(2025, 1, 2)
+        self.equipe.save()
+        self.assertEqual(self.membros(), {
+            (self.condutor.pk, 'condutor', dia), (self.medico.pk, 'tecnico_enf', dia), (self.medico.pk, 'medico', dia),
+        })
+
+        # Sem mudança nas funções/data: não reescreve
+        self.equipe.vtr_sigla = 'USA-02'
+        with CaptureQueriesContext(connection) as consultas:
+            self.equipe.save()
+        self.assertFalse([c for c in consultas if 'plantao_membro_equipe' in c['sql']])
+
+        self.equipe.delete()
+        self.assertEqual(self.membros(), set())
+
+    def test_reconstruir(self):
+        EquipePlantao.objects.filter(pk=self.equipe.pk).update(medico=self.medico)  # Sem sinais
+        MembroEquipe.objects.filter(funcao='condutor').delete()
+
+        saida = StringIO()
+        call_command('reconstruir_membros', stdout=saida)
+        self.assertIn('3 membro(s)', saida.getvalue())
+        self.assertEqual({funcao for _, funcao, _ in self.membros()}, {'condutor', 'tecnico_enf', 'medico'})
+        self.assertEqual(membros.reconstruir(), 3)
@@ -4,6 +4,8 @@ from django.contrib.auth.models import (
 )
 from django.utils.translation import gettext_lazy as _
 
+from . import roles
+
 class UsuarioManager(BaseUserManager):
     """
     Manager para o nosso modelo de usuário customizado.
@@ -109,17 +111,10 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
     @property
     def is_gerencial(self):
         """Verifica se o usuário pertence a um grupo gerencial."""
-        # 'is_superuser' tem acesso total
-        if self.is_superuser:
-            return True
-        # Verifica se o usuário está no grupo 'Administração'
-        return self.groups.filter(name='Administração').exists()
+        # 'is_superuser' tem acesso total; os grupos vêm do cache de papéis
+        return roles.is_gerencial(self)
 
     @property
     def is_assistencial(self):
         """Verifica se o usuário pertence a um grupo assistencial."""
-        grupos_assistenciais = [
-            'Médico', 'Enfermeiro', 'Técnico de Enfermagem', 'Condutor'
-        ]
-        return self.groups.filter(name__in=grupos_assistenciais).exists()
-
+        return roles.is_assistencial(self)
@@ -0,0 +1,118 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# --- Resolução de Papéis (Gerencial / Assistencial) ---
+#
+# Os papéis são derivados dos nomes dos grupos do usuário. Os nomes são
+# lidos uma única vez por instância de Usuario (ou seja, uma vez por
+# requisição, já que 'request.user' é a mesma instância) e guardados num
+# cache compartilhado pelo processo, chaveado pelo id do usuário.
+#
+# A invalidação é feita pelos sinais em 'apps/users/signals.py': além de
+# limpar o cache deste processo, eles incrementam a versão dos papéis no
+# cache do Django (como em api/catalogo.py). Cada entrada guarda a versão
+# em que foi lida e só vale enquanto ela for a atual, então os outros
+# processos (workers) também deixam de usá-la na próxima requisição, e não
+# só depois de CACHE_PAPEIS_SEGUNDOS. Com o LocMemCache padrão a versão é
+# de cada processo: nos outros, o papel antigo vale até o TTL.
+
+GRUPO_GERENCIAL = 'Administração'
+GRUPOS_ASSISTENCIAIS = frozenset({
+    'Médico', 'Enfermeiro', 'Técnico de Enfermagem', 'Condutor'
+})
+
+CHAVE_VERSAO = 'gestaosaude:papeis:versao'
+
+_cache = {}  # usuario_id -> (expira_em, versão, frozenset de nomes de grupos)
+_lock = threading.Lock()
+
+
+def _ttl():
+    return getattr(settings, 'CACHE_PAPEIS_SEGUNDOS', 300)
+
+
+def nomes_grupos(usuario):
+    """
+    Retorna um frozenset com os nomes dos grupos do usuário.
+    Ordem de busca: memo da instância -> grupos pré-carregados
+    (prefetch_related) -> cache do processo -> banco de dados.
+    """
+    nomes = getattr(usuario, '_nomes_grupos', None)
+    if nomes is not None:
+        return nomes
+
+    prefetched = getattr(usuario, '_prefetched_objects_cache', {}).get('groups')
+    if prefetched is not None:
+        nomes = frozenset(grupo.name for grupo in prefetched)
+    else:
+        # Versão lida antes do banco: uma invalidação no meio descarta a entrada
+        atual = versao()
+        nomes = _ler_cache(usuario.pk, atual)
+        if nomes is None:
+            nomes = frozenset(usuario.groups.values_list('name', flat=True))
+            _gravar_cache(usuario.pk, atual, nomes)
+
+    usuario._nomes_grupos = nomes
+    return nomes
+
+
+def is_gerencial(usuario):
+    if usuario.is_superuser:
+        return True
+    return GRUPO_GERENCIAL in nomes_grupos(usuario)
+
+
+def is_assistencial(usuario):
+    return not GRUPOS_ASSISTENCIAIS.isdisjoint(nomes_grupos(usuario))
+
+
+# --- Cache do Processo ---
+
+def versao():
+    atual = cache.get(CHAVE_VERSAO)
+    if atual is None:
+        # Valor novo a cada início (ou expurgo) do cache: nenhuma entrada antiga coincide
+        cache.add(CHAVE_VERSAO, time.time_ns(), timeout=None)
+        atual = cache.get(CHAVE_VERSAO, time.time_ns())
+    return atual
+
+
+def _ler_cache(usuario_id, atual):
+    entrada = _cache.get(usuario_id)
+    if entrada is None:
+        return None
+    expira_em, versao_entrada, nomes = entrada
+    if expira_em < time.monotonic() or versao_entrada != atual:
+        return None
+    return nomes
+
+
+def _gravar_cache(usuario_id, atual, nomes):
+    with _lock:
+        _cache[usuario_id] = (time.monotonic() + _ttl(), atual, nomes)
+
+
+def invalidar(usuario_ids=None):
+    """
+    Remove do cache deste processo os usuários informados (sem argumentos,
+    todos; ex: um grupo foi renomeado) e incrementa a versão compartilhada,
+    o que descarta as entradas dos outros processos.
+    """
+    try:
+        cache.incr(CHAVE_VERSAO)
+    except ValueError:  # Sem versão no cache: a próxima leitura cria uma nova
+        pass
+    with _lock:
+        if usuario_ids is None:
+            _cache.clear()
+        else:
+            for usuario_id in usuario_ids:
+                _cache.pop(usuario_id, None)
+
+
+def esquecer(usuario):
+    """ Descarta o memo de uma instância específica de Usuario. """
+    usuario.__dict__.pop('_nomes_grupos', None)
@@ -0,0 +1,33 @@
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import roles
+from .models import Usuario
+
+
+@receiver(m2m_changed, sender=Usuario.groups.through)
+def invalidar_papeis_do_usuario(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Invalida o cache de papéis quando os grupos de um usuário mudam.
+    - Direto (usuario.groups.add(...)): 'instance' é o Usuario.
+    - Reverso (grupo.usuario_set.add(...)): 'pk_set' tem os ids dos usuários.
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        roles.esquecer(instance)
+        roles.invalidar([instance.pk])
+    elif pk_set:
+        roles.invalidar(pk_set)
+    else:
+        # 'clear' reverso não informa quais usuários foram afetados
+        roles.invalidar()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidar_papeis_do_grupo(sender, instance, **kwargs):
+    """ Um grupo renomeado/removido muda o papel de todos os seus membros. """
+    roles.invalidar()
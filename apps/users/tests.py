@@ -1,3 +1,63 @@
+from django.contrib.auth.models import Group
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from . import roles
+from .models import Usuario
+
+
+class PapeisCacheTests(TestCase):
+    """ Cache de papéis (is_gerencial / is_assistencial). """
+
+    def setUp(self):
+        roles.invalidar()
+        self.usuario = Usuario.objects.create_user(
+            matricula='123456', nome_completo='Fulano', email='fulano@gestaosaude.test'
+        )
+        self.medico = Group.objects.create(name='Médico')
+        self.usuario.groups.add(self.medico)
+
+    def recarregar(self):
+        return Usuario.objects.get(pk=self.usuario.pk)
+
+    def test_papeis_sao_lidos_uma_vez_por_instancia(self):
+        usuario = self.recarregar()
+        with self.assertNumQueries(1):
+            self.assertTrue(usuario.is_assistencial)
+            self.assertFalse(usuario.is_gerencial)
+            self.assertTrue(usuario.is_assistencial)
+
+    def test_cache_do_processo_evita_consultas_em_nova_instancia(self):
+        self.recarregar().is_assistencial
+        usuario = self.recarregar()
+        with self.assertNumQueries(0):
+            self.assertTrue(usuario.is_assistencial)
+
+    def test_grupos_pre_carregados_nao_custam_consultas(self):
+        roles.invalidar()
+        usuario = Usuario.objects.prefetch_related('groups').get(pk=self.usuario.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(usuario.is_assistencial)
+
+    def test_alterar_grupos_invalida_cache(self):
+        self.assertFalse(self.recarregar().is_gerencial)
+        self.usuario.groups.add(Group.objects.create(name='Administração'))
+        self.assertTrue(self.recarregar().is_gerencial)
+
+        # Pelo lado reverso (grupo.usuario_set)
+        self.medico.usuario_set.remove(self.usuario)
+        self.assertFalse(self.recarregar().is_assistencial)
+
+    def test_renomear_grupo_invalida_cache(self):
+        self.assertTrue(self.recarregar().is_assistencial)
+        self.medico.name = 'Visitante'
+        self.medico.save()
+        self.assertFalse(self.recarregar().is_assistencial)
+
+    def test_invalidacao_feita_por_outro_processo(self):
+        self.assertTrue(self.recarregar().is_assistencial)  # No cache deste processo
+        # Outro worker tirou o usuário do grupo: aqui, só a versão compartilhada muda
+        Usuario.groups.through.objects.filter(usuario_id=self.usuario.pk).delete()  # Sem sinais
+        self.assertTrue(self.recarregar().is_assistencial)
+        cache.incr(roles.CHAVE_VERSAO)
+        self.assertFalse(self.recarregar().is_assistencial)
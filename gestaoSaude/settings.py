@@ -37,16 +37,19 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'apps.dashboard',
     'apps.ocorrencias',
     'apps.pacientes',
     'apps.plantao',
     'apps.users',
+    'apps.api',
     'rest_framework'
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'apps.api.metricas.MetricasMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -126,6 +129,13 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploads (fotos e áudios das fichas)
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+# Partes recebidas dos áudios enviados em trechos (fora do MEDIA_ROOT,
+# para não serem servidas). Ver apps/api/audio.py
+UPLOADS_AUDIO_DIR = BASE_DIR / 'uploads_parciais'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -134,3 +144,39 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # gestaosaude_core/settings.py
 
 AUTH_USER_MODEL = 'users.Usuario'
+
+# Django REST Framework
+# Todas as listagens usam paginação por cursor (ver apps/api/pagination.py)
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'apps.api.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
+}
+
+# Cache de papéis (grupos) dos usuários, em segundos. As invalidações chegam
+# aos outros processos pela versão no cache do Django (CACHES); com o
+# LocMemCache padrão, só por este prazo. Ver apps/users/roles.py
+CACHE_PAPEIS_SEGUNDOS = 300
+
+# Catálogo de inventário já renderizado, por conjunto de grupos: número
+# máximo de entradas (LRU) e validade em segundos. A versão do catálogo
+# fica no cache do Django (CACHES). Ver apps/api/catalogo.py
+CATALOGO_CACHE_ENTRADAS = 64
+CATALOGO_CACHE_SEGUNDOS = 300
+
+# Fichas finalizadas há mais que isto (dias, pelo início) vão para o
+# arquivo com o comando arquivar_ocorrencias. Ver apps/ocorrencias/arquivo.py
+ARQUIVO_OCORRENCIAS_DIAS = 365
+
+# Serializers de leitura (ocorrências, pacientes, checklists) pela função
+# compilada a partir dos campos; False volta ao DRF campo a campo.
+# Ver apps/api/compilacao.py
+SERIALIZACAO_COMPILADA = True
+
+# Threads das tarefas em segundo plano (miniaturas das fotos, metadados
+# dos áudios). Ver apps/api/tarefas.py
+TAREFAS_THREADS = 2
+
+# Métricas por endpoint, expostas em /metricas/ (ver apps/api/metricas.py).
+# Requisições mais lentas que isto (ms) vão para o log 'apps.api.lentas'
+# com as consultas mais demoradas; None desliga.
+METRICAS_REQUISICAO_LENTA_MS = 1000